@@ -0,0 +1,239 @@
+"""
+ASGI variant of the CSR API, for holding many concurrent connections.
+
+/generate, /validate, /validate/<sha256> and /health keep the contract of the Flask routes in
+main.py and share their request parsing, crypto worker processes, key pool
+and caches. Handlers never block the event loop: key generation and signing
+run in the crypto worker processes and CSR parsing on the validation
+threads, and the handler awaits their futures. Open connections therefore
+only cost memory, while CPU work stays bounded by CRYPTO_WORKERS,
+CRYPTO_MAX_PENDING and VALIDATION_WORKERS. Generation requests beyond
+CRYPTO_MAX_PENDING wait for a worker instead of failing with 503; cap the
+connections with uvicorn's --limit-concurrency.
+
+Usage, from the backend directory:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import functools
+import json
+import weakref
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse as StarletteJSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags
+
+import json_codec
+import main
+
+
+class JSONResponse(StarletteJSONResponse):
+    """A JSON response serialized with the encoder configured in json_codec."""
+
+    def render(self, content: Any) -> bytes:
+        return json_codec.dumps(content)
+
+
+# Generation requests wait here for a crypto worker slot, on the event loop,
+# where the Flask routes would answer 503; one semaphore per event loop
+_generation_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+    weakref.WeakKeyDictionary()
+
+
+async def generate_in_workers(spec: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Generate a CSR in the crypto workers without blocking the event loop.
+
+    Requests beyond CRYPTO_MAX_PENDING queue as suspended coroutines, so
+    thousands can wait for the workers at the cost of their memory only.
+
+    Args:
+        spec: Arguments returned by main.parse_generation_request
+
+    Returns:
+        A tuple containing (csr_pem, key_pem)
+    """
+    loop = asyncio.get_running_loop()
+    slots = _generation_slots.get(loop)
+    if slots is None:
+        slots = _generation_slots[loop] = asyncio.Semaphore(main.crypto_workers.max_pending)
+
+    async with slots:
+        # Key pool refills may still hold a worker slot, so the submit waits
+        # for it on a thread; this also keeps a respawn of the worker
+        # processes off the event loop
+        future = await loop.run_in_executor(None, functools.partial(main.submit_generation, spec, block=True))
+        return await asyncio.wrap_future(future)
+
+
+async def run_validation(index: int, csr_pem: Any) -> Dict[str, Any]:
+    """Validate one CSR on the validation threads, as main.validate_one."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(main.validation_pool, main.validate_one, index, csr_pem)
+
+
+async def validate_concurrently(csrs: List[Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Validate CSRs with a bounded number in flight, like main.validate_in_parallel.
+
+    Args:
+        csrs: CSRs in PEM format
+
+    Yields:
+        Index-tagged parse_csr results, or errors, in completion order
+    """
+    pending = set()
+    submissions = iter(enumerate(csrs))
+    exhausted = False
+    while True:
+        while not exhausted and len(pending) < main.VALIDATION_WORKERS * 2:
+            try:
+                index, csr_pem = next(submissions)
+            except StopIteration:
+                exhausted = True
+                break
+            pending.add(asyncio.ensure_future(run_validation(index, csr_pem)))
+        if not pending:
+            return
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            yield task.result()
+
+
+async def json_body(request: Request) -> Dict[str, Any]:
+    """Return the JSON object of a request body, or raise ValueError."""
+    try:
+        data = json.loads(await request.body())
+    except ValueError:
+        raise ValueError("Request body must be JSON")
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    return data
+
+
+def wants_ndjson(request: Request) -> bool:
+    accept = parse_accept_header(request.headers.get("accept"), MIMEAccept)
+    return accept.best_match(['application/json', main.NDJSON_MIMETYPE]) == main.NDJSON_MIMETYPE
+
+
+async def root(request: Request) -> Response:
+    return JSONResponse({"message": "Welcome to CSR Generator API"})
+
+
+async def generate_csr(request: Request) -> Response:
+    try:
+        # Validate the request
+        try:
+            data = await json_body(request)
+            spec = main.parse_generation_request(data)
+            fmt = main.output_format(data)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        csr_pem, key_pem = await generate_in_workers(spec)
+        return JSONResponse(main.generated_result(csr_pem, key_pem, fmt))
+
+    except Exception as e:
+        return JSONResponse({"error": f"Error generating CSR: {str(e)}"}, status_code=500)
+
+
+async def validate_csr(request: Request) -> Response:
+    try:
+        # A raw DER or PEM body is validated as is
+        if request.headers.get("content-type", "").split(";")[0].strip() in main.RAW_CSR_MIMETYPES:
+            body: Optional[Any] = await request.body()
+            if not body:
+                return JSONResponse({"error": "Missing CSR data"}, status_code=400)
+        else:
+            data = await json_body(request)
+
+            # Stream results for a list of CSRs as each one is validated
+            if wants_ndjson(request) and isinstance(data.get('csrs'), list):
+                lines = (json_codec.dumps(result) + b"\n" async for result in validate_concurrently(data['csrs']))
+                return StreamingResponse(lines, media_type=main.NDJSON_MIMETYPE)
+
+            body = data.get('csr_data') or data.get('csr')
+            if not body:
+                return JSONResponse({"error": "Missing CSR data"}, status_code=400)
+            if not isinstance(body, str):
+                return JSONResponse({"error": "CSR data must be a PEM or base64 DER string"}, status_code=400)
+
+        # Parse the CSR and verify its signature off the event loop
+        loop = asyncio.get_running_loop()
+        info, headers = await loop.run_in_executor(main.validation_pool, main.validate_with_headers, body)
+        return JSONResponse(info, headers=headers)
+
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    except Exception as e:
+        return JSONResponse({"error": f"Invalid CSR: {str(e)}"}, status_code=400)
+
+
+async def get_validation(request: Request) -> Response:
+    digest = request.path_params['sha256'].lower()
+    if not main.SHA256_PATTERN.fullmatch(digest):
+        return JSONResponse({"error": "Expected the hex SHA-256 of the CSR's DER encoding"}, status_code=400)
+
+    # As in main.get_validation, a matching ETag is answered without a lookup
+    headers = main.validation_cache_headers(digest)
+    if parse_etags(request.headers.get("if-none-match")).contains_weak(digest):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        # A miss may read and parse a file from the inventory
+        loop = asyncio.get_running_loop()
+        info = await loop.run_in_executor(main.validation_pool, main.find_validation, digest)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        return JSONResponse({"error": f"Error looking up CSR: {str(e)}"}, status_code=500)
+
+    if info is None:
+        return JSONResponse({"error": "Unknown CSR; validate it with POST /validate first"}, status_code=404)
+    return JSONResponse(info, headers=headers)
+
+
+async def health_check(request: Request) -> Response:
+    return JSONResponse({"status": "healthy", "timestamp": datetime.now().isoformat()})
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette) -> AsyncIterator[None]:
+    # Each server process starts its own crypto workers, as under gunicorn
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, main.start_background_services)
+    try:
+        yield
+    finally:
+        await loop.run_in_executor(None, main.stop_background_services)
+
+
+app = Starlette(
+    routes=[
+        Route('/', root),
+        Route('/generate', generate_csr, methods=['POST']),
+        Route('/validate', validate_csr, methods=['POST']),
+        Route('/validate/{sha256}', get_validation),
+        Route('/health', health_check),
+    ],
+    middleware=[
+        Middleware(
+            CORSMiddleware,
+            allow_origins=["http://localhost:3000", "https://shahmeetk.github.io"],
+            allow_methods=["GET", "POST", "OPTIONS"],
+            allow_headers=["Content-Type", "If-None-Match"],
+            expose_headers=["ETag", "Content-Location"]
+        )
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,298 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import csr_utils
+import inventory
+
+# gmpy2 multiplies large integers far faster than Python's own integers; it
+# is optional, and everything works without it
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+# Below this many moduli, worker processes cost more than they save
+MIN_PARALLEL_MODULI = 4096
+
+# Python's own long division is quadratic; above this divisor size the
+# remainder tree switches to recursive divide-and-conquer division
+FAST_DIVISION_BITS = 4096
+
+
+def _to_int(value: int) -> Any:
+    return gmpy2.mpz(value) if gmpy2 is not None else value
+
+
+def _divmod_2n_1n(a: int, b: int, n: int) -> Tuple[int, int]:
+    # Burnikel-Ziegler recursive division of a < b * 2**n by an n-bit b
+    if n <= FAST_DIVISION_BITS:
+        return divmod(a, b)
+    pad = n & 1
+    if pad:
+        a, b, n = a << 1, b << 1, n + 1
+    half = n >> 1
+    mask = (1 << half) - 1
+    b1, b2 = b >> half, b & mask
+    q1, r = _divmod_3n_2n(a >> n, (a >> half) & mask, b, b1, b2, half)
+    q2, r = _divmod_3n_2n(r, a & mask, b, b1, b2, half)
+    return q1 << half | q2, r >> pad
+
+
+def _divmod_3n_2n(a12: int, a3: int, b: int, b1: int, b2: int, n: int) -> Tuple[int, int]:
+    if a12 >> n == b1:
+        q, r = (1 << n) - 1, a12 - (b1 << n) + b1
+    else:
+        q, r = _divmod_2n_1n(a12, b1, n)
+    r = (r << n | a3) - q * b2
+    while r < 0:
+        q -= 1
+        r += b
+    return q, r
+
+
+def _mod(a: Any, b: Any) -> Any:
+    """Return a % b, in sub-quadratic time for large Python integers."""
+    n = b.bit_length()
+    if gmpy2 is not None or n <= FAST_DIVISION_BITS:
+        return a % b
+
+    # Schoolbook division in base 2**n, each step a recursive 2n-by-n division
+    mask = (1 << n) - 1
+    r = 0
+    for shift in range((a.bit_length() - 1) // n * n, -1, -n):
+        _, r = _divmod_2n_1n(r << n | (a >> shift) & mask, b, n)
+    return r
+
+
+def product_tree(values: Sequence[Any]) -> List[List[Any]]:
+    """
+    Build a product tree over a list of integers.
+
+    Args:
+        values: The leaves of the tree
+
+    Returns:
+        The levels of the tree, from the leaves up to the single root product
+    """
+    levels = [list(values)]
+    while len(levels[-1]) > 1:
+        previous = levels[-1]
+        levels.append([
+            previous[i] * previous[i + 1] if i + 1 < len(previous) else previous[i]
+            for i in range(0, len(previous), 2)
+        ])
+    return levels
+
+
+def remainder_tree(tree: List[List[Any]], value: Optional[Any] = None) -> List[Any]:
+    """
+    Reduce a value modulo the square of every leaf of a product tree.
+
+    Args:
+        tree: A product tree, as returned by product_tree
+        value: The value to reduce (default: the root product)
+
+    Returns:
+        value mod leaf**2 for every leaf, in leaf order
+    """
+    root = tree[-1][0]
+    remainders = [root if value is None else _mod(value, root * root)]
+    for level in reversed(tree[:-1]):
+        remainders = [_mod(remainders[i // 2], node * node) for i, node in enumerate(level)]
+    return remainders
+
+
+def _leaf_gcds(moduli: Sequence[Any], remainders: Sequence[Any]) -> List[int]:
+    return [int(math.gcd(int(remainder // modulus), int(modulus))) for modulus, remainder in zip(moduli, remainders)]
+
+
+def _chunk_product(chunk: Sequence[int]) -> Any:
+    return product_tree([_to_int(modulus) for modulus in chunk])[-1][0]
+
+
+def _chunk_gcds(chunk: Sequence[int], remainder: Any) -> List[int]:
+    moduli = [_to_int(modulus) for modulus in chunk]
+    return _leaf_gcds(moduli, remainder_tree(product_tree(moduli), remainder))
+
+
+def batch_gcd(moduli: Sequence[int], processes: Optional[int] = None) -> List[int]:
+    """
+    Compute gcd(N_i, product of all other N_j) for every modulus.
+
+    This is Bernstein's batch GCD: a product tree of the moduli followed by
+    a remainder tree, in quasi-linear time instead of the quadratic time of
+    pairwise GCDs. A result above 1 means the modulus shares a prime with
+    another modulus. Moduli must be distinct; see scan_moduli.
+
+    With more than one process, the moduli are split into one chunk per
+    process. Each worker builds the product tree of its chunk, the parent
+    combines the chunk products, and the workers then run the remainder
+    trees of their chunks.
+
+    Args:
+        moduli: Distinct RSA moduli
+        processes: Number of worker processes (default: number of CPUs)
+
+    Returns:
+        The GCD for every modulus, in input order
+    """
+    if not moduli:
+        return []
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(moduli) < MIN_PARALLEL_MODULI:
+        values = [_to_int(modulus) for modulus in moduli]
+        return _leaf_gcds(values, remainder_tree(product_tree(values)))
+
+    chunk_size = math.ceil(len(moduli) / processes)
+    chunks = [moduli[i:i + chunk_size] for i in range(0, len(moduli), chunk_size)]
+    with ProcessPoolExecutor(
+        max_workers=len(chunks),
+        mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        products = list(executor.map(_chunk_product, chunks))
+        # The top of the tree, over the chunk products, stays in this process
+        chunk_remainders = remainder_tree(product_tree(products))
+        results = executor.map(_chunk_gcds, chunks, chunk_remainders)
+        return [gcd for chunk_gcds in results for gcd in chunk_gcds]
+
+
+def scan_moduli(
+    entries: Iterable[Tuple[str, int]],
+    processes: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Find RSA moduli that share a prime factor or are repeated.
+
+    Args:
+        entries: Tuples of (source, modulus), where source names the CSR
+        processes: Number of worker processes for batch_gcd
+
+    Returns:
+        A dictionary with the number of "moduli" scanned and the
+        "compromised" entries, each with its "source", key "bits", the
+        "reason" ("shared_factor" or "duplicate_modulus") and, for shared
+        factors, the hex "factor"
+    """
+    sources: Dict[int, List[str]] = {}
+    for source, modulus in entries:
+        sources.setdefault(modulus, []).append(source)
+
+    moduli = list(sources)
+    gcds = batch_gcd(moduli, processes=processes)
+
+    # A modulus sharing both primes with other moduli has a GCD equal to
+    # itself; pairwise GCDs against the few flagged moduli recover a prime
+    flagged = [modulus for modulus, gcd in zip(moduli, gcds) if gcd > 1]
+    factors = {modulus: gcd for modulus, gcd in zip(moduli, gcds) if 1 < gcd < modulus}
+    for modulus in flagged:
+        if modulus in factors:
+            continue
+        for other in flagged:
+            gcd = math.gcd(modulus, other)
+            if 1 < gcd < modulus:
+                factors[modulus] = gcd
+                break
+
+    compromised = []
+    for modulus in moduli:
+        for source in sources[modulus]:
+            if modulus in factors:
+                compromised.append({
+                    "source": source,
+                    "bits": modulus.bit_length(),
+                    "reason": "shared_factor",
+                    "factor": format(factors[modulus], "x")
+                })
+            elif len(sources[modulus]) > 1:
+                compromised.append({
+                    "source": source,
+                    "bits": modulus.bit_length(),
+                    "reason": "duplicate_modulus"
+                })
+    return {"moduli": len(moduli), "compromised": compromised}
+
+
+def iter_moduli(paths: Iterable[str]) -> Iterator[Tuple[str, Optional[int], Optional[str]]]:
+    """
+    Extract the RSA moduli of the CSRs in directories, CSR files and bundles.
+
+    Directories are walked for *.csr files; any other file is read as a
+    multi-PEM bundle, one block at a time, so a single CSR file works too.
+    A file without PEM blocks is read as one DER-encoded CSR.
+
+    Args:
+        paths: Directories and files to read
+
+    Yields:
+        Tuples of (source, modulus, error); modulus is None for non-RSA keys
+        and for CSRs that cannot be read, in which case error says why
+    """
+    for path in paths:
+        files = inventory.iter_csr_files([path]) if os.path.isdir(path) else [path]
+        for file_path in files:
+            try:
+                for source, block, error in _iter_csr_blocks(file_path):
+                    if error is not None:
+                        yield source, None, error
+                        continue
+                    try:
+                        yield source, csr_utils.rsa_modulus(block), None
+                    except ValueError as e:
+                        yield source, None, str(e)
+            except OSError as e:
+                yield file_path, None, str(e)
+
+
+def _iter_csr_blocks(file_path: str) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    # Yields (source, block, error) for each CSR in a file. Blocks are only
+    # tagged with their offset once a second one shows that the file is a
+    # bundle, so one block is read ahead.
+    blocks = csr_utils.iter_pem_blocks(file_path)
+    pending = next(blocks, None)
+    if pending is None:
+        with open(file_path, "rb") as f:
+            data = f.read(csr_utils.MAX_PEM_BLOCK_SIZE + 1)
+        if len(data) > csr_utils.MAX_PEM_BLOCK_SIZE or data[:1] != b"\x30":
+            yield file_path, None, "No PEM or DER encoded CSR found"
+        else:
+            yield file_path, data, None
+        return
+
+    bundle = False
+    for block in blocks:
+        bundle = True
+        yield f"{file_path}@{pending[0]}", pending[1], pending[2]
+        pending = block
+    yield (f"{file_path}@{pending[0]}" if bundle else file_path), pending[1], pending[2]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Find RSA CSR keys that share prime factors")
+    parser.add_argument("paths", nargs="*", help="Directories, CSR files or bundles (default: Prod-CSR and UAT-CSR)")
+    parser.add_argument("--processes", type=int, help="Number of worker processes (default: number of CPUs)")
+    args = parser.parse_args(argv)
+
+    entries = []
+    errors = {}
+    for source, modulus, error in iter_moduli(args.paths or inventory.default_roots()):
+        if error is not None:
+            errors[source] = error
+        elif modulus is not None:
+            entries.append((source, modulus))
+
+    result = scan_moduli(entries, processes=args.processes)
+    result["errors"] = errors
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if result["compromised"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
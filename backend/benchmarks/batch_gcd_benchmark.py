@@ -0,0 +1,61 @@
+"""
+Benchmark batch_gcd on synthetic 2048-bit moduli.
+
+The moduli are random odd integers rather than real RSA keys, since
+generating a million key pairs would take far longer than the scan itself.
+The running time of the product and remainder trees only depends on the
+number and size of the moduli, not on whether they are prime products. A
+few moduli are built to share a factor, and the run fails if any of them is
+missed.
+
+Usage, from the backend directory:
+
+    python benchmarks/batch_gcd_benchmark.py 10000 100000 1000000 --processes 8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import batch_gcd  # noqa: E402
+
+
+def synthetic_moduli(count: int, bits: int, planted: int, rng: random.Random):
+    moduli = [rng.getrandbits(bits) | (1 << (bits - 1)) | 1 for _ in range(count)]
+    shared = rng.getrandbits(bits // 2) | (1 << (bits // 2 - 1)) | 1
+    positions = rng.sample(range(count), planted)
+    for position in positions:
+        moduli[position] = shared * (rng.getrandbits(bits // 2) | (1 << (bits // 2 - 1)) | 1)
+    return moduli, positions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark batch GCD")
+    parser.add_argument("sizes", nargs="*", type=int, default=[10000, 100000, 1000000])
+    parser.add_argument("--bits", type=int, default=2048, help="Modulus size in bits")
+    parser.add_argument("--processes", type=int, help="Worker processes (default: number of CPUs)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"gmpy2: {'yes' if batch_gcd.gmpy2 is not None else 'no'}, processes: {args.processes or os.cpu_count()}")
+    print(f"{'moduli':>10} {'seconds':>10} {'moduli/s':>10}")
+    for size in args.sizes:
+        moduli, planted = synthetic_moduli(size, args.bits, min(4, size), rng)
+        started = time.perf_counter()
+        gcds = batch_gcd.batch_gcd(moduli, processes=args.processes)
+        elapsed = time.perf_counter() - started
+
+        missed = [position for position in planted if gcds[position] == 1]
+        if missed:
+            print(f"planted shared factors missed at {missed}", file=sys.stderr)
+            return 1
+        print(f"{size:>10} {elapsed:>10.2f} {size / elapsed:>10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Compare JSON encoders and response compression on typical API responses.
+
+For a single /generate response, a /validate/batch response of 1000 CSRs and
+a 1000-record /inventory page, this prints the time to encode with the json
+module and with orjson, and the size and time of gzip and brotli.
+
+Usage, from the backend directory:
+
+    python benchmarks/response_benchmark.py
+"""
+import os
+import sys
+import time
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import compression  # noqa: E402
+import csr_utils  # noqa: E402
+import json_codec  # noqa: E402
+
+
+def best_of(repeat: int, fn: Callable[[], Any]) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def payloads() -> Dict[str, Any]:
+    csr_pem, key_pem = csr_utils.generate_csr("api.example.com", "Example Org", country="SA")
+    csrs = [csr_utils.generate_csr(f"host{i}.example.com", "Example Org", key_type="EC-P256")[0] for i in range(50)]
+    results = []
+    for index in range(1000):
+        info = csr_utils.parse_csr(csrs[index % len(csrs)])
+        results.append({"index": index, **info, **csr_utils.assess_csr(info)})
+    records = [{
+        "environment": "UAT", "service": f"NI-{i % 40}", "file": f"saudi-ni-{i}-uat-csr.csr",
+        "path": f"UAT-CSR/NI-{i % 40}/saudi-ni-{i}-uat-csr.csr", "domain": f"host{i}.uat.ksa.ngenius-payments.com",
+        "organization": "Network International Arabia Limited Co.", "country": "SA", "key_type": "RSA",
+        "key_size": 2048, "curve": None, "signature_algorithm": "sha256WithRSAEncryption",
+        "spki_sha256": os.urandom(32).hex(), "csr_sha256": os.urandom(32).hex(), "is_valid": True, "error": None
+    } for i in range(1000)]
+    return {
+        "generate": {"csr": csr_pem, "private_key": key_pem},
+        "validate/batch": {"results": results, "summary": {"total": 1000, "valid": 1000}},
+        "inventory": {"records": records, "next_cursor": "1000"}
+    }
+
+
+def main() -> int:
+    backends = ["stdlib"] + (["orjson"] if json_codec.orjson is not None else [])
+    print(f"encoders: {', '.join(backends)}; compression: {', '.join(compression.available_encodings())}")
+    print(f"{'response':<16} {'encoder':<8} {'encode ms':>10} {'bytes':>9} {'coding':<7} {'bytes':>9} {'ms':>8}")
+    for name, payload in payloads().items():
+        repeat = 200 if name == "generate" else 20
+        for backend in backends:
+            json_codec.configure(backend)
+            body = json_codec.dumps(payload)
+            encode_ms = best_of(repeat, lambda: json_codec.dumps(payload))
+            for encoding in compression.available_encodings():
+                compressed = compression.compress(body, encoding)
+                compress_ms = best_of(repeat, lambda: compression.compress(body, encoding))
+                print(
+                    f"{name:<16} {backend:<8} {encode_ms:>10.3f} {len(body):>9} "
+                    f"{encoding:<7} {len(compressed):>9} {compress_ms:>8.3f}"
+                )
+    json_codec.configure("auto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Compare the Werkzeug development server, the gunicorn production server and
+the ASGI variant under uvicorn.
+
+Each server is started on a free port and driven by concurrent keep-alive
+clients for a fixed time per scenario:
+
+- validate: POST /validate with one of a set of pre-built CSRs
+- generate: POST /generate with EC-P256 keys, so key generation is cheap and
+  request handling dominates
+- stall: GET /health latency while other clients keep requesting 4096-bit
+  RSA keys
+
+Usage, from the backend directory:
+
+    python benchmarks/server_benchmark.py --clients 16 --seconds 10
+    python benchmarks/server_benchmark.py --servers gunicorn --workers 4 --threads 8
+    python benchmarks/server_benchmark.py --servers gunicorn asgi --clients 1000
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import csr_utils  # noqa: E402
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+GENERATE_BODY = {
+    "common_name": "bench.example.com",
+    "organization": "Example",
+    "country": "SA",
+    "service": "NI-API",
+    "environment": "UAT",
+    "key_type": "EC-P256"
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind: str, port: int, workers: Optional[int], threads: Optional[int]) -> subprocess.Popen:
+    env = dict(os.environ, PORT=str(port))
+    if kind == "dev":
+        command = [sys.executable, "main.py"]
+    elif kind == "asgi":
+        command = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port)]
+        if workers:
+            command += ["--workers", str(workers)]
+    else:
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app", "--bind", f"127.0.0.1:{port}"]
+        if workers:
+            env["WEB_CONCURRENCY"] = str(workers)
+        if threads:
+            env["GUNICORN_THREADS"] = str(threads)
+    server = subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                # Give post_fork pre-warming a moment on every worker
+                time.sleep(2)
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{kind} server did not start")
+
+
+def drive(port: int, clients: int, seconds: float, request: Callable[[int], tuple]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client(number: int) -> None:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        sent = 0
+        while time.monotonic() < deadline:
+            method, path, body = request(number * 100000 + sent)
+            sent += 1
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                ok = False
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else float("nan")
+    return {
+        "requests/s": len(latencies) / elapsed,
+        "p50 ms": percentile(0.5),
+        "p99 ms": percentile(0.99),
+        "errors": errors[0]
+    }
+
+
+def run_scenarios(port: int, clients: int, seconds: float, csrs: List[str]) -> Dict[str, Dict[str, Any]]:
+    results = {
+        "validate": drive(port, clients, seconds, lambda n: ("POST", "/validate", json.dumps({"csr": csrs[n % len(csrs)]}))),
+        "generate": drive(port, clients, seconds, lambda n: ("POST", "/generate", json.dumps(GENERATE_BODY)))
+    }
+
+    # Keep slow 4096-bit requests in flight while measuring /health
+    stop = threading.Event()
+    slow_body = json.dumps({**GENERATE_BODY, "key_type": "RSA", "key_size": 4096})
+
+    def slow_client() -> None:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        while not stop.is_set():
+            try:
+                connection.request("POST", "/generate", body=slow_body, headers={"Content-Type": "application/json"})
+                connection.getresponse().read()
+            except OSError:
+                return
+
+    slow = [threading.Thread(target=slow_client) for _ in range(2)]
+    for thread in slow:
+        thread.start()
+    time.sleep(0.5)
+    results["stall"] = drive(port, max(1, clients // 4), seconds, lambda n: ("GET", "/health", None))
+    stop.set()
+    for thread in slow:
+        thread.join()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the development and production servers")
+    parser.add_argument("--servers", nargs="+", choices=["dev", "gunicorn", "asgi"], default=["dev", "gunicorn"])
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent keep-alive clients")
+    parser.add_argument("--seconds", type=float, default=10, help="Duration of each scenario")
+    parser.add_argument("--workers", type=int, help="gunicorn or uvicorn worker processes")
+    parser.add_argument("--threads", type=int, help="Threads per gunicorn worker (default: gunicorn.conf.py)")
+    args = parser.parse_args()
+
+    csrs = [csr_utils.generate_csr(f"host{i}.example.com", "Example", key_type="EC-P256")[0] for i in range(200)]
+    print(f"CPUs: {os.cpu_count()}, clients: {args.clients}, {args.seconds:g}s per scenario")
+    print(f"{'server':<10} {'scenario':<10} {'requests/s':>11} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for kind in args.servers:
+        port = free_port()
+        server = start_server(kind, port, args.workers, args.threads)
+        try:
+            for scenario, result in run_scenarios(port, args.clients, args.seconds, csrs).items():
+                print(
+                    f"{kind:<10} {scenario:<10} {result['requests/s']:>11.1f} {result['p50 ms']:>9.1f} "
+                    f"{result['p99 ms']:>9.1f} {result['errors']:>7}"
+                )
+        finally:
+            server.terminate()
+            server.wait(30)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+import argparse
+import csv
+import hashlib
+import os
+import sys
+from concurrent.futures import Future, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+
+import csr_utils
+import inventory
+from crypto_workers import CryptoWorkers
+
+# PyYAML is only needed for YAML manifests
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+DEFAULT_ORGANIZATION = "Network International Arabia Limited Co."
+DEFAULT_COUNTRY = "SA"
+
+
+def load_manifest(path: str) -> List[Dict[str, Any]]:
+    """
+    Read the entries of a CSV or YAML generation manifest.
+
+    A CSV manifest has a header row; a YAML manifest is a list of mappings,
+    or a mapping with the list under "csrs". Each entry needs a service and
+    an environment, and may set domain, organization, country, key_type and
+    key_size.
+
+    Args:
+        path: The manifest path, ending in .csv, .yaml or .yml
+
+    Returns:
+        The raw manifest entries
+
+    Raises:
+        ValueError: If the manifest format is not supported or malformed
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="") as f:
+        if extension == ".csv":
+            return [dict(row) for row in csv.DictReader(f)]
+        if extension in (".yaml", ".yml"):
+            if yaml is None:
+                raise ValueError("PyYAML is required to read YAML manifests (pip install pyyaml)")
+            data = yaml.safe_load(f)
+            if isinstance(data, dict):
+                data = data.get("csrs")
+            if not isinstance(data, list) or not all(isinstance(entry, dict) for entry in data):
+                raise ValueError("A YAML manifest must be a list of entries, or a mapping with a 'csrs' list")
+            return data
+    raise ValueError(f"Unsupported manifest format: {path} (expected .csv, .yaml or .yml)")
+
+
+def parse_entry(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate a manifest entry and fill in defaults.
+
+    Args:
+        raw: One manifest entry
+
+    Returns:
+        The entry with service, environment, domain, organization, country,
+        key_type and key_size set; a missing domain is suggested with
+        csr_utils.suggest_domain_name
+
+    Raises:
+        ValueError: If a required field is missing or a value is invalid
+    """
+    def value(name: str) -> Optional[str]:
+        field = raw.get(name)
+        return str(field).strip() if field not in (None, "") else None
+
+    service = value("service")
+    environment = (value("environment") or "").upper()
+    if not service:
+        raise ValueError("Missing required field: service")
+    if environment not in inventory.ENVIRONMENT_DIRS:
+        raise ValueError(f"Environment must be one of {', '.join(inventory.ENVIRONMENT_DIRS)}")
+
+    return {
+        "service": service,
+        "environment": environment,
+        "domain": value("domain") or csr_utils.suggest_domain_name(service, environment),
+        "organization": value("organization") or DEFAULT_ORGANIZATION,
+        "country": value("country") or DEFAULT_COUNTRY,
+        "key_type": csr_utils.normalize_key_type(value("key_type") or "RSA"),
+        "key_size": int(value("key_size") or 2048)
+    }
+
+
+def entry_paths(base: str, entry: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Return the key and CSR paths of an entry in the Prod-CSR/UAT-CSR layout.
+
+    Args:
+        base: The repository root
+        entry: A parsed manifest entry
+
+    Returns:
+        A tuple containing (key_path, csr_path)
+    """
+    directory = os.path.join(base, inventory.ENVIRONMENT_DIRS[entry["environment"]], entry["service"])
+    stem = f"saudi-{entry['service'].lower()}-{entry['environment'].lower()}"
+    return os.path.join(directory, f"{stem}.key"), os.path.join(directory, f"{stem}-csr.csr")
+
+
+def _expected_key(entry: Dict[str, Any]) -> Tuple[str, Optional[str], Optional[int]]:
+    # The (key_type, curve, key_size) parse_csr reports for the entry's key
+    key_type = entry["key_type"]
+    if key_type == "RSA":
+        return "RSA", None, entry["key_size"]
+    if key_type in csr_utils.EC_KEY_TYPES:
+        return "EC", f"P-{key_type[len('EC-P'):]}", None
+    return key_type, None, None
+
+
+def is_up_to_date(entry: Dict[str, Any], key_path: str, csr_path: str) -> bool:
+    """
+    Check whether an entry's key and CSR already exist and match the entry.
+
+    The CSR must verify, carry the entry's subject and key type, and hold
+    the public key of the private key next to it.
+
+    Args:
+        entry: A parsed manifest entry
+        key_path: The private key path
+        csr_path: The CSR path
+
+    Returns:
+        True if nothing needs to be generated
+    """
+    try:
+        with open(csr_path, "rb") as f:
+            info = csr_utils.parse_csr(f.read())
+        with open(key_path, "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None)
+    except (OSError, ValueError, TypeError):
+        return False
+
+    subject = info["subject"]
+    if not info["is_valid"] or (subject.get("CN"), subject.get("O"), subject.get("C")) != \
+            (entry["domain"], entry["organization"], entry["country"]):
+        return False
+
+    key_type, curve, key_size = _expected_key(entry)
+    if info["key_type"] != key_type or info["curve"] != curve or key_size not in (None, info["key_size"]):
+        return False
+
+    spki = private_key.public_key().public_bytes(
+        serialization.Encoding.DER,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return hashlib.sha256(spki).hexdigest() == info["spki_sha256"]
+
+
+def generate_all(
+    entries: List[Dict[str, Any]],
+    base: str = ".",
+    workers: Optional[int] = None,
+    force: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Generate the keys and CSRs of manifest entries that are not up to date.
+
+    Keys and CSRs are generated in parallel by worker processes, and each
+    file is written atomically, key first, as its result arrives.
+
+    Args:
+        entries: Raw manifest entries
+        base: The repository root
+        workers: Number of worker processes (default: number of CPUs)
+        force: Regenerate entries that are already up to date
+
+    Returns:
+        One result per entry, in manifest order, with the entry fields, the
+        "key_path" and "csr_path", and a "status" of "generated",
+        "up_to_date" or "failed" (with an "error")
+    """
+    results: List[Dict[str, Any]] = []
+    pending: Dict[Future, Dict[str, Any]] = {}
+    seen = set()
+    pool = CryptoWorkers(max_workers=workers)
+    try:
+        for index, raw in enumerate(entries):
+            try:
+                entry = parse_entry(raw)
+            except ValueError as e:
+                results.append({**raw, "status": "failed", "error": f"Entry {index + 1}: {str(e)}"})
+                continue
+
+            key_path, csr_path = entry_paths(base, entry)
+            result = {**entry, "key_path": key_path, "csr_path": csr_path}
+            results.append(result)
+            if csr_path in seen:
+                result.update(status="failed", error=f"Entry {index + 1}: duplicate of an earlier entry")
+                continue
+            seen.add(csr_path)
+
+            if not force and is_up_to_date(entry, key_path, csr_path):
+                result["status"] = "up_to_date"
+                continue
+
+            future = pool.submit(
+                csr_utils.generate_csr,
+                block=True,
+                common_name=entry["domain"],
+                organization=entry["organization"],
+                country=entry["country"],
+                key_size=entry["key_size"],
+                key_type=entry["key_type"]
+            )
+            pending[future] = result
+
+        for future in as_completed(pending):
+            result = pending[future]
+            try:
+                csr_pem, key_pem = future.result()
+                os.makedirs(os.path.dirname(result["csr_path"]), exist_ok=True)
+                inventory.write_file(result["key_path"], key_pem, mode=0o600)
+                inventory.write_file(result["csr_path"], csr_pem)
+                result["status"] = "generated"
+            except Exception as e:
+                result.update(status="failed", error=str(e))
+    finally:
+        pool.shutdown()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate keys and CSRs from a CSV or YAML manifest")
+    parser.add_argument("manifest", nargs="?", help="Manifest of service, environment and optional domain")
+    parser.add_argument("--service", help="Generate a single entry for this service instead of a manifest")
+    parser.add_argument("--environment", help="Environment of the single entry (PROD or UAT)")
+    parser.add_argument("--domain", help="Domain of the single entry (default: suggested)")
+    parser.add_argument("--base", default=".", help="Repository root holding Prod-CSR and UAT-CSR (default: .)")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--force", action="store_true", help="Regenerate entries that are already up to date")
+    args = parser.parse_args(argv)
+
+    if args.service:
+        entries = [{"service": args.service, "environment": args.environment, "domain": args.domain}]
+    elif args.manifest:
+        try:
+            entries = load_manifest(args.manifest)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    else:
+        parser.error("a manifest or --service is required")
+
+    results = generate_all(entries, base=args.base, workers=args.workers, force=args.force)
+    for result in results:
+        label = f"{result.get('environment')} {result.get('service')}"
+        if result["status"] == "failed":
+            print(f"failed      {label}: {result['error']}")
+        else:
+            print(f"{result['status']:<11} {label}: {result['domain']} -> {result['csr_path']}")
+
+    counts = {status: sum(1 for result in results if result["status"] == status)
+              for status in ("generated", "up_to_date", "failed")}
+    print(", ".join(f"{count} {status.replace('_', ' ')}" for status, count in counts.items()))
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import gzip
+from typing import List, Optional
+
+from werkzeug.http import parse_accept_header
+
+# brotli is installed from requirements.txt; without it only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Fast settings: responses are compressed per request, so latency matters more than ratio
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+
+def available_encodings() -> List[str]:
+    """Return the supported content codings, most preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick a content coding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: The header value, possibly with q-values and "*"
+
+    Returns:
+        "br" or "gzip", preferring brotli when the client rates both equally,
+        or None if the client accepts neither
+    """
+    accept = parse_accept_header(accept_encoding or "")
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = accept[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    Compress a response body.
+
+    Args:
+        data: The body
+        encoding: A coding returned by negotiate
+
+    Returns:
+        The compressed body
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
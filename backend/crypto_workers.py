@@ -0,0 +1,163 @@
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+
+class WorkersBusyError(RuntimeError):
+    """Raised when the crypto worker queue is full."""
+
+
+class CryptoWorkers:
+    """
+    A bounded process pool for CPU-heavy crypto work.
+
+    Key generation and CSR signing are submitted here so that request threads
+    only assemble the subject and serialize the result. The executor is created
+    lazily on first use, which keeps it safe to import this module before a
+    pre-fork server forks its workers. If a worker process dies, the broken
+    executor is replaced by a fresh one on the next submit.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        start_method: str = "spawn"
+    ):
+        """
+        Create a crypto worker pool.
+
+        Args:
+            max_workers: Number of worker processes (default: number of CPUs)
+            max_pending: Maximum number of queued or running tasks (default: 4 per worker)
+            start_method: The multiprocessing start method for worker processes
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def start(self) -> None:
+        """Create the worker processes if they are not already running."""
+        self._get_executor()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, block: bool = False, **kwargs: Any) -> Future:
+        """
+        Submit a task to the worker processes.
+
+        Args:
+            fn: A picklable, module-level function
+            *args: Positional arguments for the function
+            block: Wait for a free slot instead of failing when the queue is full
+            **kwargs: Keyword arguments for the function
+
+        Returns:
+            A future for the task result
+
+        Raises:
+            WorkersBusyError: If max_pending tasks are already queued or running
+        """
+        if not self._slots.acquire(blocking=block):
+            with self._lock:
+                self._rejected += 1
+            raise WorkersBusyError("Crypto workers are busy, please retry later")
+
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                # A worker died since the last task; start over with new processes
+                self._discard_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._pending += 1
+        future.add_done_callback(functools.partial(self._task_done, executor))
+        return future
+
+    def warm_up(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """
+        Start every worker process and run a task once on each.
+
+        Worker processes are otherwise spawned on demand, so the first
+        requests would pay for starting them and importing the crypto modules.
+
+        Args:
+            fn: A cheap, picklable, module-level function that loads the crypto state
+            *args: Positional arguments for the function
+            **kwargs: Keyword arguments for the function
+        """
+        for future in [self.submit(fn, *args, block=True, **kwargs) for _ in range(self.max_workers)]:
+            future.result()
+
+    def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Submit a task and wait for its result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report worker pool statistics.
+
+        Returns:
+            A dictionary of worker pool statistics
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "running": self._executor is not None,
+                "pending": self._pending,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected
+            }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method)
+                )
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _task_done(self, executor: ProcessPoolExecutor, future: Future) -> None:
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            self._pending -= 1
+            if error is not None or future.cancelled():
+                self._failed += 1
+            else:
+                self._completed += 1
+        if isinstance(error, BrokenProcessPool):
+            # The task's worker died, so its executor cannot run anything else
+            self._discard_executor(executor)
+        self._slots.release()
@@ -1,20 +1,188 @@
+import base64
+import binascii
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from abc import ABC, abstractmethod
+from functools import cached_property
 import OpenSSL.crypto as crypto
-from typing import Dict, Any, Optional, Tuple
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.x509.oid import NameOID, SignatureAlgorithmOID
+from typing import BinaryIO, Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
-def generate_csr(
+from ttl_cache import TTLCache
+
+# pyarrow is only needed for Parquet export
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Supported key types for CSR generation
+KEY_TYPES = ("RSA", "EC-P256", "EC-P384", "EC-P521", "ED25519")
+
+# Elliptic curve and signature hash for each EC key type
+EC_KEY_TYPES = {
+    "EC-P256": (ec.SECP256R1, hashes.SHA256),
+    "EC-P384": (ec.SECP384R1, hashes.SHA384),
+    "EC-P521": (ec.SECP521R1, hashes.SHA512),
+}
+
+# NIST names for the curves reported by parse_csr
+CURVE_NAMES = {
+    "secp256r1": "P-256",
+    "secp384r1": "P-384",
+    "secp521r1": "P-521",
+}
+
+# OpenSSL names for the signature algorithms reported by signature_algorithm_name
+SIGNATURE_ALGORITHM_NAMES = {
+    SignatureAlgorithmOID.RSA_WITH_MD5: "md5WithRSAEncryption",
+    SignatureAlgorithmOID.RSA_WITH_SHA1: "sha1WithRSAEncryption",
+    SignatureAlgorithmOID.RSA_WITH_SHA224: "sha224WithRSAEncryption",
+    SignatureAlgorithmOID.RSA_WITH_SHA256: "sha256WithRSAEncryption",
+    SignatureAlgorithmOID.RSA_WITH_SHA384: "sha384WithRSAEncryption",
+    SignatureAlgorithmOID.RSA_WITH_SHA512: "sha512WithRSAEncryption",
+    SignatureAlgorithmOID.RSASSA_PSS: "RSASSA-PSS",
+    SignatureAlgorithmOID.ECDSA_WITH_SHA1: "ecdsa-with-SHA1",
+    SignatureAlgorithmOID.ECDSA_WITH_SHA224: "ecdsa-with-SHA224",
+    SignatureAlgorithmOID.ECDSA_WITH_SHA256: "ecdsa-with-SHA256",
+    SignatureAlgorithmOID.ECDSA_WITH_SHA384: "ecdsa-with-SHA384",
+    SignatureAlgorithmOID.ECDSA_WITH_SHA512: "ecdsa-with-SHA512",
+    SignatureAlgorithmOID.DSA_WITH_SHA1: "dsa-with-sha1",
+    SignatureAlgorithmOID.DSA_WITH_SHA224: "dsa-with-sha224",
+    SignatureAlgorithmOID.DSA_WITH_SHA256: "dsa-with-sha256",
+    SignatureAlgorithmOID.ED25519: "ed25519",
+    SignatureAlgorithmOID.ED448: "ed448",
+}
+
+# One PEM-encoded CSR, with either the standard or the legacy "NEW" header
+PEM_CSR_PATTERN = re.compile(
+    rb"-----BEGIN (?:NEW )?CERTIFICATE REQUEST-----(.*?)-----END (?:NEW )?CERTIFICATE REQUEST-----",
+    re.DOTALL
+)
+
+# Armour lines of a PEM-encoded CSR, used when scanning bundles
+PEM_CSR_BEGIN = re.compile(rb"-----BEGIN (?:NEW )?CERTIFICATE REQUEST-----")
+PEM_CSR_END = re.compile(rb"-----END (?:NEW )?CERTIFICATE REQUEST-----")
+
+# Types a CSR may be given as: PEM or base64 text, or PEM or DER bytes
+CSR_DATA_TYPES = (str, bytes, bytearray, memoryview)
+
+# Longest PEM block accepted when scanning bundles; CSRs are a few KB
+MAX_PEM_BLOCK_SIZE = 256 * 1024
+
+# Minimum key sizes that are not considered weak, by parsed key type
+MINIMUM_KEY_SIZES = {"RSA": 2048, "DSA": 2048, "EC": 256}
+
+# Signature hashes that are deprecated for CSRs
+DEPRECATED_HASHES = ("md2", "md4", "md5", "sha1")
+
+# Number of records exported at a time; one Parquet row group or columnar line each
+EXPORT_CHUNK_SIZE = 10000
+
+# Header "format" of the gzip-compressed columnar JSON export
+COLUMNAR_FORMAT = "csr-columns"
+
+# Parsed CSRs keyed by the SHA-256 of their DER encoding
+_parse_cache = TTLCache(max_entries=4096, ttl=3600)
+
+# Signature verification results keyed by public key, signed content, algorithm and signature
+_verify_cache = TTLCache(max_entries=16384)
+
+PrivateKey = Union[rsa.RSAPrivateKey, ec.EllipticCurvePrivateKey, ed25519.Ed25519PrivateKey]
+
+def normalize_key_type(key_type: str) -> str:
+    """
+    Normalize a key type name.
+    
+    Args:
+        key_type: The key type, case-insensitive (e.g. "rsa", "EC-P256", "ed25519")
+        
+    Returns:
+        The key type as listed in KEY_TYPES
+        
+    Raises:
+        ValueError: If the key type is not supported
+    """
+    normalized = str(key_type).strip().upper()
+    if normalized not in KEY_TYPES:
+        raise ValueError(f"Unsupported key type: {key_type} (expected one of {', '.join(KEY_TYPES)})")
+    return normalized
+
+def generate_private_key(key_size: int = 2048, key_type: str = "RSA") -> PrivateKey:
+    """
+    Generate a private key.
+    
+    Args:
+        key_size: The RSA key size in bits (default: 2048, ignored for other key types)
+        key_type: The key type, one of KEY_TYPES (default: RSA)
+        
+    Returns:
+        The generated private key
+    """
+    key_type = normalize_key_type(key_type)
+    if key_type == "RSA":
+        return rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+    if key_type == "ED25519":
+        return ed25519.Ed25519PrivateKey.generate()
+    curve, _ = EC_KEY_TYPES[key_type]
+    return ec.generate_private_key(curve())
+
+def generate_private_key_pem(key_size: int = 2048, key_type: str = "RSA") -> str:
+    """
+    Generate a private key in PEM format.
+    
+    The PEM form can be passed between processes, unlike a key object.
+    
+    Args:
+        key_size: The RSA key size in bits (default: 2048, ignored for other key types)
+        key_type: The key type, one of KEY_TYPES (default: RSA)
+        
+    Returns:
+        The private key in PEM format
+    """
+    key = generate_private_key(key_size, key_type)
+    return _private_key_to_pem(key)
+
+def _private_key_to_pem(key: PrivateKey) -> str:
+    return key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    ).decode('utf-8')
+
+def _signature_hash(key: PrivateKey) -> Optional[hashes.HashAlgorithm]:
+    # Ed25519 signs the message directly; ECDSA uses a hash matching the curve
+    if isinstance(key, ed25519.Ed25519PrivateKey):
+        return None
+    if isinstance(key, ec.EllipticCurvePrivateKey):
+        for curve, hash_algorithm in EC_KEY_TYPES.values():
+            if isinstance(key.curve, curve):
+                return hash_algorithm()
+    return hashes.SHA256()
+
+def build_csr(
+    key: Union[PrivateKey, crypto.PKey, str],
     common_name: str,
     organization: str,
     organizational_unit: Optional[str] = None,
     locality: Optional[str] = None,
     state: Optional[str] = None,
     country: str = "US",
-    email: Optional[str] = None,
-    key_size: int = 2048
+    email: Optional[str] = None
 ) -> Tuple[str, str]:
     """
-    Generate a Certificate Signing Request (CSR) and private key.
+    Build and sign a CSR for an existing private key.
     
     Args:
+        key: The private key used to sign the CSR, or the key in PEM format
         common_name: The domain name for the certificate
         organization: The organization name
         organizational_unit: The organizational unit (optional)
@@ -22,105 +190,956 @@ def generate_csr(
         state: The state or province (optional)
         country: The two-letter country code
         email: The email address (optional)
-        key_size: The RSA key size in bits (default: 2048)
         
     Returns:
         A tuple containing (csr_pem, key_pem)
     """
-    # Create a key pair
-    key = crypto.PKey()
-    key.generate_key(crypto.TYPE_RSA, key_size)
-    
-    # Create a CSR
-    req = crypto.X509Req()
-    subject = req.get_subject()
+    if isinstance(key, str):
+        key = serialization.load_pem_private_key(key.encode('utf-8'), password=None)
+    elif isinstance(key, crypto.PKey):
+        key = key.to_cryptography_key()
     
     # Set subject fields
-    subject.CN = common_name
-    subject.O = organization
+    attributes = [
+        x509.NameAttribute(NameOID.COMMON_NAME, common_name),
+        x509.NameAttribute(NameOID.ORGANIZATION_NAME, organization),
+    ]
     if organizational_unit:
-        subject.OU = organizational_unit
+        attributes.append(x509.NameAttribute(NameOID.ORGANIZATIONAL_UNIT_NAME, organizational_unit))
     if locality:
-        subject.L = locality
+        attributes.append(x509.NameAttribute(NameOID.LOCALITY_NAME, locality))
     if state:
-        subject.ST = state
-    subject.C = country
+        attributes.append(x509.NameAttribute(NameOID.STATE_OR_PROVINCE_NAME, state))
+    attributes.append(x509.NameAttribute(NameOID.COUNTRY_NAME, country))
     if email:
-        subject.emailAddress = email
+        attributes.append(x509.NameAttribute(NameOID.EMAIL_ADDRESS, email))
     
     # Sign the CSR with the private key
-    req.set_pubkey(key)
-    req.sign(key, 'sha256')
+    req = x509.CertificateSigningRequestBuilder().subject_name(x509.Name(attributes)).sign(key, _signature_hash(key))
     
     # Convert to PEM format
-    csr_pem = crypto.dump_certificate_request(crypto.FILETYPE_PEM, req).decode('utf-8')
-    key_pem = crypto.dump_privatekey(crypto.FILETYPE_PEM, key).decode('utf-8')
+    csr_pem = req.public_bytes(serialization.Encoding.PEM).decode('utf-8')
+    key_pem = _private_key_to_pem(key)
     
     return csr_pem, key_pem
 
-def parse_csr(csr_pem: str) -> Dict[str, Any]:
+def generate_csr(
+    common_name: str,
+    organization: str,
+    organizational_unit: Optional[str] = None,
+    locality: Optional[str] = None,
+    state: Optional[str] = None,
+    country: str = "US",
+    email: Optional[str] = None,
+    key_size: int = 2048,
+    key_type: str = "RSA"
+) -> Tuple[str, str]:
     """
-    Parse a CSR and extract its information.
+    Generate a Certificate Signing Request (CSR) and private key.
+    
+    Args:
+        common_name: The domain name for the certificate
+        organization: The organization name
+        organizational_unit: The organizational unit (optional)
+        locality: The city or locality (optional)
+        state: The state or province (optional)
+        country: The two-letter country code
+        email: The email address (optional)
+        key_size: The RSA key size in bits (default: 2048, ignored for other key types)
+        key_type: The key type, one of KEY_TYPES (default: RSA)
+        
+    Returns:
+        A tuple containing (csr_pem, key_pem)
+    """
+    key = generate_private_key(key_size, key_type)
+    return build_csr(
+        key,
+        common_name=common_name,
+        organization=organization,
+        organizational_unit=organizational_unit,
+        locality=locality,
+        state=state,
+        country=country,
+        email=email
+    )
+
+def describe_public_key(pubkey: crypto.PKey) -> Tuple[str, Optional[str]]:
+    """
+    Describe the type of a public key.
+    
+    Args:
+        pubkey: The public key of a CSR
+        
+    Returns:
+        A tuple containing (key_type, curve), where key_type is "RSA", "EC",
+        "ED25519" or "DSA" and curve is the NIST curve name for EC keys
+    """
+    key = pubkey.to_cryptography_key()
+    if isinstance(key, ec.EllipticCurvePublicKey):
+        return "EC", CURVE_NAMES.get(key.curve.name, key.curve.name)
+    if isinstance(key, ed25519.Ed25519PublicKey):
+        return "ED25519", None
+    if pubkey.type() == crypto.TYPE_DSA:
+        return "DSA", None
+    return "RSA", None
+
+def signature_algorithm_name(csr: crypto.X509Req) -> str:
+    """
+    Get the signature algorithm name of a CSR.
+    
+    Args:
+        csr: The parsed CSR
+        
+    Returns:
+        The OpenSSL name of the signature algorithm (e.g. "sha256WithRSAEncryption"),
+        or the dotted OID for algorithms without a known name
+    """
+    oid = csr.to_cryptography().signature_algorithm_oid
+    return SIGNATURE_ALGORITHM_NAMES.get(oid, oid.dotted_string)
+
+def pem_to_der(csr_pem: Union[str, bytes]) -> bytes:
+    """
+    Decode the first PEM-encoded CSR in a string.
+    
+    Whitespace and line wrapping inside the PEM block do not affect the result.
     
     Args:
         csr_pem: The CSR in PEM format
         
     Returns:
-        A dictionary containing CSR information
+        The DER encoding of the CSR
+        
+    Raises:
+        ValueError: If no PEM-encoded CSR is found
+    """
+    data = csr_pem.encode('utf-8') if isinstance(csr_pem, str) else csr_pem
+    match = PEM_CSR_PATTERN.search(data)
+    if match is None:
+        raise ValueError("No PEM-encoded CSR found")
+    try:
+        return base64.b64decode(b"".join(match.group(1).split()), validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Malformed PEM data: {str(e)}")
+
+def check_csr_data(csr_data: Any) -> None:
+    """
+    Check that a CSR is given as text or bytes.
+    
+    Args:
+        csr_data: The CSR as received, e.g. a value from a JSON request body
+        
+    Raises:
+        ValueError: If the CSR is of any other type
+    """
+    if not isinstance(csr_data, CSR_DATA_TYPES):
+        raise ValueError(f"CSR data must be a string or bytes, not {type(csr_data).__name__}")
+
+def csr_to_der(csr_data: Union[str, bytes]) -> bytes:
+    """
+    Get the DER encoding of a CSR given as PEM, DER or bare base64.
+    
+    Args:
+        csr_data: The CSR as PEM text or bytes, raw DER bytes, or unarmoured base64
+        
+    Returns:
+        The DER encoding of the CSR
+        
+    Raises:
+        ValueError: If the data is not text or bytes, or not recognisable as a CSR encoding
     """
+    check_csr_data(csr_data)
+    data = csr_data.encode('utf-8') if isinstance(csr_data, str) else bytes(csr_data)
+    if PEM_CSR_BEGIN.search(data):
+        return pem_to_der(data)
+    
+    # DER starts with an ASN.1 SEQUENCE tag
+    if data[:1] == b"\x30":
+        return data
+    
     try:
-        # Parse the CSR
-        csr = crypto.load_certificate_request(crypto.FILETYPE_PEM, csr_pem)
+        der = base64.b64decode(b"".join(data.split()), validate=True)
+    except binascii.Error:
+        der = b""
+    if der[:1] != b"\x30":
+        raise ValueError("Data is neither a PEM nor a DER encoded CSR")
+    return der
+
+def csr_digest(csr_pem: Union[str, bytes]) -> str:
+    """
+    Compute the content address of a CSR.
+    
+    Args:
+        csr_pem: The CSR in PEM or DER format
         
-        # Extract subject information
-        subject = csr.get_subject()
-        subject_dict = {}
-        for key, value in subject.get_components():
-            subject_dict[key.decode('utf-8')] = value.decode('utf-8')
+    Returns:
+        The hex SHA-256 digest of the CSR's DER encoding
+    """
+    return hashlib.sha256(csr_to_der(csr_pem)).hexdigest()
+
+def private_key_pem_to_der(key_pem: str) -> bytes:
+    """
+    Convert a PEM private key to PKCS#8 DER.
+    
+    Args:
+        key_pem: The private key in PEM format
+        
+    Returns:
+        The private key in unencrypted PKCS#8 DER format
+    """
+    key = serialization.load_pem_private_key(key_pem.encode('utf-8'), password=None)
+    return key.private_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+
+def configure_parse_cache(max_entries: int = 4096, ttl: Optional[float] = 3600) -> None:
+    """
+    Replace the parse cache with an empty one of the given size.
+    
+    Args:
+        max_entries: Maximum number of parsed CSRs kept
+        ttl: Seconds a parsed CSR is kept (None: until evicted)
+    """
+    global _parse_cache
+    _parse_cache = TTLCache(max_entries=max_entries, ttl=ttl)
+
+def parse_cache_stats() -> Dict[str, Any]:
+    """
+    Report parse cache size and hit-rate statistics.
+    
+    Returns:
+        A dictionary of cache statistics
+    """
+    return _parse_cache.stats()
+
+def invalidate_parse_cache(csr_pem: Optional[Union[str, bytes]] = None) -> bool:
+    """
+    Drop cached parse results.
+    
+    Args:
+        csr_pem: The CSR to forget, in PEM or DER format (default: forget every CSR)
         
-        # Get public key information
-        pubkey = csr.get_pubkey()
-        key_size = pubkey.bits()
+    Returns:
+        True if anything was removed, False otherwise
+    """
+    if csr_pem is None:
+        removed = len(_parse_cache) > 0
+        _parse_cache.clear()
+        return removed
+    return _parse_cache.delete(csr_digest(csr_pem))
+
+def lookup_parsed_csr(digest: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the cached parse_csr result of a CSR without the CSR itself.
+
+    Args:
+        digest: The hex SHA-256 digest of the CSR's DER encoding, as returned by csr_digest
+
+    Returns:
+        The parse_csr result, or None if the CSR is not cached
+
+    Raises:
+        ValueError: If the CSR was cached as invalid
+    """
+    cached = _parse_cache.get(digest)
+    if isinstance(cached, ValueError):
+        raise ValueError(str(cached))
+    return _copy_info(cached) if cached is not None else None
+
+def configure_verify_cache(max_entries: int = 16384, ttl: Optional[float] = None) -> None:
+    """
+    Replace the signature verification cache with an empty one of the given size.
+    
+    Args:
+        max_entries: Maximum number of verification results kept
+        ttl: Seconds a result is kept (None: until evicted)
+    """
+    global _verify_cache
+    _verify_cache = TTLCache(max_entries=max_entries, ttl=ttl)
+
+def verify_cache_stats() -> Dict[str, Any]:
+    """
+    Report signature verification cache size and hit-rate statistics.
+    
+    Returns:
+        A dictionary of cache statistics
+    """
+    return _verify_cache.stats()
+
+def _der_element(der: bytes, offset: int) -> Tuple[int, int]:
+    # Return the (content start, end) of the DER element at offset
+    length = der[offset + 1]
+    start = offset + 2
+    if length & 0x80:
+        length_bytes = length & 0x7F
+        length = int.from_bytes(der[start:start + length_bytes], 'big')
+        start += length_bytes
+    if start + length > len(der):
+        raise ValueError("Truncated DER element")
+    return start, start + length
+
+def _signed_parts(der: bytes) -> Tuple[bytes, bytes, bytes, bytes]:
+    """
+    Split a DER CSR into its public key, signed content, signature algorithm and signature.
+    
+    Args:
+        der: The DER encoding of the CSR
         
-        # Get signature algorithm
-        sig_algo = csr.get_signature_algorithm().decode('utf-8')
+    Returns:
+        A tuple containing (spki, certification_request_info, signature_algorithm, signature)
+    """
+    outer_start, _ = _der_element(der, 0)
+    info_start, info_end = _der_element(der, outer_start)
+    
+    # CertificationRequestInfo: version, subject, subjectPKInfo, attributes
+    _, position = _der_element(der, info_start)
+    _, position = _der_element(der, position)
+    _, spki_end = _der_element(der, position)
+    spki = der[position:spki_end]
+    
+    # Followed by the signature AlgorithmIdentifier and the signature BIT STRING
+    _, position = _der_element(der, info_end)
+    signature_start, signature_end = _der_element(der, position)
+    return spki, der[outer_start:info_end], der[info_end:position], der[signature_start:signature_end]
+
+def spki_fingerprint(csr_data: Union[str, bytes]) -> str:
+    """
+    Fingerprint the public key of a CSR.
+    
+    Args:
+        csr_data: The CSR in PEM or DER format
         
-        # Verify the signature
-        is_valid = csr.verify(pubkey)
+    Returns:
+        The hex SHA-256 digest of the DER SubjectPublicKeyInfo
         
-        return {
-            "subject": subject_dict,
-            "key_size": key_size,
-            "signature_algorithm": sig_algo,
-            "is_valid": is_valid
-        }
+    Raises:
+        ValueError: If the data is not a well-formed CSR
+    """
+    try:
+        spki = _signed_parts(csr_to_der(csr_data))[0]
+    except IndexError:
+        raise ValueError("Invalid CSR: truncated DER structure")
+    return hashlib.sha256(spki).hexdigest()
+
+def rsa_modulus(csr_data: Union[str, bytes]) -> Optional[int]:
+    """
+    Extract the RSA modulus of a CSR's public key.
     
-    except Exception as e:
+    Args:
+        csr_data: The CSR in PEM or DER format
+        
+    Returns:
+        The modulus, or None if the CSR does not hold an RSA key
+        
+    Raises:
+        ValueError: If the data is not a valid CSR
+    """
+    try:
+        public_key = x509.load_der_x509_csr(csr_to_der(csr_data)).public_key()
+    except ValueError as e:
         raise ValueError(f"Invalid CSR: {str(e)}")
+    if not isinstance(public_key, rsa.RSAPublicKey):
+        return None
+    return public_key.public_numbers().n
 
-def validate_csr(csr_pem: str) -> bool:
+def verify_signature(
+    csr: crypto.X509Req,
+    pubkey: Optional[crypto.PKey] = None,
+    der: Optional[bytes] = None
+) -> bool:
     """
-    Validate a CSR.
+    Verify the signature of a CSR, using cached results where possible.
+    
+    Results are keyed by the public key fingerprint plus the digests of the
+    signed CertificationRequestInfo, the signature algorithm and the
+    signature, so a repeated CSR skips the public key operation whatever its
+    outer encoding.
     
     Args:
-        csr_pem: The CSR in PEM format
+        csr: The parsed CSR
+        pubkey: The CSR's public key, if already extracted
+        der: The CSR's DER encoding, if already known
         
     Returns:
-        True if the CSR is valid, False otherwise
+        True if the signature verifies, False otherwise
     """
+    pubkey = pubkey or csr.get_pubkey()
+    if der is None:
+        der = crypto.dump_certificate_request(crypto.FILETYPE_ASN1, csr)
+    
     try:
-        # Parse the CSR
-        csr = crypto.load_certificate_request(crypto.FILETYPE_PEM, csr_pem)
+        key = tuple(hashlib.sha256(part).digest() for part in _signed_parts(der))
+    except (IndexError, ValueError):
+        key = None
+    
+    result = _verify_cache.get(key) if key is not None else None
+    if result is None:
+        try:
+            result = bool(csr.verify(pubkey))
+        except crypto.Error:
+            result = False
+        if key is not None:
+            _verify_cache.set(key, result)
+    return result
+
+def _copy_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    return {**info, "subject": dict(info["subject"])}
+
+def _subject_dict(csr: crypto.X509Req) -> Dict[str, str]:
+    subject_dict = {}
+    for key, value in csr.get_subject().get_components():
+        subject_dict[key.decode('utf-8')] = value.decode('utf-8')
+    return subject_dict
+
+def _parse_loaded_csr(csr: crypto.X509Req, verify: bool = True, der: Optional[bytes] = None) -> Dict[str, Any]:
+    # Extract subject information
+    subject_dict = _subject_dict(csr)
+    
+    # Get public key information
+    pubkey = csr.get_pubkey()
+    key_type, curve = describe_public_key(pubkey)
+    key_size = pubkey.bits()
+    
+    # Get signature algorithm
+    sig_algo = signature_algorithm_name(csr)
+    
+    # Fingerprint the public key so reused keys can be matched
+    if der is None:
+        der = crypto.dump_certificate_request(crypto.FILETYPE_ASN1, csr)
+    spki_sha256 = spki_fingerprint(der)
+    
+    # Verify the signature
+    is_valid = verify_signature(csr, pubkey, der) if verify else None
+    
+    return {
+        "subject": subject_dict,
+        "key_type": key_type,
+        "curve": curve,
+        "key_size": key_size,
+        "signature_algorithm": sig_algo,
+        "spki_sha256": spki_sha256,
+        "is_valid": is_valid
+    }
+
+class CSRRecord:
+    """
+    A CSR whose fields are parsed on first access.
+    
+    Reading the subject only decodes the CSR, key fields only inspect the
+    public key, and the signature is only checked when is_valid is read.
+    Fields already in the parse cache are served from it. The record can be
+    read like the dictionary returned by parse_csr.
+    """
+    
+    FIELDS = ("subject", "key_type", "curve", "key_size", "signature_algorithm", "spki_sha256", "is_valid")
+    
+    def __init__(self, csr_data: Union[str, bytes], verify: bool = True):
+        """
+        Wrap a CSR without parsing it.
+        
+        Args:
+            csr_data: The CSR in PEM or DER format
+            verify: Check the signature when is_valid is read; if False,
+                is_valid is None unless the CSR is already in the parse cache
+        """
+        self._data = csr_data
+        self.verify = verify
+    
+    @cached_property
+    def der(self) -> bytes:
+        """The DER encoding of the CSR."""
+        try:
+            return csr_to_der(self._data)
+        except ValueError as e:
+            raise ValueError(f"Invalid CSR: {str(e)}")
+    
+    @cached_property
+    def digest(self) -> str:
+        """The hex SHA-256 digest of the CSR's DER encoding."""
+        return hashlib.sha256(self.der).hexdigest()
+    
+    @cached_property
+    def _cached_info(self) -> Optional[Dict[str, Any]]:
+        cached = _parse_cache.get(self.digest)
+        return cached if isinstance(cached, dict) else None
+    
+    @cached_property
+    def _csr(self) -> crypto.X509Req:
+        try:
+            return crypto.load_certificate_request(crypto.FILETYPE_ASN1, self.der)
+        except crypto.Error as e:
+            raise ValueError(f"Invalid CSR: {str(e)}")
+    
+    @cached_property
+    def _pubkey(self) -> crypto.PKey:
+        return self._csr.get_pubkey()
+    
+    @cached_property
+    def subject(self) -> Dict[str, str]:
+        """The subject components, e.g. {"CN": ..., "O": ...}."""
+        if self._cached_info is not None:
+            return dict(self._cached_info["subject"])
+        return _subject_dict(self._csr)
+    
+    @cached_property
+    def _key_description(self) -> Tuple[str, Optional[str], int]:
+        if self._cached_info is not None:
+            info = self._cached_info
+            return info["key_type"], info["curve"], info["key_size"]
+        key_type, curve = describe_public_key(self._pubkey)
+        return key_type, curve, self._pubkey.bits()
+    
+    @property
+    def key_type(self) -> str:
+        """The public key type: "RSA", "EC", "ED25519" or "DSA"."""
+        return self._key_description[0]
+    
+    @property
+    def curve(self) -> Optional[str]:
+        """The NIST curve name for EC keys."""
+        return self._key_description[1]
+    
+    @property
+    def key_size(self) -> int:
+        """The public key size in bits."""
+        return self._key_description[2]
+    
+    @cached_property
+    def signature_algorithm(self) -> str:
+        """The OpenSSL name of the signature algorithm."""
+        if self._cached_info is not None:
+            return self._cached_info["signature_algorithm"]
+        return signature_algorithm_name(self._csr)
+    
+    @cached_property
+    def spki_sha256(self) -> str:
+        """The hex SHA-256 fingerprint of the public key."""
+        if self._cached_info is not None:
+            return self._cached_info["spki_sha256"]
+        return spki_fingerprint(self.der)
+    
+    @cached_property
+    def is_valid(self) -> Optional[bool]:
+        """Whether the signature verifies, or None when verification is disabled."""
+        if self._cached_info is not None:
+            return bool(self._cached_info["is_valid"])
+        if not self.verify:
+            return None
+        return verify_signature(self._csr, self._pubkey, self.der)
+    
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.FIELDS:
+            raise KeyError(name)
+        return getattr(self, name)
+    
+    def get(self, name: str, default: Any = None) -> Any:
+        return self[name] if name in self.FIELDS else default
+    
+    def keys(self) -> Tuple[str, ...]:
+        return self.FIELDS
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Parse every field and return them as a parse_csr dictionary."""
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+def parse_csr(
+    csr_pem: Union[str, bytes],
+    lazy: bool = False,
+    verify: bool = True
+) -> Union[Dict[str, Any], CSRRecord]:
+    """
+    Parse a CSR and extract its information.
+    
+    Results, including failed verifications, are cached by the SHA-256 of
+    the CSR's DER encoding, so re-wrapped or re-encoded copies of a CSR hit
+    the cache.
+    
+    Args:
+        csr_pem: The CSR in PEM format, as text or bytes, or in DER format
+        lazy: Return a CSRRecord that parses each field on first access
+        verify: Check the signature; if False, "is_valid" is None unless the
+            CSR is already cached, and the result is not cached
         
-        # Get public key
-        pubkey = csr.get_pubkey()
+    Returns:
+        A dictionary containing CSR information, or a CSRRecord if lazy
+        
+    Raises:
+        ValueError: If the CSR is not text or bytes, or is invalid
+    """
+    check_csr_data(csr_pem)
+    if lazy:
+        return CSRRecord(csr_pem, verify=verify)
+    
+    try:
+        der = csr_to_der(csr_pem)
+    except ValueError:
+        der = None
+    
+    digest = hashlib.sha256(der).hexdigest() if der is not None else None
+    if digest is not None:
+        cached = _parse_cache.get(digest)
+        if cached is not None:
+            if isinstance(cached, ValueError):
+                raise ValueError(str(cached))
+            return _copy_info(cached)
+    
+    try:
+        # Parse the CSR
+        if der is not None:
+            csr = crypto.load_certificate_request(crypto.FILETYPE_ASN1, der)
+        else:
+            csr = crypto.load_certificate_request(crypto.FILETYPE_PEM, csr_pem)
+        info = _parse_loaded_csr(csr, verify=verify, der=der)
+    
+    except Exception as e:
+        error = ValueError(f"Invalid CSR: {str(e)}")
+        if digest is not None and verify:
+            _parse_cache.set(digest, error)
+        raise error
+    
+    if digest is not None and verify:
+        _parse_cache.set(digest, _copy_info(info))
+    return info
+
+def validate_csr(csr_pem: Union[str, bytes]) -> bool:
+    """
+    Validate a CSR.
+    
+    Args:
+        csr_pem: The CSR in PEM or DER format
         
-        # Verify the signature
-        return csr.verify(pubkey)
+    Returns:
+        True if the CSR is valid, False otherwise
+    """
+    try:
+        return bool(parse_csr(csr_pem)["is_valid"])
     
     except Exception:
         return False
 
+def split_pem_bundle(bundle: Union[str, bytes]) -> List[str]:
+    """
+    Split concatenated PEM-encoded CSRs into individual CSRs.
+    
+    Args:
+        bundle: One or more CSRs in PEM format
+        
+    Returns:
+        The PEM blocks of the bundle, in order
+    """
+    data = bundle.encode('utf-8') if isinstance(bundle, str) else bundle
+    return [match.group(0).decode('ascii', 'replace') + "\n" for match in PEM_CSR_PATTERN.finditer(data)]
+
+def iter_pem_blocks(
+    source: Union[str, "os.PathLike[str]", BinaryIO],
+    chunk_size: int = 64 * 1024
+) -> Iterator[Tuple[int, Optional[bytes], Optional[str]]]:
+    """
+    Read the CSR PEM blocks of a multi-PEM bundle one at a time.
+    
+    The bundle is read in chunks, so only the current PEM block is held in
+    memory however large the file is. Text between blocks is ignored.
+    
+    Args:
+        source: Path of the bundle, or a binary file object
+        chunk_size: Number of bytes read at a time
+        
+    Yields:
+        For each PEM block, a tuple containing (offset, block, None), or
+        (offset, None, error) if the block is malformed
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as fp:
+            yield from iter_pem_blocks(fp, chunk_size)
+        return
+    
+    buffer = b""
+    base = 0
+    eof = False
+    
+    def read_more() -> bool:
+        nonlocal buffer
+        chunk = source.read(chunk_size)
+        buffer += chunk
+        return not chunk
+    
+    while True:
+        begin = PEM_CSR_BEGIN.search(buffer)
+        if begin is None:
+            if eof:
+                return
+            # Keep only a tail that may hold the start of a BEGIN line
+            keep = len(buffer) - min(len(buffer), 64)
+            buffer, base = buffer[keep:], base + keep
+            eof = read_more()
+            continue
+        
+        # Drop everything before the BEGIN line
+        if begin.start() > 0:
+            base += begin.start()
+            buffer = buffer[begin.start():]
+            continue
+        
+        end = PEM_CSR_END.search(buffer, begin.end())
+        next_begin = PEM_CSR_BEGIN.search(buffer, begin.end())
+        if next_begin is not None and (end is None or next_begin.start() < end.start()):
+            yield base, None, "Malformed PEM block: missing END line"
+            base += next_begin.start()
+            buffer = buffer[next_begin.start():]
+            continue
+        
+        if end is None:
+            if eof:
+                yield base, None, "Malformed PEM block: truncated before END line"
+                return
+            if len(buffer) > MAX_PEM_BLOCK_SIZE:
+                yield base, None, "Malformed PEM block: exceeds maximum block size"
+                base += begin.end()
+                buffer = buffer[begin.end():]
+                continue
+            eof = read_more()
+            continue
+        
+        yield base, buffer[:end.end()], None
+        base += end.end()
+        buffer = buffer[end.end():]
+
+def iter_csr_bundle(
+    source: Union[str, "os.PathLike[str]", BinaryIO],
+    chunk_size: int = 64 * 1024,
+    verify: bool = True
+) -> Iterator[Dict[str, Any]]:
+    """
+    Parse the CSRs of a multi-PEM bundle one at a time.
+    
+    Args:
+        source: Path of the bundle, or a binary file object
+        chunk_size: Number of bytes read at a time (see iter_pem_blocks)
+        verify: Check each CSR's signature (see parse_csr)
+        
+    Yields:
+        For each PEM block, the parse_csr result with the block's byte
+        "offset", or {"offset": ..., "error": ...} if the block is malformed
+    """
+    for offset, block, error in iter_pem_blocks(source, chunk_size):
+        if error is not None:
+            yield {"offset": offset, "error": error}
+            continue
+        try:
+            yield {"offset": offset, **parse_csr(block, verify=verify)}
+        except ValueError as e:
+            yield {"offset": offset, "error": str(e)}
+
+def iter_record_chunks(records: Iterable[Dict[str, Any]], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Group records into lists of at most chunk_size, reading records only as needed.
+    
+    Args:
+        records: The records, e.g. a generator
+        chunk_size: Maximum number of records per chunk
+        
+    Yields:
+        Lists of consecutive records
+    """
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class _Export(ABC):
+    # An export file written to a temporary path and moved into place on close
+    
+    def __init__(self, path: str, fields: Sequence[str]):
+        self.path = path
+        self.fields = list(fields)
+        self.rows = 0
+        self._temporary = f"{path}.tmp{os.getpid()}"
+    
+    @abstractmethod
+    def write_chunk(self, records: List[Dict[str, Any]]) -> None:
+        """Write one chunk of records."""
+    
+    @abstractmethod
+    def _close(self) -> None:
+        # Flush and close the temporary file
+        pass
+    
+    def close(self) -> None:
+        """Finish the file and move it into place."""
+        self._close()
+        if self.path != "-":
+            os.replace(self._temporary, self.path)
+    
+    def abort(self) -> None:
+        """Discard the partly written file."""
+        try:
+            self._close()
+        finally:
+            if self.path != "-" and os.path.exists(self._temporary):
+                os.remove(self._temporary)
+
+class NDJSONExport(_Export):
+    """
+    Writes records as newline-delimited JSON, one object per line.
+    
+    Only the given fields are written, in order. A path of "-" writes to
+    stdout.
+    """
+    
+    def __init__(self, path: str, fields: Sequence[str]):
+        super().__init__(path, fields)
+        self._file = sys.stdout if path == "-" else open(self._temporary, "w")
+    
+    def write_chunk(self, records: List[Dict[str, Any]]) -> None:
+        lines = [json.dumps({field: record.get(field) for field in self.fields}) for record in records]
+        self._file.write("\n".join(lines) + "\n")
+        self.rows += len(records)
+    
+    def _close(self) -> None:
+        if self._file is sys.stdout:
+            self._file.flush()
+        else:
+            self._file.close()
+
+class ColumnarExport(_Export):
+    """
+    Writes records column by column, one chunk at a time.
+    
+    A path ending in .parquet gets a Parquet file with one row group per
+    chunk, which needs the optional pyarrow package. Any other path gets
+    gzip-compressed JSON lines: a header naming the fields, then one line
+    per chunk holding the values of each column as a list (see
+    iter_columnar). Both are binary, so they cannot be written to stdout.
+    """
+    
+    def __init__(self, path: str, fields: Sequence[str], types: Optional[Dict[str, type]] = None):
+        """
+        Open a columnar export.
+        
+        Args:
+            path: The output path
+            fields: The columns, in file order
+            types: The Python type of non-string columns (int, float or bool), for Parquet
+            
+        Raises:
+            ValueError: If the path is "-", or Parquet is requested without pyarrow installed
+        """
+        if path == "-":
+            raise ValueError("Columnar exports cannot be written to stdout; pass a file path")
+        super().__init__(path, fields)
+        self.parquet = path.endswith(".parquet")
+        if self.parquet:
+            if pyarrow is None:
+                raise ValueError("pyarrow is required for Parquet export (pip install pyarrow)")
+            arrow_types = {int: pyarrow.int64(), float: pyarrow.float64(), bool: pyarrow.bool_()}
+            self._schema = pyarrow.schema([
+                (field, arrow_types.get((types or {}).get(field), pyarrow.string())) for field in self.fields
+            ])
+            self._file = pyarrow.parquet.ParquetWriter(self._temporary, self._schema, compression="zstd")
+        else:
+            self._file = gzip.open(self._temporary, "wt")
+            self._file.write(json.dumps({"format": COLUMNAR_FORMAT, "fields": self.fields}) + "\n")
+    
+    def write_chunk(self, records: List[Dict[str, Any]]) -> None:
+        columns = [[record.get(field) for record in records] for field in self.fields]
+        if self.parquet:
+            self._file.write_table(pyarrow.Table.from_arrays(columns, schema=self._schema))
+        else:
+            self._file.write(json.dumps(columns, separators=(",", ":")) + "\n")
+        self.rows += len(records)
+    
+    def _close(self) -> None:
+        self._file.close()
+
+def export_records(
+    records: Iterable[Dict[str, Any]],
+    exports: List[_Export],
+    chunk_size: int = EXPORT_CHUNK_SIZE
+) -> int:
+    """
+    Stream records into one or more exports in bounded chunks.
+    
+    At most chunk_size records are held at a time, so the number of
+    records exported is not limited by memory. Each export is moved into
+    place once every record has been written, and discarded on error.
+    
+    Args:
+        records: The records, e.g. a generator
+        exports: NDJSONExport or ColumnarExport instances to write to
+        chunk_size: Number of records written at a time
+        
+    Returns:
+        The number of records exported
+    """
+    rows = 0
+    try:
+        for chunk in iter_record_chunks(records, chunk_size):
+            for export in exports:
+                export.write_chunk(chunk)
+            rows += len(chunk)
+    except BaseException:
+        _abort_exports(exports)
+        raise
+    for i, export in enumerate(exports):
+        try:
+            export.close()
+        except BaseException:
+            _abort_exports(exports[i:])
+            raise
+    return rows
+
+def _abort_exports(exports: List[_Export]) -> None:
+    # Abort every export, even if aborting one of them fails
+    if exports:
+        try:
+            exports[0].abort()
+        finally:
+            _abort_exports(exports[1:])
+
+def iter_columnar(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read back the records of a gzip-compressed columnar JSON export.
+    
+    Args:
+        path: The export path
+        
+    Yields:
+        The records, one chunk in memory at a time
+        
+    Raises:
+        ValueError: If the file is not a columnar JSON export
+    """
+    with gzip.open(path, "rt") as f:
+        header = json.loads(f.readline() or "null")
+        if not isinstance(header, dict) or header.get("format") != COLUMNAR_FORMAT:
+            raise ValueError(f"Not a columnar CSR export: {path}")
+        fields = header["fields"]
+        for line in f:
+            for values in zip(*json.loads(line)):
+                yield dict(zip(fields, values))
+
+def assess_csr(csr_info: Dict[str, Any]) -> Dict[str, bool]:
+    """
+    Check parsed CSR information against security recommendations.
+    
+    Args:
+        csr_info: The result of parse_csr
+        
+    Returns:
+        A dictionary with "weak_key" and "deprecated_algorithm" flags
+    """
+    minimum = MINIMUM_KEY_SIZES.get(csr_info["key_type"], 0)
+    algorithm = csr_info["signature_algorithm"].lower()
+    return {
+        "weak_key": csr_info["key_size"] < minimum,
+        "deprecated_algorithm": any(algorithm.startswith(name) or algorithm.endswith(name) for name in DEPRECATED_HASHES)
+    }
+
 def compare_csrs(csr1_pem: str, csr2_pem: str) -> Dict[str, Any]:
     """
     Compare two CSRs and identify differences.
@@ -160,6 +1179,89 @@ def compare_csrs(csr1_pem: str, csr2_pem: str) -> Dict[str, Any]:
     except Exception as e:
         raise ValueError(f"Error comparing CSRs: {str(e)}")
 
+def normalize_common_name(common_name: str, environment: str) -> str:
+    """
+    Remove the environment label from a domain name.
+    
+    This is the inverse of suggest_domain_name, so the PROD and UAT domains
+    of a service normalize to the same name.
+    
+    Args:
+        common_name: The domain name
+        environment: The environment (PROD, UAT, DEV)
+        
+    Returns:
+        The lowercase domain name without the environment label
+    """
+    env_label = environment.lower()
+    return ".".join(label for label in common_name.lower().split(".") if label != env_label)
+
+def _fleet_attributes(csr_info: Dict[str, Any], environment: str) -> Dict[str, Any]:
+    attributes = {f"subject.{key}": value for key, value in csr_info["subject"].items()}
+    if "subject.CN" in attributes:
+        attributes["subject.CN"] = normalize_common_name(attributes["subject.CN"], environment)
+    for key in ["key_type", "curve", "key_size", "signature_algorithm"]:
+        attributes[key] = csr_info[key]
+    return attributes
+
+def compare_fleet(csrs: Iterable[Tuple[str, str, Union[str, bytes]]]) -> Dict[str, Any]:
+    """
+    Compare the CSRs of many services across environments.
+    
+    Each CSR is parsed once, without signature verification. Its subject
+    (with the environment label removed from the CN) and key attributes are
+    hashed, so CSRs with identical attributes land in the same group, and
+    each service is checked for fields that differ between its environments.
+    The work is linear in the number of CSRs.
+    
+    Args:
+        csrs: (service, environment, csr) tuples, with each CSR in PEM or DER format
+        
+    Returns:
+        A dictionary with the attribute "groups", per-service "services"
+        results, the sorted list of "differing_services" and parse "errors"
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    services: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    errors = []
+    
+    for service, environment, csr_data in csrs:
+        try:
+            csr_info = parse_csr(csr_data, verify=False)
+        except ValueError as e:
+            errors.append({"service": service, "environment": environment, "error": str(e)})
+            continue
+        
+        attributes = _fleet_attributes(csr_info, environment)
+        fingerprint = hashlib.sha256(json.dumps(attributes, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        group = groups.setdefault(fingerprint, {"fingerprint": fingerprint, "attributes": attributes, "members": []})
+        group["members"].append({"service": service, "environment": environment})
+        
+        # Label repeated environments of a service as ENV#2, ENV#3, ...
+        environments = services.setdefault(service, {})
+        count = sum(1 for label in environments if label.split("#")[0] == environment)
+        environments[environment if count == 0 else f"{environment}#{count + 1}"] = attributes
+    
+    service_results = {}
+    for service, environments in services.items():
+        differences = {}
+        for key in sorted(set().union(*environments.values())):
+            values = {label: attributes.get(key) for label, attributes in environments.items()}
+            if len(set(map(json.dumps, values.values()))) > 1:
+                differences[key] = values
+        service_results[service] = {
+            "environments": sorted(environments),
+            "consistent": not differences,
+            "differences": differences
+        }
+    
+    return {
+        "groups": sorted(groups.values(), key=lambda group: (-len(group["members"]), group["fingerprint"])),
+        "services": service_results,
+        "differing_services": sorted(service for service, result in service_results.items() if not result["consistent"]),
+        "errors": errors
+    }
+
 def suggest_domain_name(service: str, environment: str) -> str:
     """
     Suggest a domain name based on service and environment.
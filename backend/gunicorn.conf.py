@@ -0,0 +1,55 @@
+"""
+Gunicorn settings for the production server.
+
+Usage, from the backend directory:
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Every setting can be overridden with an environment variable. Send SIGHUP to
+the master process to reload the settings and replace the workers
+gracefully: new workers are started before the old ones stop taking
+connections and are given GUNICORN_GRACEFUL_TIMEOUT seconds to finish their
+requests.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+
+# Server worker processes, each serving requests on a pool of threads. Key
+# generation and signing run in each worker's crypto processes, so threads
+# mostly wait on those and on I/O.
+workers = int(os.environ.get("WEB_CONCURRENCY", 0)) or os.cpu_count() or 1
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Long enough for an 8192-bit key on a busy machine
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# Recycle each worker after this many requests (0: never), staggered by up to 10%
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+# Import the app once in the master, so workers fork with it loaded. Code
+# changes then need a full restart instead of SIGHUP.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0") == "1"
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+# Share the CPUs between the crypto pools of all server workers rather than
+# giving every worker a process per CPU
+os.environ.setdefault("CRYPTO_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+
+
+def post_fork(server, worker):
+    # Thread and process pools must be started after the fork, in the worker
+    import main
+    main.start_background_services()
+    server.log.info("Worker %s started its crypto workers", worker.pid)
+
+
+def worker_exit(server, worker):
+    import main
+    main.stop_background_services()
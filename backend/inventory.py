@@ -0,0 +1,961 @@
+import argparse
+import csv
+import fnmatch
+import hashlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import csr_utils
+
+# The CSR folders of each environment, relative to the repository root
+ENVIRONMENT_DIRS = {"PROD": "Prod-CSR", "UAT": "UAT-CSR"}
+
+CSR_SUFFIX = ".csr"
+
+# Report section titles, in report order
+ENVIRONMENT_TITLES = {"PROD": "Production", "UAT": "UAT"}
+
+# CSR files listed in the Markdown report tables; the summary counts every CSR
+REPORT_FILE_PATTERN = "saudi-*.csr"
+
+# The fields of an inventory record, in JSON and CSV column order
+RECORD_FIELDS = (
+    "environment", "service", "file", "path", "domain", "organization", "country",
+    "key_type", "key_size", "curve", "signature_algorithm", "spki_sha256",
+    "csr_sha256", "is_valid", "error"
+)
+
+# The type of each non-string record field, for typed exports
+RECORD_TYPES = {"key_size": int, "is_valid": bool}
+
+# Below this many files, worker processes cost more than they save
+MIN_PARALLEL_FILES = 256
+
+# Most files parsed per worker task, which bounds the records held in flight
+MAX_BATCH_FILES = 2048
+
+MANIFEST_VERSION = 1
+KEY_INDEX_VERSION = 1
+
+# A file written this close to a scan may change again within the same
+# mtime tick, so its size and mtime are not trusted on the next scan
+RACY_WINDOW_NS = 2 * 10**9
+
+
+def iter_csr_files(roots: Iterable[str], suffix: str = CSR_SUFFIX) -> Iterator[str]:
+    """
+    Walk directory trees and yield the CSR files in them, in sorted order.
+
+    Args:
+        roots: Directories to walk; missing directories are skipped
+        suffix: File name suffix of CSR files
+
+    Returns:
+        An iterator over CSR file paths
+    """
+    for root in roots:
+        if not os.path.isdir(root):
+            continue
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories.sort()
+            for name in sorted(files):
+                if name.endswith(suffix):
+                    yield os.path.join(directory, name)
+
+
+def file_stamp(stat: os.stat_result) -> Tuple[int, int]:
+    """Return the (size, mtime_ns) pair used to detect changed files."""
+    return stat.st_size, stat.st_mtime_ns
+
+
+class KeyReuseIndex:
+    """
+    An index from public key fingerprint to the CSR files that use the key.
+
+    Keys are matched by the SHA-256 of their DER SubjectPublicKeyInfo, so
+    the same private key is found whatever subject or encoding its CSRs use.
+    Scans are incremental: only files whose size or modification time changed
+    since the previous scan are read again. save() and load() keep the index
+    in a file, so the next process only reads the files changed since.
+    """
+
+    def __init__(self):
+        self._locations: Dict[str, Set[str]] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._errors: Dict[str, str] = {}
+        self._scanned_at = 0
+
+    @classmethod
+    def load(cls, path: str) -> "KeyReuseIndex":
+        """
+        Load an index written by save().
+
+        Args:
+            path: The index file path
+
+        Returns:
+            The index, or an empty one if the file is missing, unreadable or
+            was written by another version
+        """
+        index = cls()
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if not isinstance(saved, dict) or saved.get("version") != KEY_INDEX_VERSION:
+            return index
+
+        trusted_before = saved["scanned_at"] - RACY_WINDOW_NS
+        for file_path, (size, mtime_ns, fingerprint, error) in saved["files"].items():
+            if fingerprint is not None:
+                index.add(file_path, fingerprint)
+            else:
+                index._errors[file_path] = error
+            # Files written just before the scan are read again by the next one
+            index._stamps[file_path] = (size, mtime_ns) if mtime_ns < trusted_before else (-1, -1)
+        index._scanned_at = saved["scanned_at"]
+        return index
+
+    def save(self, path: str) -> None:
+        """
+        Write the index to a file, replacing it atomically.
+
+        Args:
+            path: The index file path
+        """
+        files = {
+            file_path: [*stamp, self._fingerprints.get(file_path), self._errors.get(file_path)]
+            for file_path, stamp in self._stamps.items()
+        }
+        write_file(path, json.dumps(
+            {"version": KEY_INDEX_VERSION, "scanned_at": self._scanned_at, "files": files},
+            separators=(",", ":")
+        ))
+
+    def add(self, path: str, fingerprint: str) -> None:
+        """
+        Record that a CSR file uses a key, replacing any previous entry for the file.
+
+        Args:
+            path: The CSR file path
+            fingerprint: The hex SHA-256 SPKI fingerprint of the CSR's key
+        """
+        self.discard(path)
+        self._fingerprints[path] = fingerprint
+        self._locations.setdefault(fingerprint, set()).add(path)
+
+    def discard(self, path: str) -> bool:
+        """
+        Remove a CSR file from the index.
+
+        Args:
+            path: The CSR file path
+
+        Returns:
+            True if the file was indexed, False otherwise
+        """
+        self._stamps.pop(path, None)
+        self._errors.pop(path, None)
+        fingerprint = self._fingerprints.pop(path, None)
+        if fingerprint is None:
+            return False
+        paths = self._locations[fingerprint]
+        paths.discard(path)
+        if not paths:
+            del self._locations[fingerprint]
+        return True
+
+    def index_file(self, path: str, stat: Optional[os.stat_result] = None) -> Optional[str]:
+        """
+        Read a CSR file and index its key.
+
+        Args:
+            path: The CSR file path
+            stat: The file's stat result, if already known
+
+        Returns:
+            The key fingerprint, or None if the file is not a readable CSR
+        """
+        stat = stat or os.stat(path)
+        try:
+            with open(path, "rb") as f:
+                fingerprint = csr_utils.spki_fingerprint(f.read())
+        except (OSError, ValueError) as e:
+            self.discard(path)
+            self._stamps[path] = file_stamp(stat)
+            self._errors[path] = str(e)
+            return None
+
+        self.add(path, fingerprint)
+        self._stamps[path] = file_stamp(stat)
+        return fingerprint
+
+    def scan(self, roots: Iterable[str]) -> Dict[str, int]:
+        """
+        Bring the index up to date with the CSR files under the given roots.
+
+        Files that are new or whose size or modification time changed are
+        read; files that disappeared are dropped.
+
+        Args:
+            roots: Directories to walk
+
+        Returns:
+            Counts of added, updated, removed and unchanged files
+        """
+        self._scanned_at = time.time_ns()
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        seen = set()
+        for path in iter_csr_files(roots):
+            seen.add(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            previous = self._stamps.get(path)
+            if previous == file_stamp(stat):
+                counts["unchanged"] += 1
+                continue
+            self.index_file(path, stat)
+            counts["added" if previous is None else "updated"] += 1
+
+        for path in [path for path in self._stamps if path not in seen]:
+            self.discard(path)
+            counts["removed"] += 1
+        return counts
+
+    def fingerprint(self, path: str) -> Optional[str]:
+        """Return the key fingerprint of an indexed CSR file."""
+        return self._fingerprints.get(path)
+
+    def locations(self, fingerprint: str) -> List[str]:
+        """
+        Look up the CSR files that use a key.
+
+        Args:
+            fingerprint: The hex SHA-256 SPKI fingerprint
+
+        Returns:
+            The sorted CSR file paths using the key
+        """
+        return sorted(self._locations.get(fingerprint.lower(), ()))
+
+    def shared_with(self, path: str) -> List[str]:
+        """
+        Look up the other CSR files that use the same key as a file.
+
+        Args:
+            path: An indexed CSR file path
+
+        Returns:
+            The sorted paths of the other CSR files using the key
+        """
+        fingerprint = self._fingerprints.get(path)
+        if fingerprint is None:
+            return []
+        return [other for other in self.locations(fingerprint) if other != path]
+
+    def duplicates(self) -> Dict[str, List[str]]:
+        """
+        Report every key used by more than one CSR file.
+
+        Returns:
+            A dictionary mapping each reused key fingerprint to its sorted CSR file paths
+        """
+        return {
+            fingerprint: sorted(paths)
+            for fingerprint, paths in sorted(self._locations.items())
+            if len(paths) > 1
+        }
+
+    def errors(self) -> Dict[str, str]:
+        """Return the files that could not be read as CSRs, with the reason."""
+        return dict(self._errors)
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report index size and key reuse counts.
+
+        Returns:
+            A dictionary of index statistics
+        """
+        duplicates = self.duplicates()
+        return {
+            "files": len(self._fingerprints),
+            "keys": len(self._locations),
+            "reused_keys": len(duplicates),
+            "files_with_reused_keys": sum(len(paths) for paths in duplicates.values()),
+            "errors": len(self._errors)
+        }
+
+
+def default_roots(base: str = ".") -> List[str]:
+    """Return the environment CSR folders under a repository root."""
+    return [os.path.join(base, directory) for directory in ENVIRONMENT_DIRS.values()]
+
+
+def iter_inventory_files(base: str = ".") -> Iterator[Tuple[str, str, str]]:
+    """
+    List the CSR files of every environment under a repository root.
+
+    Args:
+        base: The repository root holding Prod-CSR/ and UAT-CSR/
+
+    Yields:
+        Tuples of (environment, service, path), where service is the folder
+        directly below the environment folder
+    """
+    for environment, root in environment_roots(base).items():
+        yield from _iter_tree_files(environment, root, root)
+
+
+def environment_roots(base: str = ".") -> Dict[str, str]:
+    """Return the CSR folder of each environment under a repository root."""
+    return {
+        environment: os.path.normpath(os.path.join(base, directory))
+        for environment, directory in ENVIRONMENT_DIRS.items()
+    }
+
+
+def _service_of(root: str, directory: str) -> str:
+    # The service is the first folder below the environment folder
+    return directory[len(root):].lstrip(os.sep).split(os.sep, 1)[0]
+
+
+def _order_key(roots: List[str], path: str) -> Tuple[int, Tuple[str, ...], str]:
+    # Sorts paths in the order iter_inventory_files yields them
+    for index, root in enumerate(roots):
+        if path.startswith(root + os.sep):
+            parts = path[len(root) + 1:].split(os.sep)
+            return index, tuple(parts[:-1]), parts[-1]
+    return len(roots), (), path
+
+
+def _iter_tree_files(environment: str, root: str, top: str) -> Iterator[Tuple[str, str, str]]:
+    # Walk top, a directory inside the environment folder root
+    if not os.path.isdir(top):
+        return
+    for current, subdirectories, files in os.walk(top):
+        subdirectories.sort()
+        service = _service_of(root, current)
+        for name in sorted(files):
+            if name.endswith(CSR_SUFFIX):
+                yield environment, service, os.path.join(current, name)
+
+
+def read_record(environment: str, service: str, path: str) -> Dict[str, Any]:
+    """
+    Read and parse one CSR file into an inventory record.
+
+    Args:
+        environment: The environment the file belongs to, e.g. "PROD"
+        service: The service folder the file is in
+        path: The CSR file path
+
+    Returns:
+        A record with the RECORD_FIELDS keys; parse failures are reported
+        in "error" with the CSR fields left empty
+    """
+    record: Dict[str, Any] = dict.fromkeys(RECORD_FIELDS)
+    record.update(environment=environment, service=service, file=os.path.basename(path), path=path)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        info = csr_utils.parse_csr(data)
+    except (OSError, ValueError) as e:
+        record["error"] = str(e)
+        return record
+
+    subject = info["subject"]
+    record.update(
+        domain=subject.get("CN"),
+        organization=subject.get("O"),
+        country=subject.get("C"),
+        key_type=info["key_type"],
+        key_size=info["key_size"],
+        curve=info["curve"],
+        signature_algorithm=info["signature_algorithm"],
+        spki_sha256=info["spki_sha256"],
+        csr_sha256=csr_utils.csr_digest(data),
+        is_valid=info["is_valid"]
+    )
+    return record
+
+
+def _read_records(entries: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+    return [read_record(*entry) for entry in entries]
+
+
+def read_records(entries: List[Tuple[str, str, str]], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Parse CSR files into inventory records.
+
+    Large lists are split into batches parsed by a pool of worker processes.
+
+    Args:
+        entries: Tuples of (environment, service, path), as yielded by iter_inventory_files
+        workers: Number of worker processes (default: number of CPUs)
+
+    Returns:
+        The inventory records, in entry order
+    """
+    workers = workers or os.cpu_count() or 1
+    # A few batches per worker keeps them evenly loaded without paying
+    # inter-process overhead per file
+    batch_size = min(MAX_BATCH_FILES, max(1, len(entries) // (workers * 4)))
+    return list(iter_read_records(entries, workers, batch_size))
+
+
+def iter_read_records(
+    entries: Iterable[Tuple[str, str, str]],
+    workers: Optional[int] = None,
+    batch_size: int = MAX_BATCH_FILES
+) -> Iterator[Dict[str, Any]]:
+    """
+    Parse CSR files into inventory records as they are needed.
+
+    Entries are consumed lazily and only a few batches per worker are in
+    flight, so streaming a very large tree holds a bounded number of records.
+
+    Args:
+        entries: Tuples of (environment, service, path), e.g. from iter_inventory_files
+        workers: Number of worker processes (default: number of CPUs)
+        batch_size: Number of files parsed per worker task
+
+    Yields:
+        The inventory records, in entry order
+    """
+    workers = workers or os.cpu_count() or 1
+    entries = iter(entries)
+    head = list(itertools.islice(entries, MIN_PARALLEL_FILES))
+    if workers == 1 or len(head) < MIN_PARALLEL_FILES:
+        for entry in itertools.chain(head, entries):
+            yield read_record(*entry)
+        return
+
+    entries = itertools.chain(head, entries)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        pending: Deque[Future] = deque()
+        while True:
+            while len(pending) < workers * 2:
+                batch = list(itertools.islice(entries, batch_size))
+                if not batch:
+                    break
+                pending.append(executor.submit(_read_records, batch))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+
+def scan_inventory(base: str = ".", workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Parse every CSR file under a repository root, once each.
+
+    Args:
+        base: The repository root holding Prod-CSR/ and UAT-CSR/
+        workers: Number of worker processes (default: number of CPUs)
+
+    Returns:
+        The inventory records, ordered by environment and path
+    """
+    return read_records(list(iter_inventory_files(base)), workers)
+
+
+def file_sha256(path: str) -> str:
+    """Return the hex SHA-256 of a file's contents."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class InventoryManifest:
+    """
+    The inventory records of a repository, with the file state they were read from.
+
+    Each entry keeps a file's size, modification time and content hash next
+    to its parsed record. refresh() only hashes files whose size or mtime
+    changed and only parses files whose content changed, so rebuilding a
+    report over an unchanged tree costs one stat per file. The manifest also
+    remembers the reports written from its records, so unchanged reports
+    need not be rendered again.
+
+    The manifest file holds two JSON lines: the file states, then the
+    records. The records line is only decoded when the records are needed.
+    """
+
+    def __init__(self, base: str = "."):
+        """
+        Create an empty manifest.
+
+        Args:
+            base: The repository root holding Prod-CSR/ and UAT-CSR/
+        """
+        self.base = base
+        # path -> [size, mtime_ns, sha256]
+        self._files: Dict[str, List[Any]] = {}
+        # path -> record values in RECORD_FIELDS order; None until decoded
+        self._records: Optional[Dict[str, List[Any]]] = {}
+        self._saved_records: Optional[str] = None
+        # report path -> [size, mtime_ns] when written from the current records
+        self._outputs: Dict[str, List[int]] = {}
+        self._scanned_at = 0
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: str, base: str = ".") -> "InventoryManifest":
+        """
+        Load a saved manifest.
+
+        Args:
+            path: The manifest file path
+            base: The repository root the manifest describes
+
+        Returns:
+            The manifest, or an empty one if the file is missing, unreadable
+            or was written for other record fields
+        """
+        manifest = cls(base)
+        try:
+            with open(path) as f:
+                header = json.loads(f.readline())
+                saved_records = f.readline()
+        except (OSError, ValueError):
+            return manifest
+        if isinstance(header, dict) and header.get("version") == MANIFEST_VERSION \
+                and header.get("fields") == list(RECORD_FIELDS) and saved_records.endswith("\n"):
+            manifest._files = header["files"]
+            manifest._outputs = header["outputs"]
+            manifest._scanned_at = header["scanned_at"]
+            manifest._records = None
+            manifest._saved_records = saved_records
+        return manifest
+
+    def _record_values(self) -> Dict[str, List[Any]]:
+        if self._records is None:
+            self._records = dict(zip(self._files, json.loads(self._saved_records)))
+            self._saved_records = None
+        return self._records
+
+    def save(self, path: str, force: bool = False) -> bool:
+        """
+        Write the manifest to a file, replacing it atomically.
+
+        Args:
+            path: The manifest file path
+            force: Write even if nothing changed since the manifest was loaded
+
+        Returns:
+            True if the manifest was written
+        """
+        if not (self._dirty or force):
+            return False
+        header = json.dumps({
+            "version": MANIFEST_VERSION,
+            "fields": RECORD_FIELDS,
+            "scanned_at": self._scanned_at,
+            "outputs": self._outputs,
+            "files": self._files
+        }, separators=(",", ":"))
+        if self._records is None:
+            saved_records = self._saved_records
+        else:
+            saved_records = json.dumps([self._records[path] for path in self._files], separators=(",", ":")) + "\n"
+        write_file(path, header + "\n" + saved_records)
+        self._dirty = False
+        return True
+
+    def refresh(self, workers: Optional[int] = None) -> Dict[str, int]:
+        """
+        Bring the manifest up to date with the CSR files under the base directory.
+
+        Args:
+            workers: Number of worker processes for parsing changed files
+
+        Returns:
+            Counts of added, updated, removed and unchanged files
+        """
+        started = time.time_ns()
+        counts, _ = self._apply(iter_inventory_files(self.base), None, workers)
+        if self._dirty:
+            self._scanned_at = started
+        return counts
+
+    def update(self, paths: Iterable[str], workers: Optional[int] = None) -> Tuple[Dict[str, int], List[str]]:
+        """
+        Revalidate only the given files and directories, e.g. after file system events.
+
+        Every CSR file under a given directory is checked, and manifest
+        entries for paths that no longer exist are dropped. A path that holds
+        an environment folder triggers a full refresh.
+
+        Args:
+            paths: Changed files or directories
+            workers: Number of worker processes for parsing changed files
+
+        Returns:
+            A tuple containing the counts of added, updated, removed and
+            unchanged files, and the paths of the CSR files that were checked
+        """
+        roots = environment_roots(self.base)
+        entries: Dict[str, Tuple[str, str, str]] = {}
+        stale = set()
+        for path in {os.path.normpath(path) for path in paths}:
+            if any(path in (root, os.curdir) or root.startswith(path + os.sep) for root in roots.values()):
+                return self.refresh(workers), list(self._files)
+
+            located = [(environment, root) for environment, root in roots.items() if path.startswith(root + os.sep)]
+            if not located:
+                continue
+            environment, root = located[0]
+
+            if path in self._files:
+                stale.add(path)
+            elif not path.endswith(CSR_SUFFIX) and not os.path.isfile(path):
+                # Possibly a directory that was moved away or deleted
+                prefix = path + os.sep
+                stale.update(known for known in self._files if known.startswith(prefix))
+
+            if os.path.isdir(path):
+                entries.update((entry[2], entry) for entry in _iter_tree_files(environment, root, path))
+            elif path.endswith(CSR_SUFFIX) and os.path.isfile(path):
+                entries[path] = (environment, _service_of(root, os.path.dirname(path)), path)
+
+        return self._apply(list(entries.values()), stale, workers, trust_stamps=False)
+
+    def _apply(
+        self,
+        entries: Iterable[Tuple[str, str, str]],
+        stale: Optional[Set[str]],
+        workers: Optional[int],
+        trust_stamps: bool = True
+    ) -> Tuple[Dict[str, int], List[str]]:
+        # With stale None, entries is the whole inventory and anything not in
+        # it is removed; otherwise only the stale paths not in entries are
+        trusted_before = self._scanned_at - RACY_WINDOW_NS
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        files: Dict[str, List[Any]] = {} if stale is None else dict(self._files)
+        checked = []
+        changed = []
+        rehashed = False
+
+        for environment, service, path in entries:
+            try:
+                stat = os.stat(path)
+                state = self._files.get(path)
+                if trust_stamps and state is not None and state[0] == stat.st_size \
+                        and state[1] == stat.st_mtime_ns and stat.st_mtime_ns < trusted_before:
+                    files[path] = state
+                    counts["unchanged"] += 1
+                    continue
+                digest = file_sha256(path)
+            except OSError:
+                continue
+
+            rehashed = True
+            checked.append(path)
+            files[path] = [stat.st_size, stat.st_mtime_ns, digest]
+            if state is not None and state[2] == digest:
+                # Touched but not modified: keep the parsed record
+                counts["unchanged"] += 1
+                continue
+            changed.append((environment, service, path))
+            counts["added" if state is None else "updated"] += 1
+
+        if stale is None:
+            counts["removed"] = len(self._files) - (len(files) - counts["added"])
+        else:
+            for path in stale.difference(checked):
+                if not os.path.isfile(path):
+                    files.pop(path, None)
+                    counts["removed"] += 1
+
+        if changed or counts["removed"]:
+            previous = self._record_values()
+            records = {path: previous[path] for path in files if path in previous}
+            for (_, _, path), record in zip(changed, read_records(changed, workers)):
+                records[path] = [record[field] for field in RECORD_FIELDS]
+            if stale is not None and counts["added"]:
+                roots = list(environment_roots(self.base).values())
+                files = dict(sorted(files.items(), key=lambda item: _order_key(roots, item[0])))
+            self._records = {path: records[path] for path in files}
+            self._outputs = {}
+
+        if rehashed or changed or counts["removed"]:
+            self._dirty = True
+        self._files = files
+        return counts, checked
+
+    def record(self, path: str) -> Optional[Dict[str, Any]]:
+        """Return the inventory record of a CSR file, or None if it is not in the manifest."""
+        values = self._record_values().get(path)
+        return dict(zip(RECORD_FIELDS, values)) if values is not None else None
+
+    def output_current(self, path: str) -> bool:
+        """Whether a report file is unmodified since it was written from the current records."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return self._outputs.get(path) == [stat.st_size, stat.st_mtime_ns]
+
+    def record_output(self, path: str) -> None:
+        """Remember that a report file was just written from the current records."""
+        stat = os.stat(path)
+        self._outputs[path] = [stat.st_size, stat.st_mtime_ns]
+        self._dirty = True
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Return the inventory records, ordered by environment and path."""
+        return [dict(zip(RECORD_FIELDS, values)) for values in self._record_values().values()]
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+
+def _cell(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def render_markdown(records: Iterable[Dict[str, Any]]) -> str:
+    """
+    Render inventory records in the csr_report.md format.
+
+    As in the original report script, the tables list the files matching
+    REPORT_FILE_PATTERN, while the summary counts every CSR.
+
+    Args:
+        records: Inventory records, as returned by scan_inventory
+
+    Returns:
+        The Markdown report
+    """
+    by_environment: Dict[str, List[Dict[str, Any]]] = {environment: [] for environment in ENVIRONMENT_DIRS}
+    for record in records:
+        by_environment.setdefault(record["environment"], []).append(record)
+
+    lines = [
+        "# CSR Report",
+        "",
+        "This report provides details about all Certificate Signing Requests (CSRs) in the repository.",
+    ]
+    for environment, title in ENVIRONMENT_TITLES.items():
+        lines += [
+            "",
+            f"## {title} CSRs",
+            "",
+            "| Service | CSR File | Domain | Organization | Country |",
+            "|---------|----------|--------|--------------|---------|",
+        ]
+        for record in by_environment[environment]:
+            if not fnmatch.fnmatchcase(record["file"], REPORT_FILE_PATTERN):
+                continue
+            cells = [record[field] for field in ("service", "file", "domain", "organization", "country")]
+            lines.append("| " + " | ".join(_cell(cell) for cell in cells) + " |")
+
+    lines += ["", "## Summary", ""]
+    for environment, title in ENVIRONMENT_TITLES.items():
+        lines.append(f"- Total {title} CSRs: {len(by_environment[environment])}")
+    lines += ["", "All CSRs have been validated and organized into the appropriate folders.", ""]
+    return "\n".join(lines)
+
+
+def render_json(records: Iterable[Dict[str, Any]]) -> str:
+    """Render inventory records as a JSON array."""
+    return json.dumps(list(records), indent=2) + "\n"
+
+
+def render_csv(records: Iterable[Dict[str, Any]]) -> str:
+    """Render inventory records as CSV with a header row."""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=RECORD_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(records)
+    return output.getvalue()
+
+
+def render_verification(records: Iterable[Dict[str, Any]]) -> str:
+    """
+    Render inventory records in the verify_csrs.sh terminal format.
+
+    Args:
+        records: Inventory records, as returned by scan_inventory
+
+    Returns:
+        The verification listing
+    """
+    by_service: Dict[str, Dict[str, List[Dict[str, Any]]]] = {environment: {} for environment in ENVIRONMENT_DIRS}
+    for record in records:
+        by_service.setdefault(record["environment"], {}).setdefault(record["service"], []).append(record)
+
+    lines = ["CSR Verification Report", "=======================", ""]
+    for environment, title in ENVIRONMENT_TITLES.items():
+        heading = f"{title} CSRs:"
+        lines += [heading, "-" * (len(heading) - 1)]
+        for service, service_records in sorted(by_service[environment].items()):
+            lines.append(f"Service: {service}")
+            for record in service_records:
+                lines.append(f"  - File: {record['file']}")
+                lines.append(f"    Domain: {_cell(record['domain'])}")
+                if record["error"]:
+                    lines.append(f"    Error: {record['error']}")
+                elif record["is_valid"] is False:
+                    lines.append("    Error: signature does not verify")
+            lines.append("")
+        lines.append("")
+    lines.append("Verification complete!")
+    return "\n".join(lines) + "\n"
+
+
+REPORT_FORMATS = {"markdown": render_markdown, "json": render_json, "csv": render_csv}
+
+
+def write_file(path: str, content: str, mode: Optional[int] = None) -> None:
+    """Write a text file, replacing it atomically; mode sets its permissions from creation."""
+    temporary = f"{path}.tmp{os.getpid()}"
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    with open(os.open(temporary, flags, 0o666 if mode is None else mode), "w", newline="") as f:
+        if mode is not None:
+            os.fchmod(f.fileno(), mode)
+        f.write(content)
+    os.replace(temporary, path)
+
+
+def report_command(args: argparse.Namespace) -> int:
+    outputs = [(path, fmt) for path, fmt in [(args.output, "markdown"), (args.json, "json"), (args.csv, "csv")] if path]
+    if not args.manifest:
+        records = scan_inventory(args.base, workers=args.workers)
+        for path, fmt in outputs:
+            if path == "-":
+                sys.stdout.write(REPORT_FORMATS[fmt](records))
+            else:
+                write_file(path, REPORT_FORMATS[fmt](records))
+                print(f"Report generated: {path}", file=sys.stderr)
+        return 0
+
+    manifest = InventoryManifest.load(args.manifest, args.base)
+    counts = manifest.refresh(workers=args.workers)
+    print(", ".join(f"{count} {name}" for name, count in counts.items()), file=sys.stderr)
+
+    records = None
+    for path, fmt in outputs:
+        if path != "-" and manifest.output_current(path):
+            print(f"Report up to date: {path}", file=sys.stderr)
+            continue
+        records = records if records is not None else manifest.records()
+        if path == "-":
+            sys.stdout.write(REPORT_FORMATS[fmt](records))
+        else:
+            write_file(path, REPORT_FORMATS[fmt](records))
+            manifest.record_output(path)
+            print(f"Report generated: {path}", file=sys.stderr)
+    manifest.save(args.manifest)
+    return 0
+
+
+def export_command(args: argparse.Namespace) -> int:
+    if not (args.ndjson or args.columnar):
+        print("Nothing to export: pass --ndjson and/or --columnar", file=sys.stderr)
+        return 2
+    exports = []
+    try:
+        if args.ndjson:
+            exports.append(csr_utils.NDJSONExport(args.ndjson, RECORD_FIELDS))
+        if args.columnar:
+            exports.append(csr_utils.ColumnarExport(args.columnar, RECORD_FIELDS, RECORD_TYPES))
+    except (ValueError, OSError) as e:
+        for export in exports:
+            export.abort()
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    records = iter_read_records(iter_inventory_files(args.base), workers=args.workers)
+    try:
+        rows = csr_utils.export_records(records, exports, chunk_size=args.chunk_size)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"Exported {rows} records", file=sys.stderr)
+    return 0
+
+
+def verify_command(args: argparse.Namespace) -> int:
+    records = scan_inventory(args.base, workers=args.workers)
+    sys.stdout.write(render_verification(records))
+    return 1 if any(record["error"] or record["is_valid"] is False for record in records) else 0
+
+
+def keys_command(args: argparse.Namespace) -> int:
+    index = KeyReuseIndex.load(args.index) if args.index else KeyReuseIndex()
+    index.scan(args.roots or default_roots())
+    if args.index:
+        index.save(args.index)
+
+    if args.fingerprint:
+        result: Any = {"fingerprint": args.fingerprint, "locations": index.locations(args.fingerprint)}
+    else:
+        result = {"stats": index.stats(), "duplicates": index.duplicates(), "errors": index.errors()}
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+    # Exit non-zero when keys are reused so CI jobs can fail on it
+    return 1 if not args.fingerprint and result["duplicates"] else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect the CSR inventory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    keys = commands.add_parser("keys", help="Report CSRs that share a public key")
+    keys.add_argument("roots", nargs="*", help="Directories to scan (default: Prod-CSR and UAT-CSR)")
+    keys.add_argument("--fingerprint", help="Only list the CSRs using this SPKI SHA-256 fingerprint")
+    keys.add_argument(
+        "--index",
+        default=".csr_key_index.json",
+        help="Saved key index, so only files changed since the last run are read; empty to disable"
+    )
+    keys.set_defaults(handler=keys_command)
+
+    report = commands.add_parser("report", help="Write the CSR report as Markdown, JSON and/or CSV")
+    report.add_argument("--base", default=".", help="Repository root holding Prod-CSR and UAT-CSR (default: .)")
+    report.add_argument("--output", default="csr_report.md", help="Markdown report path, or - for stdout")
+    report.add_argument("--json", help="Also write the records as JSON to this path, or - for stdout")
+    report.add_argument("--csv", help="Also write the records as CSV to this path, or - for stdout")
+    report.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs)")
+    report.add_argument(
+        "--manifest",
+        default=".csr_manifest.json",
+        help="Manifest of previously parsed files, so only changed files are parsed; empty to disable"
+    )
+    report.set_defaults(handler=report_command)
+
+    export = commands.add_parser("export", help="Stream the CSR records as NDJSON and/or a columnar file")
+    export.add_argument("--base", default=".", help="Repository root holding Prod-CSR and UAT-CSR (default: .)")
+    export.add_argument("--ndjson", help="NDJSON output path, or - for stdout")
+    export.add_argument("--columnar", help="Columnar output path: .parquet (needs pyarrow) or gzip JSON columns")
+    export.add_argument("--chunk-size", type=int, default=csr_utils.EXPORT_CHUNK_SIZE, help="Records written at a time")
+    export.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs)")
+    export.set_defaults(handler=export_command)
+
+    verify = commands.add_parser("verify", help="List every CSR with its domain and flag invalid ones")
+    verify.add_argument("--base", default=".", help="Repository root holding Prod-CSR and UAT-CSR (default: .)")
+    verify.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs)")
+    verify.set_defaults(handler=verify_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
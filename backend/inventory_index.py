@@ -0,0 +1,478 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import inventory
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+
+# Query filters and how their string values are converted
+FILTERS: Dict[str, Callable[[str], Any]] = {
+    "environment": str.upper,
+    "service": str,
+    "domain": str,
+    "organization": str,
+    "country": str,
+    "key_type": str.upper,
+    "key_size": int,
+    "curve": str.upper,
+    "signature_algorithm": str,
+    "spki_sha256": str.lower,
+    "csr_sha256": str.lower,
+    "is_valid": lambda value: {"true": 1, "1": 1, "false": 0, "0": 0}[value.lower()]
+}
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Columns holding the record of each CSR, plus the file state it was read from
+COLUMNS = inventory.RECORD_FIELDS + ("size", "mtime_ns", "file_sha256")
+
+# The meta table records which schema the other tables were created with
+META_SCHEMA = "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+
+SCHEMA = META_SCHEMA + f"""
+CREATE TABLE IF NOT EXISTS csrs (
+    id INTEGER PRIMARY KEY,
+    {", ".join(f"{column} {'TEXT UNIQUE NOT NULL' if column == 'path' else ''}".rstrip() for column in COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS csrs_service ON csrs (environment, service, key_size);
+CREATE INDEX IF NOT EXISTS csrs_organization ON csrs (organization);
+CREATE INDEX IF NOT EXISTS csrs_country ON csrs (country);
+CREATE INDEX IF NOT EXISTS csrs_domain ON csrs (domain);
+CREATE INDEX IF NOT EXISTS csrs_key ON csrs (key_type, key_size);
+CREATE INDEX IF NOT EXISTS csrs_spki ON csrs (spki_sha256);
+CREATE INDEX IF NOT EXISTS csrs_digest ON csrs (csr_sha256);
+CREATE TABLE IF NOT EXISTS validations (csr_sha256 TEXT PRIMARY KEY, result TEXT NOT NULL, seen_at INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS validations_seen_at ON validations (seen_at);
+"""
+
+# Seconds a validation result recorded by the API is kept, counted from when it was first seen
+VALIDATION_RETENTION = 30 * 24 * 3600
+
+# Validation results kept at most; the oldest are dropped first
+MAX_VALIDATIONS = 100000
+
+# Validation results waiting for the writer thread; more are dropped
+MAX_PENDING_VALIDATIONS = 10000
+
+# SQLite limits the number of bound parameters per statement
+DELETE_BATCH_SIZE = 500
+
+
+def parse_query(args: Mapping[str, str]) -> Tuple[Dict[str, Any], int, Optional[int]]:
+    """
+    Parse inventory query parameters, e.g. from a request's query string.
+
+    Args:
+        args: Filter values by FILTERS name, plus optional "limit" and "cursor"
+
+    Returns:
+        A tuple containing (filters, limit, cursor)
+
+    Raises:
+        ValueError: If a parameter is unknown or its value is invalid
+    """
+    filters = {}
+    for name, value in args.items():
+        if name in ("limit", "cursor"):
+            continue
+        if name not in FILTERS:
+            raise ValueError(f"Unknown filter: {name} (supported: {', '.join(FILTERS)})")
+        try:
+            filters[name] = FILTERS[name](value)
+        except (KeyError, ValueError):
+            raise ValueError(f"Invalid value for {name}: {value}")
+
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+        cursor = int(args["cursor"]) if args.get("cursor") else None
+    except ValueError:
+        raise ValueError("limit and cursor must be integers")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return filters, limit, cursor
+
+
+class InventoryIndex:
+    """
+    A SQLite index of the CSR inventory, with one row per CSR file.
+
+    Each row holds the file's inventory record next to the size,
+    modification time and content hash it was read from, so sync() only
+    parses added or changed files, like InventoryManifest. Queries filter on
+    indexed columns and page by row id, so they cost the same on the first
+    and the last page.
+
+    The API also records validation results here by CSR digest, so that
+    every server process can answer GET /validate/<sha256>. They are
+    written by a background thread, so recording one never waits for the
+    database.
+
+    Every thread gets its own connection. The database is opened in WAL
+    mode, so queries are not blocked while a sync is being written.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        base: str = ".",
+        interval: float = 60.0,
+        max_validations: int = MAX_VALIDATIONS
+    ):
+        """
+        Create an inventory index; the database is opened on first use.
+
+        Args:
+            path: The SQLite database path
+            base: The repository root holding Prod-CSR/ and UAT-CSR/
+            interval: Seconds between background syncs
+            max_validations: Maximum number of validation results kept
+        """
+        self.path = path
+        self.base = base
+        self.interval = interval
+        self.max_validations = max_validations
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_sync: Dict[str, Any] = {}
+        self._pending_validations: "queue.Queue[Optional[Tuple[str, str, int]]]" = queue.Queue(MAX_PENDING_VALIDATIONS)
+        self._queued_validations = TTLCache(max_entries=MAX_PENDING_VALIDATIONS, ttl=VALIDATION_RETENTION)
+        self._writer: Optional[threading.Thread] = None
+        self._dropped_validations = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(META_SCHEMA)
+            version = connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if version is None or version[0] != f"{SCHEMA_VERSION}:{','.join(COLUMNS)}":
+                # New, or written by another version, possibly with other columns:
+                # recreate the tables and rebuild from the files
+                connection.executescript(
+                    "BEGIN; DROP TABLE IF EXISTS csrs; DROP TABLE IF EXISTS validations; DROP TABLE IF EXISTS meta;"
+                    + SCHEMA + "COMMIT;"
+                )
+                with connection:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO meta VALUES ('version', ?)", (f"{SCHEMA_VERSION}:{','.join(COLUMNS)}",)
+                    )
+            self._local.connection = connection
+        return connection
+
+    def synced_at(self) -> Optional[int]:
+        """Return when the last sync started, in nanoseconds since the epoch, or None if never synced."""
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'synced_at'").fetchone()
+        return int(row[0]) if row is not None else None
+
+    def sync(self, workers: Optional[int] = 1) -> Dict[str, int]:
+        """
+        Bring the index up to date with the CSR files under the base directory.
+
+        Args:
+            workers: Number of worker processes for parsing changed files
+
+        Returns:
+            Counts of added, updated, removed and unchanged files
+        """
+        with self._sync_lock:
+            connection = self._connection()
+            started = time.time_ns()
+            trusted_before = (self.synced_at() or 0) - inventory.RACY_WINDOW_NS
+            stored = {
+                path: (size, mtime_ns, digest)
+                for path, size, mtime_ns, digest in connection.execute(
+                    "SELECT path, size, mtime_ns, file_sha256 FROM csrs"
+                )
+            }
+
+            counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+            seen = set()
+            changed = []
+            stamps: Dict[str, Tuple[int, int, str]] = {}
+            for environment, service, path in inventory.iter_inventory_files(self.base):
+                try:
+                    stat = os.stat(path)
+                    state = stored.get(path)
+                    if state is not None and state[0] == stat.st_size and state[1] == stat.st_mtime_ns \
+                            and stat.st_mtime_ns < trusted_before:
+                        seen.add(path)
+                        counts["unchanged"] += 1
+                        continue
+                    digest = inventory.file_sha256(path)
+                except OSError:
+                    continue
+
+                seen.add(path)
+                stamps[path] = (stat.st_size, stat.st_mtime_ns, digest)
+                if state is not None and state[2] == digest:
+                    # Touched but not modified: keep the parsed record
+                    counts["unchanged"] += 1
+                    continue
+                changed.append((environment, service, path))
+                counts["added" if state is None else "updated"] += 1
+
+            removed = [path for path in stored if path not in seen]
+            counts["removed"] = len(removed)
+            records = inventory.read_records(changed, workers)
+
+            placeholders = ", ".join("?" * len(COLUMNS))
+            updates = ", ".join(f"{column} = excluded.{column}" for column in COLUMNS if column != "path")
+            with connection:
+                connection.executemany(
+                    f"INSERT INTO csrs ({', '.join(COLUMNS)}) VALUES ({placeholders}) "
+                    f"ON CONFLICT (path) DO UPDATE SET {updates}",
+                    (
+                        [record[field] for field in inventory.RECORD_FIELDS] + list(stamps[record["path"]])
+                        for record in records
+                    )
+                )
+                connection.executemany(
+                    "UPDATE csrs SET size = ?, mtime_ns = ?, file_sha256 = ? WHERE path = ?",
+                    (stamp + (path,) for path, stamp in stamps.items() if stored.get(path, (None,) * 3)[2] == stamp[2])
+                )
+                for i in range(0, len(removed), DELETE_BATCH_SIZE):
+                    batch = removed[i:i + DELETE_BATCH_SIZE]
+                    connection.execute(f"DELETE FROM csrs WHERE path IN ({', '.join('?' * len(batch))})", batch)
+                connection.execute("INSERT OR REPLACE INTO meta VALUES ('synced_at', ?)", (str(started),))
+            if changed or removed:
+                connection.execute("PRAGMA optimize")
+
+            with self._lock:
+                self._last_sync = {**counts, "seconds": round((time.time_ns() - started) / 1e9, 3)}
+            return counts
+
+    def query(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Return one page of the inventory records matching all filters.
+
+        Args:
+            filters: Exact values by FILTERS name, e.g. {"service": "NI-API", "key_size": 2048}
+            limit: Maximum number of records in the page
+            cursor: The "next_cursor" of the previous page, or None for the first page
+
+        Returns:
+            A dict with the page's "records" and the "next_cursor" of the
+            following page, which is None on the last page
+
+        Raises:
+            ValueError: If a filter is not supported
+        """
+        filters = filters or {}
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter: {', '.join(sorted(unknown))}")
+
+        conditions = [f"{name} = ?" for name in filters]
+        parameters = list(filters.values())
+        if cursor is not None:
+            conditions.append("id > ?")
+            parameters.append(cursor)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._connection().execute(
+            f"SELECT id, {', '.join(inventory.RECORD_FIELDS)} FROM csrs {where} ORDER BY id LIMIT ?",
+            parameters + [limit + 1]
+        ).fetchall()
+
+        records = []
+        for row in rows[:limit]:
+            record = dict(zip(inventory.RECORD_FIELDS, row[1:]))
+            if record["is_valid"] is not None:
+                record["is_valid"] = bool(record["is_valid"])
+            records.append(record)
+        return {"records": records, "next_cursor": str(rows[limit - 1][0]) if len(rows) > limit else None}
+
+    def remember_validation(self, digest: str, result: Dict[str, Any]) -> None:
+        """
+        Queue the validation result of a CSR, so every server process can serve it.
+
+        The result is written by a background thread; it is dropped if the
+        queue is full. Results older than VALIDATION_RETENTION, and the
+        oldest beyond max_validations, are dropped as new ones are written.
+
+        Args:
+            digest: The hex SHA-256 digest of the CSR's DER encoding
+            result: The parse_csr result
+        """
+        if digest in self._queued_validations:
+            return
+        self._start_writer()
+        self._queued_validations.set(digest, True)
+        try:
+            self._pending_validations.put_nowait((digest, json.dumps(result), time.time_ns()))
+        except queue.Full:
+            self._queued_validations.delete(digest)
+            with self._lock:
+                self._dropped_validations += 1
+
+    def flush(self) -> None:
+        """Wait until every queued validation result has been written."""
+        self._pending_validations.join()
+
+    def _start_writer(self) -> None:
+        with self._lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._write_loop, name="inventory-index-writer", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._pending_validations.get()]
+            while True:
+                try:
+                    batch.append(self._pending_validations.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = [row for row in batch if row is not None]
+            try:
+                if rows:
+                    self._write_validations(rows)
+            except sqlite3.Error:
+                logger.exception("Failed to record %d validation results in %s", len(rows), self.path)
+                for digest, _, _ in rows:
+                    # Let a later request record it again
+                    self._queued_validations.delete(digest)
+            finally:
+                for _ in batch:
+                    self._pending_validations.task_done()
+            if len(rows) < len(batch):
+                return
+
+    def _write_validations(self, rows: List[Tuple[str, str, int]]) -> None:
+        connection = self._connection()
+        with connection:
+            connection.executemany("INSERT OR IGNORE INTO validations VALUES (?, ?, ?)", rows)
+            connection.execute(
+                "DELETE FROM validations WHERE seen_at < ?",
+                (time.time_ns() - int(VALIDATION_RETENTION * 1e9),)
+            )
+            connection.execute(
+                "DELETE FROM validations WHERE csr_sha256 IN "
+                "(SELECT csr_sha256 FROM validations ORDER BY seen_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_validations,)
+            )
+
+    def lookup_validation(self, digest: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a validation result recorded by remember_validation.
+
+        Args:
+            digest: The hex SHA-256 digest of the CSR's DER encoding
+
+        Returns:
+            The parse_csr result, or None if none was recorded
+        """
+        row = self._connection().execute(
+            "SELECT result FROM validations WHERE csr_sha256 = ?", (digest,)
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def start(self) -> None:
+        """Start syncing in a background thread every interval seconds, if not already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._sync_loop, name="inventory-index-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background sync thread, and the writer once the queued validation results are written."""
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._pending_validations.put(None)
+            writer.join(timeout)
+
+    def _sync_loop(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self.sync()
+            except (OSError, sqlite3.Error):
+                # Keep serving the last synced state; the next round retries
+                logger.exception("Failed to sync the inventory index %s", self.path)
+            self._stopped.wait(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report the index size and the outcome of the last sync."""
+        with self._lock:
+            last_sync = dict(self._last_sync)
+            running = self._thread is not None and self._thread.is_alive()
+            validations = {
+                "pending": self._pending_validations.qsize(),
+                "dropped": self._dropped_validations
+            }
+        if not os.path.exists(self.path):
+            # Not created until the first query or sync
+            return {"csrs": 0, "synced_at": None, "last_sync": last_sync, "running": running, "validations": validations}
+        return {
+            "csrs": self._connection().execute("SELECT COUNT(*) FROM csrs").fetchone()[0],
+            "synced_at": self.synced_at(),
+            "last_sync": last_sync,
+            "running": running,
+            "validations": validations
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain and query the SQLite CSR inventory index")
+    parser.add_argument("--base", default=".", help="Repository root holding Prod-CSR and UAT-CSR (default: .)")
+    parser.add_argument("--db", default=".csr_inventory.db", help="SQLite database path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync = commands.add_parser("sync", help="Index added or changed CSRs and drop deleted ones")
+    sync.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs)")
+
+    query = commands.add_parser("query", help="Print the CSRs matching filters as JSON lines")
+    query.add_argument("filters", nargs="*", metavar="NAME=VALUE", help=f"Filters: {', '.join(FILTERS)}")
+    args = parser.parse_args(argv)
+
+    index = InventoryIndex(args.db, args.base)
+    if args.command == "sync":
+        counts = index.sync(workers=args.workers)
+        print(", ".join(f"{count} {name}" for name, count in counts.items()), file=sys.stderr)
+        return 0
+
+    try:
+        filters, _, _ = parse_query(dict(item.split("=", 1) for item in args.filters if "=" in item))
+    except ValueError as e:
+        parser.error(str(e))
+    cursor = None
+    while True:
+        page = index.query(filters, MAX_PAGE_SIZE, cursor)
+        for record in page["records"]:
+            sys.stdout.write(json.dumps(record) + "\n")
+        cursor = page["next_cursor"] and int(page["next_cursor"])
+        if cursor is None:
+            return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
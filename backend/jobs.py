@@ -0,0 +1,130 @@
+import secrets
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from ttl_cache import TTLCache
+
+
+class JobBackend(ABC):
+    """
+    Storage for job records.
+
+    Subclasses decide where records live; JobStore only needs get and put.
+    """
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job record, or None if it is unknown or expired."""
+
+    @abstractmethod
+    def put(self, job_id: str, job: Dict[str, Any]) -> None:
+        """Store or replace a job record."""
+
+    def stats(self) -> Dict[str, Any]:
+        """Report backend statistics."""
+        return {}
+
+
+class LocalJobBackend(JobBackend):
+    """
+    In-process job storage in a bounded TTL cache.
+
+    Records are only visible to the process that created them, so behind a
+    multi-process server each job must be polled on the same process.
+    """
+
+    def __init__(self, max_jobs: int = 1000, ttl: float = 3600):
+        """
+        Create an in-process job backend.
+
+        Args:
+            max_jobs: Maximum number of jobs kept; the least recently used are evicted
+            ttl: Seconds a job record is kept after it was last updated
+        """
+        self._jobs = TTLCache(max_entries=max_jobs, ttl=ttl)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    def put(self, job_id: str, job: Dict[str, Any]) -> None:
+        self._jobs.set(job_id, job)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._jobs.stats()
+
+
+class JobStore:
+    """
+    Tracks background jobs and keeps their results for a limited time.
+    """
+
+    def __init__(self, backend: Optional[JobBackend] = None):
+        """
+        Create a job store.
+
+        Args:
+            backend: Where job records are kept (default: LocalJobBackend)
+        """
+        self.backend = backend or LocalJobBackend()
+
+    def submit(
+        self,
+        kind: str,
+        future: Future,
+        serialize: Callable[[Any], Dict[str, Any]] = lambda result: result
+    ) -> Dict[str, Any]:
+        """
+        Track a running task as a job.
+
+        Args:
+            kind: The job kind, e.g. "generate"
+            future: The future of the running task
+            serialize: Converts the task result into the job's JSON result
+
+        Returns:
+            The new job record
+        """
+        job_id = secrets.token_urlsafe(16)
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": "pending",
+            "created_at": time.time(),
+            "completed_at": None
+        }
+        self.backend.put(job_id, job)
+
+        def on_done(done: Future) -> None:
+            completed = {**job, "completed_at": time.time()}
+            if done.cancelled():
+                # result() would raise CancelledError, which is not an Exception
+                self.backend.put(job_id, {**completed, "error": "Job was cancelled", "status": "failed"})
+                return
+            try:
+                completed["result"] = serialize(done.result())
+                completed["status"] = "succeeded"
+            except Exception as e:
+                completed["error"] = str(e)
+                completed["status"] = "failed"
+            self.backend.put(job_id, completed)
+
+        future.add_done_callback(on_done)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job.
+
+        Args:
+            job_id: The job id returned by submit
+
+        Returns:
+            The job record, or None if it is unknown or expired
+        """
+        return self.backend.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report job storage statistics."""
+        return self.backend.stats()
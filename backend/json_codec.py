@@ -0,0 +1,59 @@
+import json
+from typing import Any, Callable
+
+# orjson is installed from requirements.txt; without it the json module is used
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKENDS = ("auto", "orjson", "stdlib")
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _orjson_dumps(obj: Any) -> bytes:
+    # Integer keys, e.g. key sizes in /stats, are written as strings like the json module does
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+_dumps: Callable[[Any], bytes] = _orjson_dumps if orjson is not None else _stdlib_dumps
+_backend = "orjson" if orjson is not None else "stdlib"
+
+
+def configure(backend: str = "auto") -> str:
+    """
+    Choose the JSON encoder used by dumps.
+
+    Args:
+        backend: "orjson", "stdlib", or "auto" for orjson when it is installed
+
+    Returns:
+        The name of the encoder in use
+
+    Raises:
+        ValueError: If the backend is unknown, or orjson is requested but not installed
+    """
+    global _dumps, _backend
+    if backend not in JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON encoder: {backend} (expected one of {', '.join(JSON_BACKENDS)})")
+    if backend == "orjson" and orjson is None:
+        raise ValueError("orjson is not installed (pip install orjson)")
+
+    if backend == "stdlib" or orjson is None:
+        _dumps, _backend = _stdlib_dumps, "stdlib"
+    else:
+        _dumps, _backend = _orjson_dumps, "orjson"
+    return _backend
+
+
+def backend() -> str:
+    """Return the name of the JSON encoder in use."""
+    return _backend
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize an object to compact UTF-8 JSON with the configured encoder."""
+    return _dumps(obj)
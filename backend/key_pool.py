@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Optional
+
+import csr_utils
+
+
+class KeyPool:
+    """
+    A pool of pre-generated private keys, split by key size.
+
+    A background thread keeps each pooled key size between a low and a high
+    watermark so that requests only have to sign the CSR. Requests for a key
+    size that is not pooled, or that arrive while the pool is empty, fall back
+    to generating the key inline.
+    """
+
+    def __init__(
+        self,
+        key_sizes: Iterable[int] = (2048,),
+        low_watermark: int = 2,
+        high_watermark: int = 8,
+        generate: Callable[[int], Any] = csr_utils.generate_private_key
+    ):
+        """
+        Create a key pool.
+
+        Args:
+            key_sizes: The RSA key sizes to keep pre-generated keys for
+            low_watermark: Refill a key size once its depth drops below this
+            high_watermark: Stop refilling a key size once it reaches this depth
+            generate: Callable that generates one key for a given key size
+        """
+        if low_watermark < 0 or high_watermark < max(low_watermark, 1):
+            raise ValueError("Key pool watermarks must satisfy 0 <= low <= high and high >= 1")
+
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self._generate = generate
+        self._keys: Dict[int, Deque[Any]] = {size: deque() for size in key_sizes}
+        self._hits: Dict[int, int] = {size: 0 for size in self._keys}
+        self._misses: Dict[int, int] = {size: 0 for size in self._keys}
+        self._unpooled_requests = 0
+        self._keys_generated = 0
+        self._generation_seconds = 0.0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background refill thread if it is not already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._refill_loop, name="key-pool-refill", daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background refill thread."""
+        self._stopped.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def try_acquire(self, key_size: int) -> Optional[Any]:
+        """
+        Take a key of the given size from the pool without generating one.
+
+        Args:
+            key_size: The RSA key size in bits
+
+        Returns:
+            A pre-generated key, or None if none is ready
+        """
+        with self._lock:
+            keys = self._keys.get(key_size)
+            if keys is None:
+                self._unpooled_requests += 1
+                return None
+            if not keys:
+                self._misses[key_size] += 1
+                self._wakeup.set()
+                key = None
+            else:
+                self._hits[key_size] += 1
+                key = keys.popleft()
+                if len(keys) < self.low_watermark:
+                    self._wakeup.set()
+
+        if self._thread is None:
+            self.start()
+        return key
+
+    def acquire(self, key_size: int) -> Any:
+        """
+        Take a key of the given size from the pool.
+
+        Args:
+            key_size: The RSA key size in bits
+
+        Returns:
+            A pre-generated key, or a freshly generated one if none is ready
+        """
+        key = self.try_acquire(key_size)
+        if key is None:
+            key = self._generate(key_size)
+        return key
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report pool depth, hit/miss counts and refill rate.
+
+        Returns:
+            A dictionary of pool statistics
+        """
+        with self._lock:
+            generation_seconds = self._generation_seconds
+            return {
+                "low_watermark": self.low_watermark,
+                "high_watermark": self.high_watermark,
+                "running": self._thread is not None and self._thread.is_alive(),
+                "sizes": {
+                    str(size): {
+                        "depth": len(keys),
+                        "hits": self._hits[size],
+                        "misses": self._misses[size]
+                    }
+                    for size, keys in self._keys.items()
+                },
+                "unpooled_requests": self._unpooled_requests,
+                "keys_generated": self._keys_generated,
+                "refill_rate": self._keys_generated / generation_seconds if generation_seconds else 0.0
+            }
+
+    def _next_size_to_refill(self) -> Optional[int]:
+        # Prefer the key size that is furthest below its high watermark
+        with self._lock:
+            candidates = [(len(keys), size) for size, keys in self._keys.items() if len(keys) < self.high_watermark]
+        if not candidates:
+            return None
+        return min(candidates)[1]
+
+    def _needs_refill(self) -> bool:
+        with self._lock:
+            return any(len(keys) < self.low_watermark for keys in self._keys.values())
+
+    def _refill_loop(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+            # Once woken, fill every size back up to the high watermark
+            while not self._stopped.is_set():
+                key_size = self._next_size_to_refill()
+                if key_size is None:
+                    break
+
+                started = time.perf_counter()
+                try:
+                    key = self._generate(key_size)
+                except Exception:
+                    # Leave the pool as is; requests will fall back to inline generation
+                    break
+                elapsed = time.perf_counter() - started
+
+                with self._lock:
+                    self._keys[key_size].append(key)
+                    self._keys_generated += 1
+                    self._generation_seconds += elapsed
+
+            if self._needs_refill() and not self._stopped.is_set():
+                # Generation failed; back off before trying again
+                self._stopped.wait(1.0)
+                self._wakeup.set()
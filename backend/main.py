@@ -1,11 +1,21 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
 from flask_cors import CORS
-from typing import Dict, Any, Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 import OpenSSL.crypto as crypto
 import os
-import json
+import re
+import base64
 from datetime import datetime
 
+import compression
+import csr_utils
+import json_codec
+from crypto_workers import CryptoWorkers, WorkersBusyError
+from jobs import JobStore, LocalJobBackend
+from inventory_index import InventoryIndex, parse_query
+from key_pool import KeyPool
+
 app = Flask(__name__)
 
 # Configure CORS
@@ -13,10 +23,376 @@ CORS(app, resources={
     r"/*": {
         "origins": ["http://localhost:3000", "https://shahmeetk.github.io"],
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
+        "allow_headers": ["Content-Type", "If-None-Match"],
+        "expose_headers": ["ETag", "Content-Location"]
     }
 })
 
+# Worker processes for key generation and CSR signing
+crypto_workers = CryptoWorkers(
+    max_workers=int(os.environ.get("CRYPTO_WORKERS", 0)) or None,
+    max_pending=int(os.environ.get("CRYPTO_MAX_PENDING", 0)) or None
+)
+
+def generate_pooled_key(key_size: int) -> str:
+    return crypto_workers.run(csr_utils.generate_private_key_pem, key_size)
+
+# Pre-generated key pool, refilled in the background between the watermarks
+key_pool = KeyPool(
+    key_sizes=[int(size) for size in os.environ.get("KEY_POOL_SIZES", "2048").split(",") if size.strip()],
+    low_watermark=int(os.environ.get("KEY_POOL_LOW_WATERMARK", 2)),
+    high_watermark=int(os.environ.get("KEY_POOL_HIGH_WATERMARK", 8)),
+    generate=generate_pooled_key
+)
+
+# Parsed CSRs are cached by the SHA-256 of their DER encoding
+csr_utils.configure_parse_cache(
+    max_entries=int(os.environ.get("CSR_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("CSR_CACHE_TTL", 3600))
+)
+
+# Signature verification results, shared by every request thread
+csr_utils.configure_verify_cache(max_entries=int(os.environ.get("VERIFY_CACHE_SIZE", 16384)))
+
+# Background jobs for expensive key sizes; results are kept for JOB_TTL seconds
+job_store = JobStore(LocalJobBackend(
+    max_jobs=int(os.environ.get("JOB_MAX_ENTRIES", 1000)),
+    ttl=float(os.environ.get("JOB_TTL", 3600))
+))
+
+# SQLite index of the Prod-CSR/ and UAT-CSR/ folders, synced every INVENTORY_SYNC_INTERVAL seconds;
+# it also keeps up to VALIDATION_DB_MAX_ENTRIES validation results for GET /validate/<sha256>
+INVENTORY_BASE = os.environ.get("INVENTORY_BASE", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+inventory_index = InventoryIndex(
+    os.environ.get("INVENTORY_DB", os.path.join(INVENTORY_BASE, ".csr_inventory.db")),
+    base=INVENTORY_BASE,
+    interval=float(os.environ.get("INVENTORY_SYNC_INTERVAL", 60)),
+    max_validations=int(os.environ.get("VALIDATION_DB_MAX_ENTRIES", 100000))
+)
+
+# JSON encoder for every response: "auto" uses orjson when it is installed
+json_codec.configure(os.environ.get("JSON_ENCODER", "auto"))
+
+# Responses of at least this many bytes are compressed when the client accepts gzip or brotli
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+COMPRESSIBLE_MIMETYPES = ('application/json',)
+
+# Warm the crypto worker processes when a server process starts
+PREWARM = os.environ.get("PREWARM", "1") != "0"
+
+def start_background_services() -> None:
+    """
+    Start this server process's crypto worker processes and key pool thread.
+
+    Threads and process pools do not survive a fork, so this runs once in
+    every server process: from __main__ for the development server and from
+    the post_fork hook in gunicorn.conf.py.
+    """
+    crypto_workers.start()
+    if PREWARM:
+        crypto_workers.warm_up(csr_utils.generate_private_key_pem, key_type="EC-P256")
+    key_pool.start()
+
+def stop_background_services() -> None:
+    """Stop the background threads and worker processes of this server process."""
+    key_pool.stop(timeout=5)
+    inventory_index.stop(timeout=5)
+    crypto_workers.shutdown(wait=False)
+
+# Threads for CSR parsing and signature verification in bulk validation
+VALIDATION_WORKERS = int(os.environ.get("VALIDATION_WORKERS", 0)) or os.cpu_count() or 1
+validation_pool = ThreadPoolExecutor(max_workers=VALIDATION_WORKERS, thread_name_prefix="validate")
+
+# Limit for /validate/batch
+MAX_VALIDATE_BATCH_SIZE = int(os.environ.get("MAX_VALIDATE_BATCH_SIZE", 10000))
+
+# Seconds clients and CDNs may reuse a /validate result, which depends only on the CSR
+VALIDATE_CACHE_MAX_AGE = int(os.environ.get("VALIDATE_CACHE_MAX_AGE", 86400))
+
+# Path form of a CSR digest in GET /validate/<sha256>
+SHA256_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+# Content types of raw CSR request bodies: DER (or base64 DER) and PEM
+RAW_CSR_MIMETYPES = ('application/pkcs10', 'application/x-pem-file')
+
+# Output formats of generated CSRs and keys
+OUTPUT_FORMATS = ('pem', 'der')
+
+# Content type of streamed responses; one JSON object per line
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Fields every generation request must provide
+REQUIRED_GENERATE_FIELDS = ['common_name', 'organization', 'country', 'service', 'environment']
+
+# Limits for /generate/batch
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 100))
+MAX_BATCH_KEY_BITS = int(os.environ.get("MAX_BATCH_KEY_BITS", 100 * 4096))
+
+# Key bits counted against MAX_BATCH_KEY_BITS for non-RSA key types
+KEY_TYPE_BITS = {"EC-P256": 256, "EC-P384": 384, "EC-P521": 521, "ED25519": 256}
+
+def parse_generation_request(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate a generation request.
+
+    Args:
+        data: The request body of a /generate call, or one item of a batch
+
+    Returns:
+        Keyword arguments for csr_utils.generate_csr
+
+    Raises:
+        ValueError: If a required field is missing or a value is invalid
+    """
+    for field in REQUIRED_GENERATE_FIELDS:
+        if field not in data:
+            raise ValueError(f"Missing required field: {field}")
+
+    return {
+        "key_type": csr_utils.normalize_key_type(data.get('key_type', 'RSA')),
+        "key_size": int(data.get('key_size', 2048)),
+        "common_name": data['common_name'],
+        "organization": data['organization'],
+        "organizational_unit": data.get('organizational_unit'),
+        "locality": data.get('locality'),
+        "state": data.get('state'),
+        "country": data['country'],
+        "email": data.get('email')
+    }
+
+def key_bits(spec: Dict[str, Any]) -> int:
+    return spec['key_size'] if spec['key_type'] == 'RSA' else KEY_TYPE_BITS[spec['key_type']]
+
+def submit_generation(spec: Dict[str, Any], block: bool = False) -> Future:
+    """
+    Submit CSR generation to the crypto workers.
+
+    Args:
+        spec: Arguments returned by parse_generation_request
+        block: Wait for a free worker slot instead of raising WorkersBusyError
+
+    Returns:
+        A future resolving to (csr_pem, key_pem)
+    """
+    # Sign with a pre-generated RSA key if one is ready, otherwise generate
+    # the key as well; either way the work runs in a worker process
+    subject = {name: value for name, value in spec.items() if name not in ('key_type', 'key_size')}
+    key_pem = key_pool.try_acquire(spec['key_size']) if spec['key_type'] == 'RSA' else None
+    if key_pem is not None:
+        return crypto_workers.submit(csr_utils.build_csr, key_pem, block=block, **subject)
+    return crypto_workers.submit(csr_utils.generate_csr, block=block, **spec)
+
+def iter_completed(
+    submissions: Iterable[Tuple[int, Callable[[], Future]]],
+    window: int
+) -> Iterator[Tuple[int, Future]]:
+    """
+    Run submissions with a bounded number in flight.
+
+    Args:
+        submissions: Pairs of (index, callable that submits the task)
+        window: Maximum number of tasks in flight at once
+
+    Yields:
+        Pairs of (index, future) in completion order
+    """
+    submissions = iter(submissions)
+    in_flight: Dict[Future, int] = {}
+    exhausted = False
+    while True:
+        while not exhausted and len(in_flight) < window:
+            try:
+                index, submit = next(submissions)
+            except StopIteration:
+                exhausted = True
+                break
+            in_flight[submit()] = index
+        if not in_flight:
+            return
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield in_flight.pop(future), future
+
+def validate_one(index: int, csr_pem: Any) -> Dict[str, Any]:
+    try:
+        if not isinstance(csr_pem, (str, bytes)) or not csr_pem:
+            raise ValueError("Missing CSR data")
+        csr_info = csr_utils.parse_csr(csr_pem)
+        return {"index": index, **csr_info, **csr_utils.assess_csr(csr_info)}
+    except Exception as e:
+        return {"index": index, "error": str(e)}
+
+def validate_in_parallel(csrs: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Validate CSRs on the validation threads.
+
+    Args:
+        csrs: CSRs in PEM format
+
+    Yields:
+        Index-tagged parse_csr results, or errors, in completion order
+    """
+    submissions = (
+        (index, lambda index=index, csr_pem=csr_pem: validation_pool.submit(validate_one, index, csr_pem))
+        for index, csr_pem in enumerate(csrs)
+    )
+    for _, future in iter_completed(submissions, VALIDATION_WORKERS * 2):
+        yield future.result()
+
+def raw_csr_body() -> Optional[bytes]:
+    """Return the request body if it is a raw CSR rather than JSON."""
+    if request.mimetype in RAW_CSR_MIMETYPES:
+        return request.get_data()
+    return None
+
+def validation_cache_headers(digest: str) -> Dict[str, str]:
+    """
+    Return the caching headers of a CSR's validation result.
+
+    The ETag is the SHA-256 of the CSR's DER encoding. It is weak because the
+    same result may be sent with different content codings.
+
+    Args:
+        digest: The hex SHA-256 digest of the CSR's DER encoding
+
+    Returns:
+        ETag and Cache-Control headers
+    """
+    return {
+        'ETag': f'W/"{digest}"',
+        'Cache-Control': f'public, max-age={VALIDATE_CACHE_MAX_AGE}'
+    }
+
+def validate_with_headers(csr_data: Any) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Parse and verify a CSR, and record the result for GET /validate/<sha256>.
+
+    The result is queued for the inventory index, which every server
+    process shares; this process serves the GET form from its parse cache
+    until the index has it.
+
+    Args:
+        csr_data: The CSR in PEM or DER format
+
+    Returns:
+        A tuple containing (parse_csr result, response headers)
+    """
+    info = csr_utils.parse_csr(csr_data)
+    try:
+        digest = csr_utils.csr_digest(csr_data)
+    except ValueError:
+        # Only PEM the DER decoder rejects gets here; it has no content address
+        return info, {}
+
+    inventory_index.remember_validation(digest, info)
+    headers = validation_cache_headers(digest)
+    headers['Content-Location'] = f'/validate/{digest}'
+    return info, headers
+
+def validation_response(csr_data: Any) -> Response:
+    """Parse and verify a CSR, returning its result with caching headers."""
+    info, headers = validate_with_headers(csr_data)
+    response = jsonify(info)
+    response.headers.update(headers)
+    return response
+
+def find_validation(digest: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up the validation result of a previously seen CSR by its digest.
+
+    Recently validated CSRs are served from the parse cache, then from the
+    results recorded in the inventory index by any server process. Otherwise
+    a CSR file with that digest in the inventory index is parsed again.
+
+    Args:
+        digest: The hex SHA-256 digest of the CSR's DER encoding
+
+    Returns:
+        The parse_csr result, or None if no such CSR has been seen
+
+    Raises:
+        ValueError: If the CSR is invalid
+    """
+    info = csr_utils.lookup_parsed_csr(digest)
+    if info is not None or not os.path.exists(inventory_index.path):
+        return info
+
+    info = inventory_index.lookup_validation(digest)
+    if info is not None:
+        return info
+    for record in inventory_index.query({"csr_sha256": digest}, limit=1)["records"]:
+        try:
+            with open(record["path"], "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        # The file may have changed since the last sync
+        if csr_utils.csr_digest(data) == digest:
+            return csr_utils.parse_csr(data)
+    return None
+
+def output_format(data: Dict[str, Any]) -> str:
+    value = str(data.get('format', 'pem')).lower()
+    if value not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported format: {value} (expected one of {', '.join(OUTPUT_FORMATS)})")
+    return value
+
+def generated_result(csr_pem: str, key_pem: str, fmt: str = 'pem') -> Dict[str, Any]:
+    """
+    Serialize a generated CSR and private key.
+
+    Args:
+        csr_pem: The CSR in PEM format
+        key_pem: The private key in PEM format
+        fmt: "pem", or "der" for base64 DER without PEM armour
+
+    Returns:
+        The "csr" and "private_key" fields of a generation response
+    """
+    if fmt == 'der':
+        return {
+            "csr": base64.b64encode(csr_utils.pem_to_der(csr_pem)).decode('ascii'),
+            "private_key": base64.b64encode(csr_utils.private_key_pem_to_der(key_pem)).decode('ascii'),
+            "format": "der"
+        }
+    return {"csr": csr_pem, "private_key": key_pem}
+
+def jsonify(obj: Any) -> Response:
+    """Serialize an object as a JSON response with the configured encoder."""
+    return Response(json_codec.dumps(obj), mimetype='application/json')
+
+def wants_ndjson() -> bool:
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson_response(results: Iterable[Dict[str, Any]]) -> Response:
+    """
+    Stream results as newline-delimited JSON, one line per result.
+
+    Args:
+        results: Result objects, written as they are produced
+
+    Returns:
+        A streamed application/x-ndjson response
+    """
+    return Response((json_codec.dumps(result) + b"\n" for result in results), mimetype=NDJSON_MIMETYPE)
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    # Streamed responses are sent as produced, so only buffered bodies are compressed
+    if response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers \
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = compression.negotiate(request.headers.get('Accept-Encoding'))
+    if encoding is not None:
+        response.set_data(compression.compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
 # Routes
 @app.route('/')
 def root():
@@ -27,53 +403,140 @@ def generate_csr():
     try:
         data = request.json
 
-        # Validate required fields
-        required_fields = ['common_name', 'organization', 'country', 'service', 'environment']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-
-        # Create a key pair
-        key = crypto.PKey()
-        key.generate_key(crypto.TYPE_RSA, data.get('key_size', 2048))
-
-        # Create a CSR
-        req = crypto.X509Req()
-        subject = req.get_subject()
-
-        # Set subject fields
-        subject.CN = data['common_name']
-        subject.O = data['organization']
-        if data.get('organizational_unit'):
-            subject.OU = data['organizational_unit']
-        if data.get('locality'):
-            subject.L = data['locality']
-        if data.get('state'):
-            subject.ST = data['state']
-        subject.C = data['country']
-        if data.get('email'):
-            subject.emailAddress = data['email']
-
-        # Sign the CSR with the private key
-        req.set_pubkey(key)
-        req.sign(key, 'sha256')
-
-        # Convert to PEM format
-        csr_pem = crypto.dump_certificate_request(crypto.FILETYPE_PEM, req).decode('utf-8')
-        key_pem = crypto.dump_privatekey(crypto.FILETYPE_PEM, key).decode('utf-8')
+        # Validate the request
+        try:
+            spec = parse_generation_request(data)
+            fmt = output_format(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        csr_pem, key_pem = submit_generation(spec).result()
+
+        return jsonify(generated_result(csr_pem, key_pem, fmt))
+
+    except WorkersBusyError as e:
+        return jsonify({"error": str(e)}), 503
 
+    except Exception as e:
+        return jsonify({"error": f"Error generating CSR: {str(e)}"}), 500
+
+@app.route('/generate/batch', methods=['POST'])
+def generate_csr_batch():
+    try:
+        data = request.json
+        items = data if isinstance(data, list) else data.get('items')
+        defaults = {} if isinstance(data, list) else data.get('defaults', {})
+
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Missing batch items"}), 400
+        try:
+            fmt = output_format({} if isinstance(data, list) else data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch size {len(items)} exceeds the limit of {MAX_BATCH_SIZE}"}), 413
+
+        # Validate every item up front; invalid items are reported, not submitted
+        results: Dict[int, Dict[str, Any]] = {}
+        specs: Dict[int, Dict[str, Any]] = {}
+        for index, item in enumerate(items):
+            item = {**defaults, **item} if isinstance(item, dict) else item
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("Batch item must be an object")
+                if 'common_name' not in item and 'service' in item and 'environment' in item:
+                    item['common_name'] = csr_utils.suggest_domain_name(item['service'], item['environment'])
+                specs[index] = parse_generation_request(item)
+            except (ValueError, TypeError) as e:
+                results[index] = {"index": index, "error": str(e)}
+
+        total_bits = sum(key_bits(spec) for spec in specs.values())
+        if total_bits > MAX_BATCH_KEY_BITS:
+            return jsonify({"error": f"Batch requests {total_bits} key bits, exceeding the limit of {MAX_BATCH_KEY_BITS}"}), 413
+
+        def completed_results() -> Iterator[Dict[str, Any]]:
+            # Invalid items first, then generated items as they complete
+            for index in sorted(results):
+                yield results[index]
+
+            # Generate in parallel across the crypto workers
+            submissions = (
+                (index, lambda spec=spec: submit_generation(spec, block=True))
+                for index, spec in specs.items()
+            )
+            for index, future in iter_completed(submissions, crypto_workers.max_workers):
+                try:
+                    csr_pem, key_pem = future.result()
+                    yield {"index": index, **generated_result(csr_pem, key_pem, fmt)}
+                except Exception as e:
+                    yield {"index": index, "error": f"Error generating CSR: {str(e)}"}
+
+        if wants_ndjson():
+            return ndjson_response(completed_results())
+
+        ordered = sorted(completed_results(), key=lambda result: result['index'])
+        failed = sum(1 for result in ordered if 'error' in result)
         return jsonify({
-            "csr": csr_pem,
-            "private_key": key_pem
+            "results": ordered,
+            "succeeded": len(ordered) - failed,
+            "failed": failed
         })
 
     except Exception as e:
-        return jsonify({"error": f"Error generating CSR: {str(e)}"}), 500
+        return jsonify({"error": f"Error generating CSR batch: {str(e)}"}), 500
+
+@app.route('/jobs/generate', methods=['POST'])
+def create_generate_job():
+    try:
+        data = request.json
+
+        # Validate the request before queueing it
+        try:
+            spec = parse_generation_request(data)
+            fmt = output_format(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        job = job_store.submit(
+            'generate',
+            submit_generation(spec),
+            serialize=lambda result: generated_result(result[0], result[1], fmt)
+        )
+
+        response = jsonify(job)
+        response.status_code = 202
+        response.headers['Location'] = f"/jobs/{job['id']}"
+        return response
+
+    except WorkersBusyError as e:
+        return jsonify({"error": str(e)}), 503
+
+    except Exception as e:
+        return jsonify({"error": f"Error creating job: {str(e)}"}), 500
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    return jsonify(job)
 
 @app.route('/validate', methods=['POST'])
 def validate_csr():
     try:
+        # A raw DER or PEM body is validated as is
+        body = raw_csr_body()
+        if body is not None:
+            if not body:
+                return jsonify({"error": "Missing CSR data"}), 400
+            return validation_response(body)
+
         data = request.json
+
+        # Stream results for a list of CSRs as each one is validated
+        if wants_ndjson() and isinstance(data.get('csrs'), list):
+            return ndjson_response(validate_in_parallel(data['csrs']))
+
         csr_data = data.get('csr_data')
 
         if not csr_data:
@@ -81,45 +544,122 @@ def validate_csr():
             csr_data = data.get('csr')
             if not csr_data:
                 return jsonify({"error": "Missing CSR data"}), 400
+        if not isinstance(csr_data, str):
+            return jsonify({"error": "CSR data must be a PEM or base64 DER string"}), 400
 
-        # Parse the CSR
-        csr = crypto.load_certificate_request(crypto.FILETYPE_PEM, csr_data)
+        # Parse the CSR and verify its signature
+        return validation_response(csr_data)
 
-        # Extract subject information
-        subject = csr.get_subject()
-        subject_dict = {}
-        for key, value in subject.get_components():
-            subject_dict[key.decode('utf-8')] = value.decode('utf-8')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        # Get public key information
-        pubkey = csr.get_pubkey()
-        key_size = pubkey.bits()
+    except Exception as e:
+        return jsonify({"error": f"Invalid CSR: {str(e)}"}), 400
 
-        # Get signature algorithm
-        try:
-            sig_algo = csr.get_signature_algorithm().decode('utf-8')
-        except AttributeError:
-            # Fallback for older versions of OpenSSL
-            sig_algo = "sha256WithRSAEncryption"
+@app.route('/validate/<sha256>')
+def get_validation(sha256: str):
+    digest = sha256.lower()
+    if not SHA256_PATTERN.fullmatch(digest):
+        return jsonify({"error": "Expected the hex SHA-256 of the CSR's DER encoding"}), 400
 
-        # Verify the signature
-        is_valid = csr.verify(pubkey)
+    # The result depends only on the digest, so a matching ETag needs no
+    # lookup; a client can only hold that ETag for a result it was sent
+    headers = validation_cache_headers(digest)
+    if request.if_none_match.contains_weak(digest):
+        return Response(status=304, headers=headers)
 
-        return jsonify({
-            "subject": subject_dict,
-            "key_size": key_size,
-            "signature_algorithm": sig_algo,
-            "is_valid": is_valid
-        })
+    try:
+        info = find_validation(digest)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error looking up CSR: {str(e)}"}), 500
+
+    if info is None:
+        return jsonify({"error": "Unknown CSR; validate it with POST /validate first"}), 404
+    response = jsonify(info)
+    response.headers.update(headers)
+    return response
+
+@app.route('/validate/batch', methods=['POST'])
+def validate_csr_batch():
+    try:
+        # Accept a raw PEM bundle, a list of CSRs or one concatenated PEM bundle
+        body = raw_csr_body()
+        if body is not None:
+            csrs = csr_utils.split_pem_bundle(body)
+        else:
+            data = request.json
+            csrs = data.get('csrs')
+            if csrs is None and isinstance(data.get('bundle'), str):
+                csrs = csr_utils.split_pem_bundle(data['bundle'])
+
+        if not isinstance(csrs, list) or not csrs:
+            return jsonify({"error": "Missing CSR data"}), 400
+        if len(csrs) > MAX_VALIDATE_BATCH_SIZE:
+            return jsonify({"error": f"Batch size {len(csrs)} exceeds the limit of {MAX_VALIDATE_BATCH_SIZE}"}), 413
+
+        summary = {"total": len(csrs), "valid": 0, "invalid": 0, "weak_key": 0, "deprecated_algorithm": 0}
+
+        def counted(results: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            for result in results:
+                if 'error' in result or not result['is_valid']:
+                    summary['invalid'] += 1
+                else:
+                    summary['valid'] += 1
+                summary['weak_key'] += bool(result.get('weak_key'))
+                summary['deprecated_algorithm'] += bool(result.get('deprecated_algorithm'))
+                yield result
+
+        if wants_ndjson():
+            # Results stream in completion order, followed by the summary
+            def streamed() -> Iterator[Dict[str, Any]]:
+                yield from counted(validate_in_parallel(csrs))
+                yield {"summary": summary}
+            return ndjson_response(streamed())
+
+        results = sorted(counted(validate_in_parallel(csrs)), key=lambda result: result['index'])
+        return jsonify({"results": results, "summary": summary})
 
     except Exception as e:
-        return jsonify({"error": f"Invalid CSR: {str(e)}"}), 400
+        return jsonify({"error": f"Error validating CSR batch: {str(e)}"}), 400
+
+@app.route('/inventory')
+def get_inventory():
+    try:
+        filters, limit, cursor = parse_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # The first query waits for the initial sync; later syncs run in the background
+        if inventory_index.synced_at() is None:
+            inventory_index.sync()
+        inventory_index.start()
+        return jsonify(inventory_index.query(filters, limit, cursor))
+
+    except Exception as e:
+        return jsonify({"error": f"Error querying inventory: {str(e)}"}), 500
 
 @app.route('/health')
 def health_check():
     return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
 
+@app.route('/stats')
+def stats():
+    return jsonify({
+        "key_pool": key_pool.stats(),
+        "crypto_workers": crypto_workers.stats(),
+        "jobs": job_store.stats(),
+        "parse_cache": csr_utils.parse_cache_stats(),
+        "verify_cache": csr_utils.verify_cache_stats(),
+        "json_encoder": json_codec.backend(),
+        "inventory": inventory_index.stats()
+    })
+
 if __name__ == "__main__":
     import os
     port = int(os.environ.get("PORT", 8000))
+    start_background_services()
+    inventory_index.start()
     app.run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import Future
+from unittest.mock import patch
+from starlette.testclient import TestClient
+import asgi
+import csr_utils
+from inventory_index import InventoryIndex
+
+class TestASGI(unittest.TestCase):
+    def setUp(self):
+        # Without a with block the lifespan does not run; crypto workers start on first use
+        self.client = TestClient(asgi.app)
+
+        # Keep validation results recorded by the API out of the checkout
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        index = InventoryIndex(os.path.join(root, "inventory.db"), root, interval=3600)
+        self.addCleanup(index.stop)
+        patcher = patch.object(asgi.main, "inventory_index", index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_health_endpoint(self):
+        """Test the health endpoint returns healthy status"""
+        response = self.client.get('/health')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'healthy')
+
+    def test_generate_and_validate(self):
+        """Test generation runs in the crypto workers and validation matches the Flask contract"""
+        payload = {
+            "common_name": "test.example.com",
+            "organization": "Test Organization",
+            "country": "SA",
+            "service": "NI-API",
+            "environment": "UAT",
+            "key_type": "EC-P256"
+        }
+        response = self.client.post('/generate', json=payload)
+        self.assertEqual(response.status_code, 200)
+        csr_pem = response.json()['csr']
+
+        response = self.client.post('/validate', json={"csr": csr_pem})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_valid'])
+        self.assertEqual(response.json()['curve'], 'P-256')
+
+        response = self.client.post(
+            '/validate', content=csr_utils.csr_to_der(csr_pem), headers={"Content-Type": "application/pkcs10"}
+        )
+        self.assertEqual(response.json()['subject']['CN'], 'test.example.com')
+
+        response = self.client.post('/generate', json={"common_name": "test.example.com"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Missing required field', response.json()['error'])
+
+        response = self.client.post('/validate', json={"csr": "not a csr"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_generate_submits_once_off_the_event_loop(self):
+        """Test generation waits for a worker slot on a thread with one blocking submit"""
+        calls = []
+
+        def submit(spec, block=False):
+            try:
+                asyncio.get_running_loop()
+                on_event_loop = True
+            except RuntimeError:
+                on_event_loop = False
+            calls.append((block, on_event_loop))
+            future = Future()
+            future.set_result(("csr", "key"))
+            return future
+
+        payload = {
+            "common_name": "test.example.com",
+            "organization": "Test Organization",
+            "country": "SA",
+            "service": "NI-API",
+            "environment": "UAT"
+        }
+        with patch.object(asgi.main, "submit_generation", side_effect=submit):
+            response = self.client.post('/generate', json=payload)
+        self.assertEqual(response.json(), {"csr": "csr", "private_key": "key"})
+        self.assertEqual(calls, [(True, False)])
+
+    def test_validate_caching_headers(self):
+        """Test validation results carry a digest ETag and are served by GET /validate/<sha256>"""
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        index = InventoryIndex(os.path.join(root, "inventory.db"), root, interval=3600)
+        self.addCleanup(index.stop)
+        csr_pem, _ = csr_utils.generate_csr("cached.example.com", "Test Organization", key_type="EC-P256")
+        digest = csr_utils.csr_digest(csr_pem)
+        with patch.object(asgi.main, "inventory_index", index):
+            response = self.client.post('/validate', json={"csr": csr_pem})
+            self.assertEqual(response.headers['etag'], f'W/"{digest}"')
+            self.assertEqual(response.headers['content-location'], f'/validate/{digest}')
+
+            # The result is recorded by the index's writer thread
+            index.flush()
+            csr_utils.invalidate_parse_cache()
+            response = self.client.get(f'/validate/{digest}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['subject']['CN'], 'cached.example.com')
+
+            response = self.client.get(f'/validate/{digest}', headers={"If-None-Match": f'W/"{digest}"'})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(self.client.get(f'/validate/{"0" * 64}').status_code, 404)
+
+    def test_validate_streams_ndjson(self):
+        """Test a CSR list is streamed as one JSON line per CSR when NDJSON is accepted"""
+        csr_pem, _ = csr_utils.generate_csr("test.example.com", "Test Organization", key_type="EC-P256")
+        response = self.client.post(
+            '/validate',
+            json={"csrs": [csr_pem, "bad", csr_pem]},
+            headers={"Accept": "application/x-ndjson"}
+        )
+        self.assertEqual(response.headers['content-type'], 'application/x-ndjson')
+        results = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda result: result['index'])
+        self.assertEqual([result['index'] for result in results], [0, 1, 2])
+        self.assertIn('error', results[1])
+        self.assertTrue(results[2]['is_valid'])
+
+    def test_lifespan_starts_background_services(self):
+        """Test the server process starts and stops its crypto workers with the app"""
+        with patch.object(asgi.main, "start_background_services") as start, \
+                patch.object(asgi.main, "stop_background_services") as stop:
+            with TestClient(asgi.app):
+                start.assert_called_once()
+                stop.assert_not_called()
+            stop.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
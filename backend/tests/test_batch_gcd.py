@@ -0,0 +1,82 @@
+import math
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import batch_gcd
+import csr_utils
+
+PRIMES = [1000003, 1000033, 1000037, 1000039, 1000081, 1000099, 1000117, 1000121, 1000133, 1000151]
+
+class TestBatchGCD(unittest.TestCase):
+    def test_batch_gcd_matches_pairwise_gcd(self):
+        """Test batch GCD agrees with pairwise GCDs, serially and across processes"""
+        moduli = [PRIMES[0] * PRIMES[1], PRIMES[1] * PRIMES[2], PRIMES[3] * PRIMES[4],
+                  PRIMES[5] * PRIMES[6], PRIMES[6] * PRIMES[7], PRIMES[8] * PRIMES[9]]
+        expected = [
+            math.gcd(modulus, math.prod(moduli[:i] + moduli[i + 1:]))
+            for i, modulus in enumerate(moduli)
+        ]
+        self.assertEqual(batch_gcd.batch_gcd(moduli, processes=1), expected)
+
+        with patch.object(batch_gcd, "MIN_PARALLEL_MODULI", 1):
+            self.assertEqual(batch_gcd.batch_gcd(moduli, processes=2), expected)
+
+    def test_fast_division_matches_builtin(self):
+        """Test the recursive division used for large integers gives the builtin remainder"""
+        rng = random.Random(7)
+        with patch.object(batch_gcd, "FAST_DIVISION_BITS", 64), patch.object(batch_gcd, "gmpy2", None):
+            for _ in range(50):
+                b = rng.getrandbits(rng.randint(65, 3000)) | 1
+                a = rng.getrandbits(rng.randint(1, 8000))
+                self.assertEqual(batch_gcd._mod(a, b), a % b)
+
+    def test_scan_reports_shared_factors_and_duplicates(self):
+        """Test CSR keys sharing a prime or a whole modulus are flagged, and sound keys are not"""
+        key = csr_utils.generate_private_key(1024)
+        csr_pem, _ = csr_utils.build_csr(key, "api.example.com", "Example")
+        modulus = key.public_key().public_numbers().n
+
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        bundle = os.path.join(root, "bundle.pem")
+        with open(bundle, "w") as f:
+            f.write(csr_pem + csr_pem)
+        entries = [(source, value) for source, value, _ in batch_gcd.iter_moduli([bundle])]
+        self.assertEqual([value for _, value in entries], [modulus, modulus])
+
+        entries += [("weak-1", PRIMES[0] * PRIMES[1]), ("weak-2", PRIMES[1] * PRIMES[2]), ("sound", PRIMES[3] * PRIMES[4])]
+        result = batch_gcd.scan_moduli(entries, processes=1)
+        reasons = {entry["source"]: entry["reason"] for entry in result["compromised"]}
+        self.assertEqual(result["moduli"], 4)
+        self.assertEqual(reasons, {
+            f"{bundle}@0": "duplicate_modulus",
+            f"{bundle}@{len(csr_pem)}": "duplicate_modulus",
+            "weak-1": "shared_factor",
+            "weak-2": "shared_factor"
+        })
+        self.assertEqual(result["compromised"][-1]["factor"], format(PRIMES[1], "x"))
+
+    def test_iter_moduli_reads_der_and_reports_unparseable_files(self):
+        """Test a DER-encoded CSR is scanned and a file without any CSR is reported"""
+        key = csr_utils.generate_private_key(1024)
+        csr_pem, _ = csr_utils.build_csr(key, "api.example.com", "Example")
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        with open(os.path.join(root, "a.csr"), "wb") as f:
+            f.write(csr_utils.pem_to_der(csr_pem))
+        with open(os.path.join(root, "b.csr"), "w") as f:
+            f.write(csr_pem)
+        with open(os.path.join(root, "c.csr"), "w") as f:
+            f.write("not a csr")
+
+        results = {os.path.basename(source): (value, error) for source, value, error in batch_gcd.iter_moduli([root])}
+        self.assertEqual(results["a.csr"], (key.public_key().public_numbers().n, None))
+        self.assertEqual(results["b.csr"], results["a.csr"])
+        self.assertIsNone(results["c.csr"][0])
+        self.assertIn("No PEM or DER", results["c.csr"][1])
+
+if __name__ == '__main__':
+    unittest.main()
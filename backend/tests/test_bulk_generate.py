@@ -0,0 +1,72 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+import bulk_generate
+import csr_utils
+
+class TestBulkGenerate(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def write_manifest(self, name, content):
+        path = os.path.join(self.root, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_generates_and_skips_up_to_date_entries(self):
+        """Test a CSV manifest is generated into the CSR layout and a rerun only regenerates changed entries"""
+        manifest = self.write_manifest("csrs.csv", (
+            "service,environment,domain,key_type\n"
+            "NI-API,PROD,api.example.com,EC-P256\n"
+            "NI-WEB,uat,,EC-P256\n"
+            "NI-BAD,DEV,,EC-P256\n"
+        ))
+        results = bulk_generate.generate_all(bulk_generate.load_manifest(manifest), base=self.root, workers=1)
+        self.assertEqual([result["status"] for result in results], ["generated", "generated", "failed"])
+        self.assertIn("Environment must be one of", results[2]["error"])
+
+        key_path = os.path.join(self.root, "Prod-CSR", "NI-API", "saudi-ni-api-prod.key")
+        csr_path = os.path.join(self.root, "Prod-CSR", "NI-API", "saudi-ni-api-prod-csr.csr")
+        self.assertEqual((results[0]["key_path"], results[0]["csr_path"]), (key_path, csr_path))
+        self.assertEqual(stat.S_IMODE(os.stat(key_path).st_mode), 0o600)
+        with open(csr_path) as f:
+            info = csr_utils.parse_csr(f.read())
+        self.assertEqual(info["subject"]["CN"], "api.example.com")
+        self.assertEqual(info["subject"]["C"], "SA")
+        self.assertEqual(results[1]["domain"], csr_utils.suggest_domain_name("NI-WEB", "UAT"))
+
+        entries = [
+            {"service": "NI-API", "environment": "PROD", "domain": "api.example.com", "key_type": "EC-P256"},
+            {"service": "NI-WEB", "environment": "UAT", "domain": "web.example.com", "key_type": "EC-P256"},
+        ]
+        results = bulk_generate.generate_all(entries, base=self.root, workers=1)
+        self.assertEqual([result["status"] for result in results], ["up_to_date", "generated"])
+
+        results = bulk_generate.generate_all(entries[:1], base=self.root, workers=1, force=True)
+        self.assertEqual(results[0]["status"], "generated")
+
+    def test_mismatched_key_is_regenerated(self):
+        """Test an entry whose key no longer matches its CSR is not considered up to date"""
+        entry = bulk_generate.parse_entry({"service": "NI-API", "environment": "PROD", "key_type": "EC-P256"})
+        bulk_generate.generate_all([entry], base=self.root, workers=1)
+        key_path, csr_path = bulk_generate.entry_paths(self.root, entry)
+        self.assertTrue(bulk_generate.is_up_to_date(entry, key_path, csr_path))
+
+        _, other_key = csr_utils.generate_csr("other.example.com", "Example", key_type="EC-P256")
+        with open(key_path, "w") as f:
+            f.write(other_key)
+        self.assertFalse(bulk_generate.is_up_to_date(entry, key_path, csr_path))
+        self.assertFalse(bulk_generate.is_up_to_date({**entry, "key_type": "EC-P384"}, key_path, csr_path))
+
+    @unittest.skipIf(bulk_generate.yaml is None, "PyYAML is not installed")
+    def test_yaml_manifest(self):
+        """Test a YAML manifest may hold its entries under a csrs key"""
+        manifest = self.write_manifest("csrs.yaml", "csrs:\n  - service: NI-API\n    environment: PROD\n")
+        self.assertEqual(bulk_generate.load_manifest(manifest), [{"service": "NI-API", "environment": "PROD"}])
+
+if __name__ == '__main__':
+    unittest.main()
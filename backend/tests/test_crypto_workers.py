@@ -0,0 +1,54 @@
+import os
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+import csr_utils
+from crypto_workers import CryptoWorkers, WorkersBusyError
+
+class TestCryptoWorkers(unittest.TestCase):
+    def setUp(self):
+        self.workers = CryptoWorkers(max_workers=1, max_pending=1)
+
+    def tearDown(self):
+        self.workers.shutdown()
+
+    def test_run_in_worker_process(self):
+        """Test a CSR is generated and signed in a worker process"""
+        key_pem = self.workers.run(csr_utils.generate_private_key_pem, 2048)
+        csr_pem, returned_key_pem = self.workers.run(
+            csr_utils.build_csr, key_pem, common_name="test.example.com", organization="Test Organization"
+        )
+        self.assertEqual(key_pem, returned_key_pem)
+        self.assertTrue(csr_utils.validate_csr(csr_pem))
+        self.assertEqual(self.workers.stats()['completed'], 2)
+
+    def test_rejects_when_queue_is_full(self):
+        """Test submitting beyond max_pending raises WorkersBusyError"""
+        future = self.workers.submit(csr_utils.generate_private_key_pem, 2048)
+        with self.assertRaises(WorkersBusyError):
+            self.workers.submit(csr_utils.generate_private_key_pem, 2048)
+        future.result()
+        self.assertEqual(self.workers.stats()['rejected'], 1)
+
+    def test_warm_up_starts_every_worker(self):
+        """Test warming up spawns all worker processes through the bounded queue"""
+        workers = CryptoWorkers(max_workers=2)
+        self.addCleanup(workers.shutdown)
+        workers.warm_up(csr_utils.generate_private_key_pem, key_type="EC-P256")
+        self.assertEqual(len(workers._executor._processes), 2)
+        self.assertTrue(workers.stats()['running'])
+
+        # Done callbacks run on the executor's thread, which shutdown joins
+        workers.shutdown()
+        self.assertEqual((workers.stats()['completed'], workers.stats()['pending']), (2, 0))
+
+    def test_recovers_from_a_dead_worker(self):
+        """Test the pool is replaced after a worker process dies"""
+        self.workers.start()
+        with self.assertRaises(BrokenProcessPool):
+            self.workers.run(os._exit, 1)
+        # The failed task frees its slot from a done callback, so wait for it
+        self.assertEqual(self.workers.submit(pow, 2, 10, block=True).result(), 1024)
+        self.assertEqual(self.workers.stats()['failed'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import OpenSSL.crypto as crypto
+import csr_utils
+
+class TestCSRUtils(unittest.TestCase):
+    def setUp(self):
+        csr_utils.configure_parse_cache(max_entries=16, ttl=None)
+        csr_utils.configure_verify_cache(max_entries=16)
+
+    def test_generate_and_parse_key_types(self):
+        """Test every supported key type produces a valid CSR with the right key description"""
+        expected = {
+            "RSA": ("RSA", None, "sha256WithRSAEncryption"),
+            "EC-P256": ("EC", "P-256", "ecdsa-with-SHA256"),
+            "EC-P384": ("EC", "P-384", "ecdsa-with-SHA384"),
+            "EC-P521": ("EC", "P-521", "ecdsa-with-SHA512"),
+            "ED25519": ("ED25519", None, "ed25519"),
+        }
+        for key_type, (parsed_type, curve, sig_algo) in expected.items():
+            with self.subTest(key_type=key_type):
+                csr_pem, key_pem = csr_utils.generate_csr(
+                    common_name="test.example.com",
+                    organization="Test Organization",
+                    country="US",
+                    key_type=key_type
+                )
+                self.assertIn("BEGIN PRIVATE KEY", key_pem)
+                info = csr_utils.parse_csr(csr_pem)
+                self.assertEqual(info["key_type"], parsed_type)
+                self.assertEqual(info["curve"], curve)
+                self.assertEqual(info["signature_algorithm"], sig_algo)
+                self.assertTrue(info["is_valid"])
+                self.assertEqual(info["subject"]["CN"], "test.example.com")
+
+    def test_normalize_key_type(self):
+        """Test key type names are case-insensitive and validated"""
+        self.assertEqual(csr_utils.normalize_key_type("ec-p256"), "EC-P256")
+        with self.assertRaises(ValueError):
+            csr_utils.normalize_key_type("DSA")
+
+    def test_parse_cache_ignores_pem_wrapping(self):
+        """Test a re-wrapped copy of a CSR is served from the parse cache"""
+        csr_pem, _ = csr_utils.generate_csr("test.example.com", "Test Organization", key_type="EC-P256")
+        lines = csr_pem.strip().splitlines()
+        rewrapped = "\r\n".join([lines[0], "".join(lines[1:-1]), lines[-1]]) + "\r\n"
+
+        first = csr_utils.parse_csr(csr_pem)
+        first["subject"]["CN"] = "changed"
+        second = csr_utils.parse_csr(rewrapped)
+        self.assertEqual(second["subject"]["CN"], "test.example.com")
+        self.assertTrue(csr_utils.validate_csr(rewrapped))
+        self.assertEqual(csr_utils.csr_digest(csr_pem), csr_utils.csr_digest(rewrapped))
+
+        stats = csr_utils.parse_cache_stats()
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["hits"], 2)
+
+        self.assertTrue(csr_utils.invalidate_parse_cache(rewrapped))
+        self.assertFalse(csr_utils.invalidate_parse_cache(csr_pem))
+
+    def test_parse_csr_accepts_der(self):
+        """Test DER and unarmoured base64 CSRs parse like their PEM form"""
+        csr_pem, _ = csr_utils.generate_csr("test.example.com", "Test Organization", key_type="EC-P256")
+        csr_der = csr_utils.pem_to_der(csr_pem)
+        csr_b64 = "".join(csr_pem.strip().splitlines()[1:-1])
+        self.assertEqual(csr_utils.parse_csr(csr_der)["subject"]["CN"], "test.example.com")
+        self.assertEqual(csr_utils.csr_digest(csr_b64), csr_utils.csr_digest(csr_pem))
+        with self.assertRaises(ValueError):
+            csr_utils.csr_to_der(b"not a csr")
+        self.assertEqual(csr_utils.csr_to_der(memoryview(csr_der)), csr_der)
+        for value in (300000000, list(csr_der), None):
+            with self.assertRaises(ValueError):
+                csr_utils.csr_to_der(value)
+            with self.assertRaises(ValueError):
+                csr_utils.parse_csr(value)
+
+    def test_lazy_record_parses_on_access(self):
+        """Test a lazy record skips verification when verify is False and parses fields on access"""
+        csr_pem, _ = csr_utils.generate_csr("test.example.com", "Test Organization", key_type="EC-P256")
+
+        with patch.object(crypto.X509Req, 'verify') as verify:
+            record = csr_utils.parse_csr(csr_pem, lazy=True, verify=False)
+            self.assertEqual(record["subject"]["CN"], "test.example.com")
+            self.assertEqual(record.curve, "P-256")
+            self.assertIsNone(record.is_valid)
+            self.assertIsNone(csr_utils.parse_csr(csr_pem, verify=False)["is_valid"])
+            verify.assert_not_called()
+        self.assertEqual(csr_utils.parse_cache_stats()["entries"], 0)
+
+        record = csr_utils.parse_csr(csr_pem, lazy=True)
+        self.assertTrue(record.is_valid)
+        self.assertEqual(record.to_dict(), csr_utils.parse_csr(csr_pem) | {"is_valid": True})
+
+        # Malformed input only fails once a field is read
+        record = csr_utils.parse_csr("not a csr", lazy=True)
+        with self.assertRaises(ValueError):
+            record.subject
+
+    def test_compare_fleet(self):
+        """Test fleet comparison groups matching CSRs and reports per-service differences"""
+        def csr_for(service, environment, key_type="EC-P256"):
+            domain = csr_utils.suggest_domain_name(service, environment)
+            return service, environment, csr_utils.generate_csr(domain, "Test Organization", country="SA", key_type=key_type)[0]
+
+        fleet = [
+            csr_for("NI-API", "PROD"),
+            csr_for("NI-API", "UAT"),
+            csr_for("NI-3DS", "PROD"),
+            csr_for("NI-3DS", "UAT", key_type="EC-P384"),
+            ("NI-MLE", "PROD", "not a csr"),
+        ]
+        result = csr_utils.compare_fleet(fleet)
+
+        self.assertEqual(result["differing_services"], ["NI-3DS"])
+        self.assertTrue(result["services"]["NI-API"]["consistent"])
+        differences = result["services"]["NI-3DS"]["differences"]
+        self.assertEqual(set(differences), {"curve", "key_size", "signature_algorithm"})
+        self.assertEqual(differences["curve"], {"PROD": "P-256", "UAT": "P-384"})
+        self.assertEqual(len(result["groups"][0]["members"]), 2)
+        self.assertEqual(result["errors"][0]["service"], "NI-MLE")
+
+    def test_verify_cache_and_bad_signatures(self):
+        """Test verification results are cached across encodings and bad signatures are reported"""
+        csr_pem, _ = csr_utils.generate_csr("test.example.com", "Test Organization", key_type="EC-P256")
+        csr_der = csr_utils.pem_to_der(csr_pem)
+        self.assertTrue(csr_utils.parse_csr(csr_pem)["is_valid"])
+
+        # Drop the parse cache so the DER copy reaches signature verification
+        csr_utils.invalidate_parse_cache()
+        self.assertTrue(csr_utils.parse_csr(csr_der, lazy=True).is_valid)
+        self.assertEqual(csr_utils.verify_cache_stats()["hits"], 1)
+
+        tampered = csr_der[:-1] + bytes([csr_der[-1] ^ 0x01])
+        self.assertFalse(csr_utils.parse_csr(tampered)["is_valid"])
+        self.assertFalse(csr_utils.validate_csr(tampered))
+
+    def test_verify_cache_covers_signature_algorithm(self):
+        """Test a CSR whose outer signature algorithm was changed is not verified from the cache"""
+        csr_pem, _ = csr_utils.generate_csr("test.example.com", "Test Organization")
+        csr_der = csr_utils.pem_to_der(csr_pem)
+        self.assertTrue(csr_utils.parse_csr(csr_der)["is_valid"])
+
+        # sha256WithRSAEncryption -> sha512WithRSAEncryption in the outer AlgorithmIdentifier
+        sha256_with_rsa = bytes.fromhex("2a864886f70d01010b")
+        position = csr_der.rindex(sha256_with_rsa) + len(sha256_with_rsa) - 1
+        tampered = csr_der[:position] + b"\x0d" + csr_der[position + 1:]
+        info = csr_utils.parse_csr(tampered)
+        self.assertEqual(info["signature_algorithm"], "sha512WithRSAEncryption")
+        self.assertFalse(info["is_valid"])
+
+    def test_iter_csr_bundle_reports_offsets(self):
+        """Test a bundle is parsed block by block with byte offsets for malformed blocks"""
+        csrs = [
+            csr_utils.generate_csr(f"host{index}.example.com", "Test Organization", key_type="ED25519")[0]
+            for index in range(3)
+        ]
+        truncated = "-----BEGIN CERTIFICATE REQUEST-----\nMIIB\n"
+        bundle = ("# exported CSRs\n" + csrs[0] + truncated + csrs[1] + "garbage\n" + csrs[2]).encode()
+
+        # A small chunk size forces blocks to straddle chunk boundaries
+        records = list(csr_utils.iter_csr_bundle(io.BytesIO(bundle), chunk_size=100))
+        self.assertEqual(len(records), 4)
+        self.assertEqual([record.get("subject", {}).get("CN") for record in records],
+                         ["host0.example.com", None, "host1.example.com", "host2.example.com"])
+        self.assertEqual(records[0]["offset"], bundle.index(b"-----BEGIN"))
+        self.assertEqual(records[1]["offset"], bundle.index(truncated.encode()))
+        self.assertIn("missing END line", records[1]["error"])
+        self.assertEqual(records[3]["offset"], bundle.index(csrs[2].encode()))
+
+    def test_export_records_in_chunks(self):
+        """Test records stream into NDJSON and columnar files that read back the same, and failures leave no file"""
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        fields = ["path", "key_size", "is_valid"]
+        records = [{"path": f"{i}.csr", "key_size": 2048 + i, "is_valid": i % 2 == 0, "extra": i} for i in range(5)]
+        self.assertEqual([len(chunk) for chunk in csr_utils.iter_record_chunks(iter(records), 2)], [2, 2, 1])
+
+        ndjson_path = os.path.join(root, "records.ndjson")
+        columnar_path = os.path.join(root, "records.columns.gz")
+        exports = [csr_utils.NDJSONExport(ndjson_path, fields), csr_utils.ColumnarExport(columnar_path, fields)]
+        self.assertEqual(csr_utils.export_records(iter(records), exports, chunk_size=2), 5)
+
+        expected = [{field: record[field] for field in fields} for record in records]
+        with open(ndjson_path) as f:
+            self.assertEqual([json.loads(line) for line in f], expected)
+        self.assertEqual(list(csr_utils.iter_columnar(columnar_path)), expected)
+
+        def failing():
+            yield records[0]
+            raise OSError("disk full")
+        failed_path = os.path.join(root, "failed.ndjson")
+        with self.assertRaises(OSError):
+            csr_utils.export_records(failing(), [csr_utils.NDJSONExport(failed_path, fields)], chunk_size=1)
+        self.assertEqual(sorted(os.listdir(root)), ["records.columns.gz", "records.ndjson"])
+
+        # A failing abort does not keep the other exports from being discarded
+        broken = csr_utils.NDJSONExport(os.path.join(root, "broken.ndjson"), fields)
+        other = csr_utils.NDJSONExport(os.path.join(root, "other.ndjson"), fields)
+        with patch.object(broken, "abort", side_effect=OSError("gone")), self.assertRaises(OSError):
+            csr_utils.export_records(failing(), [broken, other], chunk_size=1)
+        broken.abort()
+        self.assertEqual(sorted(os.listdir(root)), ["records.columns.gz", "records.ndjson"])
+
+        with self.assertRaises(ValueError):
+            csr_utils.ColumnarExport("-", fields)
+
+        if csr_utils.pyarrow is None:
+            with self.assertRaises(ValueError):
+                csr_utils.ColumnarExport(os.path.join(root, "records.parquet"), fields)
+
+        # An export format missing write_chunk fails before anything is written
+        class IncompleteExport(csr_utils._Export):
+            def _close(self):
+                pass
+        with self.assertRaises(TypeError):
+            IncompleteExport(os.path.join(root, "incomplete"), fields)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,255 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import csr_utils
+import inventory
+
+class TestKeyReuseIndex(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def write_csr(self, environment, service, name, csr_pem):
+        directory = os.path.join(self.root, inventory.ENVIRONMENT_DIRS[environment], service)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        with open(path, "w") as f:
+            f.write(csr_pem)
+        return path
+
+    def test_scan_groups_csrs_sharing_a_key(self):
+        """Test CSRs built from the same key are grouped and lookups return their paths"""
+        key = csr_utils.generate_private_key(key_type="EC-P256")
+        shared_prod, _ = csr_utils.build_csr(key, "api.example.com", "Example")
+        shared_uat, _ = csr_utils.build_csr(key, "api-uat.example.com", "Example")
+        other, _ = csr_utils.generate_csr("web.example.com", "Example", key_type="EC-P256")
+
+        prod_path = self.write_csr("PROD", "NI-API", "saudi-ni-api-prod-csr.csr", shared_prod)
+        uat_path = self.write_csr("UAT", "NI-API", "saudi-ni-api-uat-csr.csr", shared_uat)
+        self.write_csr("PROD", "NI-WEB", "saudi-ni-web-prod-csr.csr", other)
+        self.write_csr("PROD", "NI-WEB", "broken.csr", "not a csr")
+
+        index = inventory.KeyReuseIndex()
+        counts = index.scan(inventory.default_roots(self.root))
+        self.assertEqual(counts["added"], 4)
+
+        fingerprint = csr_utils.parse_csr(shared_prod)["spki_sha256"]
+        self.assertEqual(index.duplicates(), {fingerprint: sorted([prod_path, uat_path])})
+        self.assertEqual(index.shared_with(prod_path), [uat_path])
+        self.assertEqual(index.stats()["errors"], 1)
+
+    def test_rescan_only_reads_changed_files(self):
+        """Test a rescan skips unchanged files and drops deleted ones"""
+        csr_pem, _ = csr_utils.generate_csr("api.example.com", "Example", key_type="EC-P256")
+        first = self.write_csr("PROD", "NI-API", "a.csr", csr_pem)
+        second = self.write_csr("UAT", "NI-API", "b.csr", csr_pem)
+
+        index = inventory.KeyReuseIndex()
+        index.scan(inventory.default_roots(self.root))
+        self.assertEqual(len(index.duplicates()), 1)
+
+        os.remove(second)
+        counts = index.scan(inventory.default_roots(self.root))
+        self.assertEqual(counts, {"added": 0, "updated": 0, "removed": 1, "unchanged": 1})
+        self.assertEqual(index.duplicates(), {})
+        self.assertEqual(index.locations(index.fingerprint(first)), [first])
+
+    def test_saved_index_is_reused_by_the_next_run(self):
+        """Test a loaded index only rereads files changed since it was saved"""
+        csr_pem, _ = csr_utils.generate_csr("api.example.com", "Example", key_type="EC-P256")
+        first = self.write_csr("PROD", "NI-API", "a.csr", csr_pem)
+        second = self.write_csr("UAT", "NI-API", "b.csr", csr_pem)
+        broken = self.write_csr("UAT", "NI-WEB", "broken.csr", "not a csr")
+        for path in (first, second, broken):
+            os.utime(path, ns=(10**18, 10**18))
+        index_path = os.path.join(self.root, "keys.json")
+
+        index = inventory.KeyReuseIndex()
+        index.scan(inventory.default_roots(self.root))
+        index.save(index_path)
+
+        loaded = inventory.KeyReuseIndex.load(index_path)
+        self.assertEqual(loaded.duplicates(), index.duplicates())
+        self.assertEqual(loaded.errors(), index.errors())
+        with patch.object(csr_utils, "spki_fingerprint", side_effect=AssertionError("reread")):
+            counts = loaded.scan(inventory.default_roots(self.root))
+        self.assertEqual(counts["unchanged"], 3)
+
+        # Files written just before the saved scan are read again
+        os.utime(first, None)
+        index.scan(inventory.default_roots(self.root))
+        index.save(index_path)
+        counts = inventory.KeyReuseIndex.load(index_path).scan(inventory.default_roots(self.root))
+        self.assertEqual((counts["updated"], counts["unchanged"]), (1, 2))
+
+        with open(index_path, "w") as f:
+            f.write("{}")
+        self.assertEqual(len(inventory.KeyReuseIndex.load(index_path)), 0)
+
+class TestInventoryReport(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        csr_pem, _ = csr_utils.generate_csr("api.example.com", "Example Org", country="SA", key_type="EC-P256")
+        for directory, name, content in [
+            ("Prod-CSR/NI-API", "saudi-ni-api-prod-csr.csr", csr_pem),
+            ("UAT-CSR/NI-API", "saudi-ni-api-uat-csr.csr", csr_pem),
+            ("UAT-CSR/NI-WEB", "saudi-ni-web-uat-csr.csr", "not a csr"),
+        ]:
+            os.makedirs(os.path.join(self.root, directory), exist_ok=True)
+            with open(os.path.join(self.root, directory, name), "w") as f:
+                f.write(content)
+
+    def test_markdown_report_matches_shell_format(self):
+        """Test the Markdown report keeps the csr_report.md layout with real service names"""
+        shutil.copy(
+            os.path.join(self.root, "UAT-CSR/NI-API/saudi-ni-api-uat-csr.csr"),
+            os.path.join(self.root, "UAT-CSR/NI-WEB/old-ni-web-uat-csr.csr")
+        )
+        report = inventory.render_markdown(inventory.scan_inventory(self.root, workers=1))
+        self.assertTrue(report.startswith("# CSR Report\n\nThis report provides details"))
+        self.assertIn(
+            "## Production CSRs\n\n"
+            "| Service | CSR File | Domain | Organization | Country |\n"
+            "|---------|----------|--------|--------------|---------|\n"
+            "| NI-API | saudi-ni-api-prod-csr.csr | api.example.com | Example Org | SA |\n\n"
+            "## UAT CSRs",
+            report
+        )
+        self.assertIn("| NI-WEB | saudi-ni-web-uat-csr.csr |  |  |  |", report)
+        # Only saudi-*.csr files are listed, but every CSR is counted
+        self.assertNotIn("old-ni-web-uat-csr.csr", report)
+        self.assertIn("- Total Production CSRs: 1\n- Total UAT CSRs: 3\n", report)
+
+    def test_parallel_scan_and_machine_readable_reports(self):
+        """Test worker processes give the same records, rendered as JSON and CSV"""
+        serial = inventory.scan_inventory(self.root, workers=1)
+        with patch.object(inventory, "MIN_PARALLEL_FILES", 1):
+            parallel = inventory.scan_inventory(self.root, workers=2)
+        self.assertEqual(parallel, serial)
+
+        records = json.loads(inventory.render_json(serial))
+        self.assertEqual([record["service"] for record in records], ["NI-API", "NI-API", "NI-WEB"])
+        self.assertTrue(records[0]["is_valid"])
+        self.assertIn("Invalid CSR", records[2]["error"])
+
+        rows = list(csv.DictReader(io.StringIO(inventory.render_csv(serial))))
+        self.assertEqual(rows[1]["environment"], "UAT")
+        self.assertEqual(rows[1]["spki_sha256"], records[0]["spki_sha256"])
+
+    def test_export_streams_records(self):
+        """Test the export command writes every record as NDJSON and as columns, parsed across processes"""
+        ndjson_path = os.path.join(self.root, "records.ndjson")
+        columnar_path = os.path.join(self.root, "records.columns.gz")
+        with patch.object(inventory, "MIN_PARALLEL_FILES", 1):
+            exit_code = inventory.main([
+                "export", "--base", self.root, "--ndjson", ndjson_path, "--columnar", columnar_path,
+                "--chunk-size", "2", "--workers", "2"
+            ])
+        self.assertEqual(exit_code, 0)
+
+        expected = json.loads(inventory.render_json(inventory.scan_inventory(self.root, workers=1)))
+        with open(ndjson_path) as f:
+            self.assertEqual([json.loads(line) for line in f], expected)
+        self.assertEqual(list(csr_utils.iter_columnar(columnar_path)), expected)
+
+    def test_export_reports_unwritable_outputs(self):
+        """Test the export command fails cleanly for stdout columnar output and unwritable paths"""
+        for args in (["--columnar", "-"], ["--ndjson", os.path.join(self.root, "missing", "records.ndjson")]):
+            with patch("sys.stderr", new_callable=io.StringIO) as stderr:
+                self.assertEqual(inventory.main(["export", "--base", self.root] + args), 2)
+            self.assertTrue(stderr.getvalue().startswith("Error: "))
+        self.assertFalse([name for name in os.listdir(self.root) if ".tmp" in name])
+
+class TestInventoryManifest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        self.csr_pem, _ = csr_utils.generate_csr("api.example.com", "Example Org", key_type="EC-P256")
+        os.makedirs(os.path.join(self.root, "Prod-CSR", "NI-API"))
+        os.makedirs(os.path.join(self.root, "UAT-CSR", "NI-API"))
+        self.prod = self.write("Prod-CSR/NI-API/prod.csr", self.csr_pem)
+        self.uat = self.write("UAT-CSR/NI-API/uat.csr", self.csr_pem)
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def reload(self):
+        return inventory.InventoryManifest.load(self.manifest_path, self.root)
+
+    def test_rerun_parses_only_changed_files(self):
+        """Test a saved manifest only re-parses added or modified files and drops deleted ones"""
+        manifest = inventory.InventoryManifest(self.root)
+        self.assertEqual(manifest.refresh(workers=1)["added"], 2)
+        manifest.save(self.manifest_path)
+
+        # Trust every stored mtime so the test does not have to wait out the racy window
+        with patch.object(inventory, "RACY_WINDOW_NS", -10**18), \
+                patch.object(inventory, "read_records", wraps=inventory.read_records) as read_records:
+            manifest = self.reload()
+            counts = manifest.refresh(workers=1)
+            self.assertEqual(counts, {"added": 0, "updated": 0, "removed": 0, "unchanged": 2})
+            self.assertFalse(manifest.save(self.manifest_path))
+            read_records.assert_not_called()
+
+            other_pem, _ = csr_utils.generate_csr("web.example.com", "Example Org", key_type="EC-P256")
+            self.write("UAT-CSR/NI-API/uat.csr", other_pem)
+            self.write("UAT-CSR/NI-API/new.csr", other_pem)
+            os.remove(self.prod)
+            counts = manifest.refresh(workers=1)
+            self.assertEqual(counts, {"added": 1, "updated": 1, "removed": 1, "unchanged": 0})
+            self.assertEqual(len(read_records.call_args.args[0]), 2)
+
+        manifest.save(self.manifest_path)
+        records = self.reload().records()
+        self.assertEqual([record["file"] for record in records], ["new.csr", "uat.csr"])
+        self.assertEqual({record["domain"] for record in records}, {"web.example.com"})
+
+    def test_update_revalidates_only_given_paths(self):
+        """Test updating touched paths adds new directories in report order and drops deleted ones"""
+        manifest = inventory.InventoryManifest(self.root)
+        manifest.refresh(workers=1)
+
+        os.makedirs(os.path.join(self.root, "Prod-CSR", "NI-ABC"))
+        added = self.write("Prod-CSR/NI-ABC/abc.csr", self.csr_pem)
+        os.remove(self.uat)
+        with patch.object(inventory, "iter_inventory_files") as iter_inventory_files:
+            counts, checked = manifest.update([os.path.dirname(added), self.uat], workers=1)
+            iter_inventory_files.assert_not_called()
+
+        self.assertEqual(counts, {"added": 1, "updated": 0, "removed": 1, "unchanged": 0})
+        self.assertEqual(checked, [added])
+        self.assertEqual([record["path"] for record in manifest.records()], [added, self.prod])
+        self.assertEqual(manifest.record(added)["service"], "NI-ABC")
+
+    def test_touched_file_and_report_outputs(self):
+        """Test a touched but unmodified file keeps its record and reports are only rewritten after changes"""
+        manifest = inventory.InventoryManifest(self.root)
+        manifest.refresh(workers=1)
+        report = self.write("report.md", inventory.render_markdown(manifest.records()))
+        manifest.record_output(report)
+        self.assertTrue(manifest.output_current(report))
+
+        stat = os.stat(self.uat)
+        os.utime(self.uat, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        with patch.object(inventory, "read_records") as read_records:
+            self.assertEqual(manifest.refresh(workers=1)["unchanged"], 2)
+            read_records.assert_not_called()
+        self.assertTrue(manifest.output_current(report))
+
+        self.write("UAT-CSR/NI-API/uat.csr", "not a csr")
+        manifest.refresh(workers=1)
+        self.assertFalse(manifest.output_current(report))
+        self.assertIn("Invalid CSR", manifest.records()[1]["error"])
+
+if __name__ == '__main__':
+    unittest.main()
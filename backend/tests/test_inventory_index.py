@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import csr_utils
+import inventory
+import inventory_index
+
+class TestInventoryIndex(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.index = inventory_index.InventoryIndex(os.path.join(self.root, "inventory.db"), self.root)
+        ec_pem, _ = csr_utils.generate_csr("api.example.com", "Example Org", key_type="EC-P256")
+        rsa_pem, _ = csr_utils.generate_csr("web.example.com", "Other Org", key_size=2048)
+        self.paths = {
+            name: self.write(name, content)
+            for name, content in [
+                ("Prod-CSR/NI-API/api-prod.csr", ec_pem),
+                ("UAT-CSR/NI-API/api-uat.csr", ec_pem),
+                ("UAT-CSR/NI-WEB/web-uat.csr", rsa_pem),
+                ("UAT-CSR/NI-WEB/broken.csr", "not a csr"),
+            ]
+        }
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_query_filters_and_pages(self):
+        """Test filters match indexed records and cursors walk every page exactly once"""
+        self.assertEqual(self.index.sync()["added"], 4)
+
+        page = self.index.query({"environment": "UAT", "service": "NI-WEB", "key_size": 2048})
+        self.assertEqual([record["path"] for record in page["records"]], [self.paths["UAT-CSR/NI-WEB/web-uat.csr"]])
+        self.assertIs(page["records"][0]["is_valid"], True)
+        self.assertIsNone(page["next_cursor"])
+        self.assertEqual(len(self.index.query({"organization": "Example Org"})["records"]), 2)
+
+        seen = []
+        cursor = None
+        while True:
+            page = self.index.query(limit=3, cursor=cursor)
+            seen += [record["path"] for record in page["records"]]
+            cursor = page["next_cursor"] and int(page["next_cursor"])
+            if cursor is None:
+                break
+        self.assertEqual(sorted(seen), sorted(self.paths.values()))
+
+        filters, limit, cursor = inventory_index.parse_query({"environment": "uat", "is_valid": "false", "limit": "5"})
+        self.assertEqual((filters, limit, cursor), ({"environment": "UAT", "is_valid": 0}, 5, None))
+        for args in ({"owner": "me"}, {"key_size": "big"}, {"limit": "0"}):
+            with self.assertRaises(ValueError):
+                inventory_index.parse_query(args)
+
+    def test_sync_only_parses_changed_files(self):
+        """Test a resync parses only added or modified files and drops deleted ones"""
+        self.index.sync()
+        with patch.object(inventory, "RACY_WINDOW_NS", -10**18), \
+                patch.object(inventory, "read_records", wraps=inventory.read_records) as read_records:
+            index = inventory_index.InventoryIndex(self.index.path, self.root)
+            self.assertEqual(index.sync(), {"added": 0, "updated": 0, "removed": 0, "unchanged": 4})
+            self.assertEqual(read_records.call_args.args[0], [])
+
+            with open(self.paths["Prod-CSR/NI-API/api-prod.csr"]) as f:
+                self.write("UAT-CSR/NI-WEB/broken.csr", f.read())
+            os.remove(self.paths["UAT-CSR/NI-API/api-uat.csr"])
+            self.assertEqual(index.sync(), {"added": 0, "updated": 1, "removed": 1, "unchanged": 2})
+            self.assertEqual(len(read_records.call_args.args[0]), 1)
+
+        page = self.index.query({"service": "NI-WEB", "is_valid": 1})
+        self.assertEqual(len(page["records"]), 2)
+        self.assertEqual(self.index.stats()["csrs"], 3)
+
+    def test_schema_change_recreates_tables(self):
+        """Test a database written with other columns is recreated instead of reused"""
+        connection = inventory_index.sqlite3.connect(self.index.path)
+        with connection:
+            connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            connection.execute("INSERT INTO meta VALUES ('version', '1:path,file')")
+            connection.execute("CREATE TABLE csrs (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, file TEXT)")
+            connection.execute("INSERT INTO csrs (path, file) VALUES ('old.csr', 'old.csr')")
+        connection.close()
+
+        self.assertEqual(self.index.sync()["added"], 4)
+        self.assertEqual(self.index.stats()["csrs"], 4)
+        self.assertEqual(len(self.index.query({"key_type": "EC"})["records"]), 2)
+
+    def test_validation_results_are_shared_and_expire(self):
+        """Test recorded validation results are visible to other connections until they expire"""
+        self.addCleanup(self.index.stop)
+        self.index.remember_validation("ab" * 32, {"subject": {"CN": "api.example.com"}, "is_valid": True})
+        self.index.flush()
+        other = inventory_index.InventoryIndex(self.index.path, self.root)
+        self.assertEqual(other.lookup_validation("ab" * 32)["subject"]["CN"], "api.example.com")
+        self.assertIsNone(other.lookup_validation("cd" * 32))
+
+        with patch.object(inventory_index, "VALIDATION_RETENTION", -1):
+            self.index.remember_validation("cd" * 32, {"is_valid": True})
+            self.index.flush()
+        self.assertIsNone(other.lookup_validation("ab" * 32))
+
+    def test_validation_results_are_capped(self):
+        """Test only the newest max_validations results are kept and write errors are logged"""
+        index = inventory_index.InventoryIndex(self.index.path, self.root, max_validations=2)
+        self.addCleanup(index.stop)
+        for digest in ("ab", "cd", "ef"):
+            index.remember_validation(digest * 32, {"is_valid": True})
+            index.flush()
+        self.assertIsNone(index.lookup_validation("ab" * 32))
+        self.assertIsNotNone(index.lookup_validation("ef" * 32))
+
+        with patch.object(index, "_write_validations", side_effect=inventory_index.sqlite3.OperationalError("locked")), \
+                self.assertLogs("inventory_index", "ERROR"):
+            index.remember_validation("01" * 32, {"is_valid": True})
+            index.flush()
+        self.assertNotIn("01" * 32, index._queued_validations)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import time
+from key_pool import KeyPool
+
+class TestKeyPool(unittest.TestCase):
+    def setUp(self):
+        self.generated = []
+
+        def generate(key_size):
+            self.generated.append(key_size)
+            return f"key-{key_size}-{len(self.generated)}"
+
+        self.pool = KeyPool(key_sizes=[2048], low_watermark=1, high_watermark=3, generate=generate)
+
+    def tearDown(self):
+        self.pool.stop(timeout=1)
+
+    def wait_for_depth(self, key_size, depth):
+        deadline = time.time() + 5
+        while self.pool.stats()['sizes'][str(key_size)]['depth'] < depth and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_refills_to_high_watermark(self):
+        """Test the pool fills up to the high watermark once started"""
+        self.pool.start()
+        self.wait_for_depth(2048, 3)
+        stats = self.pool.stats()
+        self.assertEqual(stats['sizes']['2048']['depth'], 3)
+        self.assertEqual(stats['keys_generated'], 3)
+
+    def test_hits_and_misses(self):
+        """Test acquiring keys counts pool hits, misses and unpooled sizes"""
+        # Empty pool: the key is generated inline
+        self.assertTrue(self.pool.acquire(2048).startswith('key-2048'))
+        self.wait_for_depth(2048, 3)
+        self.pool.acquire(2048)
+        self.pool.acquire(4096)
+
+        stats = self.pool.stats()
+        self.assertEqual(stats['sizes']['2048']['misses'], 1)
+        self.assertEqual(stats['sizes']['2048']['hits'], 1)
+        self.assertEqual(stats['unpooled_requests'], 1)
+        self.assertIn(4096, self.generated)
+
+if __name__ == '__main__':
+    unittest.main()
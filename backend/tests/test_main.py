@@ -1,5 +1,17 @@
 import unittest
+import base64
+import gzip
 import json
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+import compression
+import csr_utils
+import json_codec
+import main
+from inventory_index import InventoryIndex
 from main import app
 
 class TestCSRGenerator(unittest.TestCase):
@@ -7,6 +19,15 @@ class TestCSRGenerator(unittest.TestCase):
         self.app = app.test_client()
         self.app.testing = True
 
+        # Keep validation results recorded by the API out of the checkout
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        index = InventoryIndex(os.path.join(root, "inventory.db"), root, interval=3600)
+        self.addCleanup(index.stop)
+        patcher = patch.object(main, "inventory_index", index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_root_endpoint(self):
         """Test the root endpoint returns the expected message"""
         response = self.app.get('/')
@@ -22,6 +43,15 @@ class TestCSRGenerator(unittest.TestCase):
         self.assertEqual(data['status'], 'healthy')
         self.assertIn('timestamp', data)
 
+    def test_stats_endpoint(self):
+        """Test the stats endpoint reports key pool statistics"""
+        response = self.app.get('/stats')
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('2048', data['key_pool']['sizes'])
+        self.assertIn('refill_rate', data['key_pool'])
+        self.assertIn('max_workers', data['crypto_workers'])
+
     def test_generate_csr_endpoint(self):
         """Test the generate CSR endpoint"""
         payload = {
@@ -74,5 +104,324 @@ class TestCSRGenerator(unittest.TestCase):
         self.assertEqual(validate_data['subject']['O'], 'Test Organization')
         self.assertEqual(validate_data['subject']['C'], 'US')
 
+    def test_generate_and_validate_ec_csr(self):
+        """Test generating an EC CSR and validating it reports the curve"""
+        generate_payload = {
+            "common_name": "test.example.com",
+            "organization": "Test Organization",
+            "country": "US",
+            "service": "NI-3DS",
+            "environment": "PROD",
+            "key_type": "ec-p384"
+        }
+        generate_response = self.app.post('/generate', json=generate_payload)
+        self.assertEqual(generate_response.status_code, 200)
+        generate_data = json.loads(generate_response.data)
+
+        validate_response = self.app.post('/validate', json={"csr": generate_data['csr']})
+        validate_data = json.loads(validate_response.data)
+        self.assertEqual(validate_response.status_code, 200)
+        self.assertEqual(validate_data['key_type'], 'EC')
+        self.assertEqual(validate_data['curve'], 'P-384')
+        self.assertEqual(validate_data['signature_algorithm'], 'ecdsa-with-SHA384')
+
+    def test_generate_csr_unknown_key_type(self):
+        """Test the generate CSR endpoint rejects unknown key types"""
+        payload = {
+            "common_name": "test.example.com",
+            "organization": "Test Organization",
+            "country": "US",
+            "service": "NI-3DS",
+            "environment": "PROD",
+            "key_type": "DSA"
+        }
+        response = self.app.post('/generate', json=payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unsupported key type', json.loads(response.data)['error'])
+
+    def test_generate_csr_batch_endpoint(self):
+        """Test batch generation returns per-item results and errors in input order"""
+        payload = {
+            "defaults": {"organization": "Test Organization", "country": "SA", "key_type": "EC-P256"},
+            "items": [
+                {"service": "NI-API", "environment": "UAT"},
+                {"service": "NI-3DS", "environment": "PROD", "common_name": "test.example.com"},
+                {"service": "NI-MLE"}
+            ]
+        }
+        response = self.app.post('/generate/batch', json=payload)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['succeeded'], 2)
+        self.assertEqual(data['failed'], 1)
+        self.assertEqual([result['index'] for result in data['results']], [0, 1, 2])
+        self.assertIn('-----BEGIN CERTIFICATE REQUEST-----', data['results'][0]['csr'])
+        self.assertEqual(data['results'][2]['error'], 'Missing required field: common_name')
+
+        # The common name is suggested from the service and environment when absent
+        validate_response = self.app.post('/validate', json={"csr": data['results'][0]['csr']})
+        validate_data = json.loads(validate_response.data)
+        self.assertEqual(validate_data['subject']['CN'], 'api-gateway.uat.ksa.ngenius-payments.com')
+
+    def test_generate_csr_batch_limits(self):
+        """Test batch generation rejects batches over the key bit limit"""
+        item = {"organization": "Test Organization", "country": "SA", "service": "NI-API", "environment": "PROD", "key_size": 8192}
+        response = self.app.post('/generate/batch', json={"items": [item] * 60})
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('key bits', json.loads(response.data)['error'])
+
+    def test_generate_csr_batch_ndjson_stream(self):
+        """Test batch generation streams one index-tagged result per line"""
+        payload = {
+            "defaults": {"organization": "Test Organization", "country": "SA", "key_type": "ED25519"},
+            "items": [
+                {"service": "NI-API", "environment": "PROD"},
+                {"service": "NI-3DS"},
+                {"service": "NI-MLE", "environment": "UAT"}
+            ]
+        }
+        response = self.app.post('/generate/batch', json=payload, headers={"Accept": "application/x-ndjson"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+        self.assertEqual(sorted(line['index'] for line in lines), [0, 1, 2])
+        by_index = {line['index']: line for line in lines}
+        self.assertIn('error', by_index[1])
+        self.assertIn('csr', by_index[2])
+
+    def test_validate_csr_ndjson_stream(self):
+        """Test validating a list of CSRs streams one result per CSR"""
+        generate_payload = {
+            "common_name": "test.example.com",
+            "organization": "Test Organization",
+            "country": "US",
+            "service": "NI-3DS",
+            "environment": "PROD",
+            "key_type": "EC-P256"
+        }
+        csr_pem = json.loads(self.app.post('/generate', json=generate_payload).data)['csr']
+
+        response = self.app.post(
+            '/validate',
+            json={"csrs": [csr_pem, "not a csr"]},
+            headers={"Accept": "application/x-ndjson"}
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = {line['index']: line for line in map(json.loads, response.data.decode('utf-8').splitlines())}
+        self.assertEqual(lines[0]['subject']['CN'], 'test.example.com')
+        self.assertIn('Invalid CSR', lines[1]['error'])
+
+    def test_generate_job(self):
+        """Test a generation job is accepted at once and its result can be polled"""
+        payload = {
+            "common_name": "test.example.com",
+            "organization": "Test Organization",
+            "country": "US",
+            "service": "NI-3DS",
+            "environment": "PROD",
+            "key_type": "EC-P256"
+        }
+        response = self.app.post('/jobs/generate', json=payload)
+        self.assertEqual(response.status_code, 202)
+        job = json.loads(response.data)
+        self.assertEqual(response.headers['Location'], f"/jobs/{job['id']}")
+
+        deadline = time.time() + 30
+        while job['status'] == 'pending' and time.time() < deadline:
+            time.sleep(0.05)
+            job = json.loads(self.app.get(f"/jobs/{job['id']}").data)
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertIn('-----BEGIN CERTIFICATE REQUEST-----', job['result']['csr'])
+
+    def test_cancelled_job_fails(self):
+        """Test a job whose task is cancelled is reported as failed instead of staying pending"""
+        future = main.Future()
+        job = main.job_store.submit("generate", future)
+        self.assertTrue(future.cancel())
+        future.set_running_or_notify_cancel()
+        job = json.loads(self.app.get(f"/jobs/{job['id']}").data)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['error'], 'Job was cancelled')
+
+    def test_unknown_job(self):
+        """Test polling an unknown job returns 404"""
+        response = self.app.get('/jobs/does-not-exist')
+        self.assertEqual(response.status_code, 404)
+
+    def test_validate_csr_batch_bundle(self):
+        """Test batch validation of a PEM bundle returns ordered results and a summary"""
+        payload = {
+            "defaults": {"organization": "Test Organization", "country": "SA", "key_type": "EC-P256"},
+            "items": [
+                {"service": "NI-API", "environment": "PROD"},
+                {"service": "NI-3DS", "environment": "UAT", "key_type": "RSA", "key_size": 1024}
+            ]
+        }
+        generated = json.loads(self.app.post('/generate/batch', json=payload).data)['results']
+        bundle = "".join(result['csr'] for result in generated)
+
+        response = self.app.post('/validate/batch', json={"bundle": bundle})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([result['index'] for result in data['results']], [0, 1])
+        self.assertEqual(data['results'][0]['subject']['CN'], 'api-gateway.ksa.ngenius-payments.com')
+        self.assertTrue(data['results'][1]['weak_key'])
+        self.assertEqual(data['summary'], {"total": 2, "valid": 2, "invalid": 0, "weak_key": 1, "deprecated_algorithm": 0})
+
+    def test_validate_rejects_non_string_csr(self):
+        """Test validate rejects CSR values that are not strings"""
+        for value in (300000000, [48, 130, 1, 10], {"pem": "x"}):
+            response = self.app.post('/validate', json={"csr": value})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('string', json.loads(response.data)['error'])
+
+    def test_validate_csr_batch_invalid_items(self):
+        """Test batch validation counts unparseable CSRs as invalid"""
+        response = self.app.post('/validate/batch', json={"csrs": ["not a csr"]})
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('error', data['results'][0])
+        self.assertEqual(data['summary']['invalid'], 1)
+
+    def test_generate_der_and_validate_raw_body(self):
+        """Test DER output from generate and raw application/pkcs10 and PEM bodies for validate"""
+        payload = {
+            "common_name": "test.example.com",
+            "organization": "Test Organization",
+            "country": "US",
+            "service": "NI-3DS",
+            "environment": "PROD",
+            "key_type": "EC-P256",
+            "format": "der"
+        }
+        response = self.app.post('/generate', json=payload)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['format'], 'der')
+        csr_der = base64.b64decode(data['csr'])
+        self.assertEqual(csr_der[:1], b'\x30')
+
+        response = self.app.post('/validate', data=csr_der, content_type='application/pkcs10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['subject']['CN'], 'test.example.com')
+
+        csr_pem = "-----BEGIN CERTIFICATE REQUEST-----\n" + data['csr'] + "\n-----END CERTIFICATE REQUEST-----\n"
+        response = self.app.post('/validate', data=csr_pem, content_type='application/x-pem-file')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['curve'], 'P-256')
+
+    def test_inventory_endpoint(self):
+        """Test the inventory endpoint filters the indexed CSRs and pages with a cursor"""
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        csr_pem, _ = csr_utils.generate_csr("api.example.com", "Example Org", key_type="EC-P256")
+        for environment in ("Prod-CSR", "UAT-CSR"):
+            os.makedirs(os.path.join(root, environment, "NI-API"))
+            for name in ("a.csr", "b.csr"):
+                with open(os.path.join(root, environment, "NI-API", name), "w") as f:
+                    f.write(csr_pem)
+
+        index = InventoryIndex(os.path.join(root, "inventory.db"), root, interval=3600)
+        self.addCleanup(index.stop)
+        with patch.object(main, "inventory_index", index):
+            response = self.app.get('/inventory?environment=uat&service=NI-API&limit=1')
+            data = json.loads(response.data)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data['records'][0]['file'], 'a.csr')
+            self.assertEqual(data['records'][0]['curve'], 'P-256')
+
+            response = self.app.get(f"/inventory?environment=uat&service=NI-API&limit=1&cursor={data['next_cursor']}")
+            data = json.loads(response.data)
+            self.assertEqual([record['file'] for record in data['records']], ['b.csr'])
+            self.assertIsNone(data['next_cursor'])
+
+            response = self.app.get('/inventory?owner=me')
+            self.assertEqual(response.status_code, 400)
+
+    def test_validate_caching_headers(self):
+        """Test validation results carry a digest ETag and are served by GET /validate/<sha256> in any process"""
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        index = InventoryIndex(os.path.join(root, "inventory.db"), root, interval=3600)
+        self.addCleanup(index.stop)
+        csr_pem, _ = csr_utils.generate_csr("cached.example.com", "Test Organization", key_type="EC-P256")
+        digest = csr_utils.csr_digest(csr_pem)
+        with patch.object(main, "inventory_index", index):
+            response = self.app.post('/validate', json={"csr": csr_pem})
+            self.assertEqual(response.headers['ETag'], f'W/"{digest}"')
+            self.assertIn('max-age=', response.headers['Cache-Control'])
+            self.assertEqual(response.headers['Content-Location'], f'/validate/{digest}')
+
+            response = self.app.get(f'/validate/{digest.upper()}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data)['subject']['CN'], 'cached.example.com')
+            self.assertEqual(response.headers['ETag'], f'W/"{digest}"')
+
+            # Another server process has its own parse cache but shares the index
+            index.flush()
+            csr_utils.invalidate_parse_cache()
+            response = self.app.get(f'/validate/{digest}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data)['subject']['CN'], 'cached.example.com')
+
+            response = self.app.get(f'/validate/{digest}', headers={"If-None-Match": f'"{digest}"'})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+
+            self.assertEqual(self.app.get('/validate/not-a-digest').status_code, 400)
+            self.assertEqual(self.app.get(f'/validate/{"0" * 64}').status_code, 404)
+
+    def test_validate_lookup_falls_back_to_inventory(self):
+        """Test GET /validate/<sha256> parses an indexed CSR file missing from the parse cache"""
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        csr_pem, _ = csr_utils.generate_csr("indexed.example.com", "Example Org", key_type="EC-P256")
+        os.makedirs(os.path.join(root, "Prod-CSR", "NI-API"))
+        with open(os.path.join(root, "Prod-CSR", "NI-API", "a.csr"), "w") as f:
+            f.write(csr_pem)
+
+        index = InventoryIndex(os.path.join(root, "inventory.db"), root, interval=3600)
+        self.addCleanup(index.stop)
+        index.sync()
+        csr_utils.invalidate_parse_cache()
+        with patch.object(main, "inventory_index", index):
+            response = self.app.get(f'/validate/{csr_utils.csr_digest(csr_pem)}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data)['subject']['CN'], 'indexed.example.com')
+
+    def test_large_responses_are_compressed(self):
+        """Test large JSON responses are compressed as negotiated and small ones are sent as is"""
+        csr_pem, _ = csr_utils.generate_csr("test.example.com", "Test Organization", key_type="EC-P256")
+        payload = {"csrs": [csr_pem] * 20}
+        plain = self.app.post('/validate/batch', json=payload)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+        response = self.app.post('/validate/batch', json=payload, headers={"Accept-Encoding": "gzip;q=1.0, br;q=0.5"})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertLess(len(response.data), len(plain.data) // 4)
+        self.assertEqual(json.loads(gzip.decompress(response.data)), json.loads(plain.data))
+
+        if compression.brotli is not None:
+            response = self.app.post('/validate/batch', json=payload, headers={"Accept-Encoding": "gzip, br"})
+            self.assertEqual(response.headers['Content-Encoding'], 'br')
+            self.assertEqual(json.loads(compression.brotli.decompress(response.data)), json.loads(plain.data))
+
+        response = self.app.get('/health', headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_json_encoders_agree(self):
+        """Test the stdlib and orjson encoders produce the same documents"""
+        document = {"key_pool": {2048: {"depth": 1}}, "subject": {"CN": "t\u00e9st"}, "ok": True, "size": None}
+        self.addCleanup(json_codec.configure, json_codec.backend())
+        json_codec.configure("stdlib")
+        stdlib = json_codec.dumps(document)
+        self.assertEqual(json.loads(stdlib)["key_pool"], {"2048": {"depth": 1}})
+        if json_codec.orjson is not None:
+            json_codec.configure("orjson")
+            self.assertEqual(json.loads(json_codec.dumps(document)), json.loads(stdlib))
+        with self.assertRaises(ValueError):
+            json_codec.configure("simplejson")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+from ttl_cache import TTLCache
+
+class TestTTLCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.cache = TTLCache(max_entries=2, ttl=10, clock=lambda: self.now)
+
+    def test_evicts_least_recently_used(self):
+        """Test the least recently used entry is evicted once the cache is full"""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.cache.set('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        """Test entries expire after their TTL and count as misses"""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2, ttl=60)
+        self.now = 30
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('b'), 2)
+        stats = self.cache.stats()
+        self.assertEqual(stats['expirations'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import csr_utils
+import watcher
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, "Prod-CSR", "NI-API"))
+        self.good_pem, _ = csr_utils.generate_csr("api.example.com", "Example", key_type="EC-P256")
+        self.write("Prod-CSR/NI-API/good.csr", self.good_pem)
+
+    def write(self, name, content):
+        with open(os.path.join(self.root, name), "w") as f:
+            f.write(content)
+
+    def read(self, path):
+        if not os.path.exists(path):
+            return ""
+        with open(path) as f:
+            return f.read()
+
+    def wait_for(self, condition, timeout=10):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(condition())
+
+    def run_watch(self, polling):
+        events = []
+        stop = threading.Event()
+        report = os.path.join(self.root, "csr_report.md")
+        thread = threading.Thread(target=watcher.watch, kwargs={
+            "base": self.root,
+            "manifest_path": os.path.join(self.root, ".csr_manifest.json"),
+            "report_path": report,
+            "emit": events.append,
+            "debounce": 0.1,
+            "poll_interval": 0.1,
+            "polling": polling,
+            "stop": stop
+        })
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(stop.set)
+        self.wait_for(lambda: os.path.exists(report))
+
+        weak_pem, _ = csr_utils.generate_csr("web.example.com", "Example", key_size=1024)
+        os.makedirs(os.path.join(self.root, "UAT-CSR", "NI-WEB"))
+        time.sleep(0.2)
+        self.write("UAT-CSR/NI-WEB/saudi-weak.csr", weak_pem)
+        self.write("Prod-CSR/NI-API/broken.csr", "not a csr")
+        self.wait_for(lambda: len(events) >= 2)
+
+        self.assertEqual(
+            sorted((event["event"], os.path.basename(event["path"])) for event in events),
+            [("invalid", "broken.csr"), ("weak", "saudi-weak.csr")]
+        )
+        self.wait_for(lambda: "saudi-weak.csr" in self.read(report))
+        return events
+
+    def test_inotify_watch_revalidates_touched_files(self):
+        """Test inotify events revalidate new CSRs, emit problem events and update the report"""
+        try:
+            watcher.InotifyWatcher(self.root).close()
+        except OSError:
+            self.skipTest("inotify is not available")
+        self.run_watch(polling=False)
+
+    def test_inotify_ignores_other_folders_and_own_outputs(self):
+        """Test inotify neither watches nor reports folders outside the environments, nor the ignored files"""
+        report = os.path.join(self.root, "csr_report.md")
+        try:
+            inotify = watcher.InotifyWatcher(self.root, ignore=[report])
+        except OSError:
+            self.skipTest("inotify is not available")
+        self.addCleanup(inotify.close)
+        watched = len(inotify._directories)
+
+        os.makedirs(os.path.join(self.root, "node_modules", "pkg"))
+        self.write("csr_report.md.tmp1", "report")
+        os.replace(os.path.join(self.root, "csr_report.md.tmp1"), report)
+        self.assertEqual(inotify.wait(0.2), set())
+        self.assertEqual(len(inotify._directories), watched)
+
+        os.makedirs(os.path.join(self.root, "UAT-CSR", "NI-WEB"))
+        self.assertEqual(inotify.wait(1.0), {os.path.join(self.root, "UAT-CSR")})
+        self.write("UAT-CSR/NI-WEB/new.csr", self.good_pem)
+        self.assertIn(os.path.join(self.root, "UAT-CSR", "NI-WEB", "new.csr"), inotify.wait(1.0))
+
+    def test_polling_watch_revalidates_touched_files(self):
+        """Test the polling fallback detects the same changes"""
+        self.run_watch(polling=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    A thread-safe, bounded LRU cache whose entries expire after a TTL.
+
+    Once the cache is full, setting a new key evicts the least recently used
+    entry. Expired entries are dropped when they are looked up.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Create a cache.
+
+        Args:
+            max_entries: Maximum number of entries kept
+            ttl: Default time to live in seconds (None: entries never expire)
+            clock: Time source, in seconds
+        """
+        if max_entries < 1:
+            raise ValueError("Cache max_entries must be at least 1")
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a key, marking it as recently used.
+
+        Args:
+            key: The cache key
+            default: Value returned when the key is missing or expired
+
+        Returns:
+            The cached value, or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key: The cache key
+            value: The value to store
+            ttl: Time to live in seconds (default: the cache TTL)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else self._clock() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """
+        Remove a key.
+
+        Args:
+            key: The cache key
+
+        Returns:
+            True if the key was cached, False otherwise
+        """
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > self._clock())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache size and hit-rate statistics.
+
+        Returns:
+            A dictionary of cache statistics
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations
+            }
@@ -0,0 +1,376 @@
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import csr_utils
+import inventory
+
+# inotify event masks, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """
+    Reports changed paths under the CSR folders using Linux inotify.
+
+    Every directory below the base directory's environment folders is
+    watched, plus the base directory itself so that environment folders can
+    be created or replaced. Other entries of the base directory, and the
+    ignored files, are not reported. Waiting blocks in select(), so an idle
+    watcher uses no CPU.
+    """
+
+    def __init__(self, base: str = ".", ignore: Iterable[str] = ()):
+        """
+        Start watching a repository root.
+
+        Args:
+            base: The repository root holding Prod-CSR/ and UAT-CSR/
+            ignore: Files whose changes, and those of their temporary
+                copies, are not reported, e.g. the watcher's own outputs
+
+        Raises:
+            OSError: If inotify is not available
+        """
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not supported on this platform")
+
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.base = os.path.normpath(base)
+        self._roots = list(inventory.environment_roots(base).values())
+        self._ignored = [os.path.abspath(path) for path in ignore]
+        self._directories: Dict[int, str] = {}
+        try:
+            self._add_watch(self.base)
+            for root in self._roots:
+                self._watch_tree(root)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Stop watching and release the inotify descriptor."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _add_watch(self, path: str) -> None:
+        descriptor = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if descriptor >= 0:
+            self._directories[descriptor] = path
+
+    def _watch_tree(self, top: str) -> None:
+        for current, _, _ in os.walk(top):
+            self._add_watch(current)
+
+    def _reported(self, path: str) -> bool:
+        if path != self.base and not any(path == root or path.startswith(root + os.sep) for root in self._roots):
+            return False
+        path = os.path.abspath(path)
+        return not any(path == ignored or path.startswith(ignored + ".tmp") for ignored in self._ignored)
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """
+        Wait for changes.
+
+        Args:
+            timeout: Seconds to wait for the first change (None: forever)
+
+        Returns:
+            The changed files and directories; empty if the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed: Set[str] = set()
+        while not changed:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if not readable:
+                break
+            self._read_events(changed)
+        return changed
+
+    def _read_events(self, changed: Set[str]) -> None:
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+
+            offset = 0
+            while offset < len(data):
+                descriptor, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += EVENT_HEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost: rescan everything
+                    changed.add(self.base)
+                    continue
+                directory = self._directories.get(descriptor)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self._directories[descriptor]
+                    continue
+
+                path = os.path.join(directory, os.fsdecode(name)) if name else directory
+                if not self._reported(path):
+                    continue
+                changed.add(path)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_tree(path)
+
+
+class PollingWatcher:
+    """
+    Reports changed paths under the CSR folders by comparing periodic scans.
+
+    Used where inotify is missing. Each poll costs one stat per CSR file, so
+    the interval trades idle CPU against reaction time.
+    """
+
+    def __init__(self, base: str = ".", interval: float = 2.0):
+        """
+        Take the initial snapshot of a repository root.
+
+        Args:
+            base: The repository root holding Prod-CSR/ and UAT-CSR/
+            interval: Seconds between scans
+        """
+        self.base = base
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def close(self) -> None:
+        """Release resources; polling holds none."""
+
+    def _scan(self) -> Dict[str, tuple]:
+        snapshot = {}
+        for _, _, path in inventory.iter_inventory_files(self.base):
+            try:
+                snapshot[path] = inventory.file_stamp(os.stat(path))
+            except OSError:
+                continue
+        return snapshot
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """
+        Wait for changes.
+
+        Args:
+            timeout: Seconds to wait for the first change (None: forever)
+
+        Returns:
+            The changed files; empty if the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(delay)
+
+            snapshot = self._scan()
+            changed = {path for path, stamp in snapshot.items() if self._snapshot.get(path) != stamp}
+            changed.update(path for path in self._snapshot if path not in snapshot)
+            self._snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+
+def open_watcher(
+    base: str = ".",
+    poll_interval: float = 2.0,
+    polling: bool = False,
+    ignore: Iterable[str] = ()
+):
+    """
+    Watch a repository root with inotify, falling back to polling.
+
+    Args:
+        base: The repository root holding Prod-CSR/ and UAT-CSR/
+        poll_interval: Seconds between scans when polling
+        polling: Always poll, e.g. on network file systems where inotify misses changes
+        ignore: Files whose changes are not reported; polling only sees CSR files anyway
+
+    Returns:
+        An InotifyWatcher or a PollingWatcher
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(base, ignore)
+        except OSError:
+            pass
+    return PollingWatcher(base, poll_interval)
+
+
+def record_events(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Describe the problems of an inventory record as events.
+
+    Args:
+        record: An inventory record
+
+    Returns:
+        An "invalid" event if the CSR cannot be parsed or its signature does
+        not verify, a "weak" event if its key or signature algorithm is
+        below recommendations, or no events
+    """
+    location = {key: record[key] for key in ("path", "environment", "service")}
+    if record["error"] or record["is_valid"] is False:
+        reason = record["error"] or "Signature does not verify"
+        return [{"event": "invalid", **location, "reason": reason}]
+
+    assessment = csr_utils.assess_csr(record)
+    if any(assessment.values()):
+        return [{
+            "event": "weak",
+            **location,
+            "key_type": record["key_type"],
+            "key_size": record["key_size"],
+            "signature_algorithm": record["signature_algorithm"],
+            **assessment
+        }]
+    return []
+
+
+def print_event(event: Dict[str, Any]) -> None:
+    """Write an event to stdout as one JSON line."""
+    sys.stdout.write(json.dumps(event) + "\n")
+    sys.stdout.flush()
+
+
+def watch(
+    base: str = ".",
+    manifest_path: str = ".csr_manifest.json",
+    report_path: Optional[str] = "csr_report.md",
+    emit: Callable[[Dict[str, Any]], None] = print_event,
+    debounce: float = 0.5,
+    max_delay: float = 5.0,
+    poll_interval: float = 2.0,
+    polling: bool = False,
+    workers: Optional[int] = 1,
+    stop: Optional[threading.Event] = None
+) -> None:
+    """
+    Revalidate CSRs as the CSR folders change, until stopped.
+
+    Bursts of changes are collected until no change arrives for debounce
+    seconds, or for at most max_delay seconds. Only the touched files are
+    then parsed, the report and manifest are rewritten, and an event is
+    emitted for every touched CSR that is invalid or weak.
+
+    Args:
+        base: The repository root holding Prod-CSR/ and UAT-CSR/
+        manifest_path: The inventory manifest kept up to date
+        report_path: The Markdown report rewritten after changes (None: no report)
+        emit: Called with each event
+        debounce: Seconds without changes that end a burst
+        max_delay: Longest a burst may delay revalidation, in seconds
+        poll_interval: Seconds between scans when inotify is missing
+        polling: Always poll instead of using inotify
+        workers: Number of worker processes for parsing large bursts
+        stop: Event that ends the watch; checked at least once per second
+    """
+    manifest = inventory.InventoryManifest.load(manifest_path, base)
+    watcher = open_watcher(base, poll_interval, polling, ignore=[path for path in (manifest_path, report_path) if path])
+    try:
+        # Catch up with changes made while nobody was watching
+        _, checked = manifest.update([base], workers)
+        _publish(manifest, checked, manifest_path, report_path, emit)
+
+        while stop is None or not stop.is_set():
+            changed = watcher.wait(None if stop is None else 1.0)
+            if not changed:
+                continue
+
+            deadline = time.monotonic() + max_delay
+            while time.monotonic() < deadline:
+                more = watcher.wait(min(debounce, max(0.0, deadline - time.monotonic())))
+                if not more:
+                    break
+                changed |= more
+
+            _, checked = manifest.update(changed, workers)
+            _publish(manifest, checked, manifest_path, report_path, emit)
+    finally:
+        watcher.close()
+
+
+def _publish(
+    manifest: "inventory.InventoryManifest",
+    checked: Iterable[str],
+    manifest_path: str,
+    report_path: Optional[str],
+    emit: Callable[[Dict[str, Any]], None]
+) -> None:
+    for path in checked:
+        record = manifest.record(path)
+        if record is not None:
+            for event in record_events(record):
+                emit(event)
+
+    if report_path and not manifest.output_current(report_path):
+        inventory.write_file(report_path, inventory.render_markdown(manifest.records()))
+        manifest.record_output(report_path)
+    manifest.save(manifest_path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Revalidate CSRs as the CSR folders change")
+    parser.add_argument("--base", default=".", help="Repository root holding Prod-CSR and UAT-CSR (default: .)")
+    parser.add_argument("--manifest", default=".csr_manifest.json", help="Inventory manifest path")
+    parser.add_argument("--output", default="csr_report.md", help="Markdown report path; empty to disable")
+    parser.add_argument("--debounce", type=float, default=0.5, help="Seconds without changes that end a burst")
+    parser.add_argument("--poll", action="store_true", help="Poll instead of using inotify")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between scans when polling")
+    args = parser.parse_args(argv)
+
+    try:
+        watch(
+            base=args.base,
+            manifest_path=args.manifest,
+            report_path=args.output or None,
+            debounce=args.debounce,
+            poll_interval=args.poll_interval,
+            polling=args.poll
+        )
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
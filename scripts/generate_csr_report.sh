@@ -1,69 +1,13 @@
 #!/bin/bash
 
 # Script to generate a report of all CSRs
+#
+# Each CSR is parsed once by backend/inventory.py, with a pool of worker
+# processes for large trees. Extra arguments are passed through, e.g.
+# --json ../csr_report.json or --csv ../csr_report.csv
 
-echo "Generating CSR Report..."
-
-report_file="../csr_report.md"
-
-# Create report header
-cat > $report_file << EOF
-# CSR Report
-
-This report provides details about all Certificate Signing Requests (CSRs) in the repository.
-
-## Production CSRs
-
-| Service | CSR File | Domain | Organization | Country |
-|---------|----------|--------|--------------|---------|
-EOF
-
-# Add production CSRs to report
-for csr_file in ../Prod-CSR/*/saudi-*.csr; do
-  service=$(echo "$csr_file" | cut -d'/' -f2)
-  filename=$(basename "$csr_file")
-
-  # Extract CSR details
-  domain=$(openssl req -in "$csr_file" -noout -text | grep "Subject:" | grep -o "CN=[^,]*" | sed 's/CN=//')
-  org=$(openssl req -in "$csr_file" -noout -text | grep "Subject:" | grep -o "O=[^,]*" | sed 's/O=//')
-  country=$(openssl req -in "$csr_file" -noout -text | grep "Subject:" | grep -o "C=[^,]*" | sed 's/C=//')
-
-  # Add to report
-  echo "| $service | $filename | $domain | $org | $country |" >> $report_file
-done
-
-# Add UAT section
-cat >> $report_file << EOF
+cd "$(dirname "$0")/.." || { echo "Error: Could not change to project root directory"; exit 1; }
 
-## UAT CSRs
-
-| Service | CSR File | Domain | Organization | Country |
-|---------|----------|--------|--------------|---------|
-EOF
-
-# Add UAT CSRs to report
-for csr_file in ../UAT-CSR/*/saudi-*.csr; do
-  service=$(echo "$csr_file" | cut -d'/' -f2)
-  filename=$(basename "$csr_file")
-
-  # Extract CSR details
-  domain=$(openssl req -in "$csr_file" -noout -text | grep "Subject:" | grep -o "CN=[^,]*" | sed 's/CN=//')
-  org=$(openssl req -in "$csr_file" -noout -text | grep "Subject:" | grep -o "O=[^,]*" | sed 's/O=//')
-  country=$(openssl req -in "$csr_file" -noout -text | grep "Subject:" | grep -o "C=[^,]*" | sed 's/C=//')
-
-  # Add to report
-  echo "| $service | $filename | $domain | $org | $country |" >> $report_file
-done
-
-# Add summary section
-cat >> $report_file << EOF
-
-## Summary
-
-- Total Production CSRs: $(find ../Prod-CSR -name "*.csr" | wc -l)
-- Total UAT CSRs: $(find ../UAT-CSR -name "*.csr" | wc -l)
-
-All CSRs have been validated and organized into the appropriate folders.
-EOF
+echo "Generating CSR Report..."
 
-echo "Report generated: $report_file"
+python backend/inventory.py report --base . --output csr_report.md "$@"
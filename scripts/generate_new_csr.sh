@@ -1,10 +1,14 @@
 #!/bin/bash
 
 # Script to generate a new CSR for a service
+#
+# Runs backend/bulk_generate.py for a single entry. A new key is always
+# generated; use backend/bulk_generate.py with a manifest to generate many
+# CSRs in parallel and skip the ones that are up to date.
 
 # Check if required arguments are provided
-if [ $# -lt 3 ]; then
-  echo "Usage: $0 <service> <environment> <domain>"
+if [ $# -lt 2 ]; then
+  echo "Usage: $0 <service> <environment> [domain]"
   echo "Example: $0 NI-API PROD api-gateway.ksa.ngenius-payments.com"
   exit 1
 fi
@@ -13,41 +17,11 @@ SERVICE=$1
 ENV=$2
 DOMAIN=$3
 
-# Convert service name to lowercase for filename
-SERVICE_LOWER=$(echo "$SERVICE" | tr '[:upper:]' '[:lower:]')
-
-# Set target directory based on environment
-if [ "$ENV" == "PROD" ]; then
-  TARGET_DIR="../Prod-CSR/$SERVICE"
-  KEY_FILE="$TARGET_DIR/saudi-$SERVICE_LOWER-prod.key"
-  CSR_FILE="$TARGET_DIR/saudi-$SERVICE_LOWER-prod-csr.csr"
-elif [ "$ENV" == "UAT" ]; then
-  TARGET_DIR="../UAT-CSR/$SERVICE"
-  KEY_FILE="$TARGET_DIR/saudi-$SERVICE_LOWER-uat.key"
-  CSR_FILE="$TARGET_DIR/saudi-$SERVICE_LOWER-uat-csr.csr"
-else
-  echo "Error: Environment must be either PROD or UAT"
-  exit 1
-fi
-
-# Create target directory if it doesn't exist
-mkdir -p "$TARGET_DIR"
+cd "$(dirname "$0")/.." || { echo "Error: Could not change to project root directory"; exit 1; }
 
 echo "Generating CSR for $SERVICE in $ENV environment"
-echo "Domain: $DOMAIN"
 
-# Generate private key
-openssl genrsa -out "$KEY_FILE" 2048
-echo "Generated private key: $KEY_FILE"
-
-# Generate CSR
-openssl req -new -key "$KEY_FILE" -out "$CSR_FILE" -subj "/C=SA/O=Network International Arabia Limited Co./CN=$DOMAIN"
-echo "Generated CSR: $CSR_FILE"
-
-# Verify CSR
-echo ""
-echo "CSR Details:"
-openssl req -in "$CSR_FILE" -noout -text | grep "Subject:"
+python backend/bulk_generate.py --base . --service "$SERVICE" --environment "$ENV" ${DOMAIN:+--domain "$DOMAIN"} --force || exit 1
 
 echo ""
 echo "CSR generation complete!"
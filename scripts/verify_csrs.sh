@@ -1,51 +1,10 @@
 #!/bin/bash
 
 # Script to verify all CSRs in the folder structure
+#
+# Each CSR is parsed and its signature checked once by backend/inventory.py.
+# Exits with status 1 if any CSR is unreadable or fails verification.
 
-echo "CSR Verification Report"
-echo "======================="
-echo ""
+cd "$(dirname "$0")/.." || { echo "Error: Could not change to project root directory"; exit 1; }
 
-# Process each service directory in Prod-CSR
-echo "Production CSRs:"
-echo "---------------"
-for service_dir in ../Prod-CSR/*; do
-  if [ -d "$service_dir" ]; then
-    service=$(basename "$service_dir")
-    echo "Service: $service"
-
-    # Check CSRs
-    for csr_file in "$service_dir"/*.csr; do
-      if [ -f "$csr_file" ]; then
-        domain=$(openssl req -in "$csr_file" -noout -text | grep "Subject:" | grep -o "CN=[^,]*" | sed 's/CN=//')
-        echo "  - File: $(basename "$csr_file")"
-        echo "    Domain: $domain"
-      fi
-    done
-    echo ""
-  fi
-done
-
-echo ""
-
-# Process each service directory in UAT-CSR
-echo "UAT CSRs:"
-echo "---------"
-for service_dir in ../UAT-CSR/*; do
-  if [ -d "$service_dir" ]; then
-    service=$(basename "$service_dir")
-    echo "Service: $service"
-
-    # Check CSRs
-    for csr_file in "$service_dir"/*.csr; do
-      if [ -f "$csr_file" ]; then
-        domain=$(openssl req -in "$csr_file" -noout -text | grep "Subject:" | grep -o "CN=[^,]*" | sed 's/CN=//')
-        echo "  - File: $(basename "$csr_file")"
-        echo "    Domain: $domain"
-      fi
-    done
-    echo ""
-  fi
-done
-
-echo "Verification complete!"
+python backend/inventory.py verify --base . "$@"
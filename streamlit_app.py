@@ -1,8 +1,13 @@
 import streamlit as st
-import OpenSSL.crypto as crypto
 import base64
 import json
-from typing import Dict, Any, Optional, Tuple
+import os
+import sys
+from typing import Dict, Any
+
+# Share key generation and CSR parsing with the API
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+import csr_utils
 
 # Set page configuration
 st.set_page_config(
@@ -20,83 +25,13 @@ page = st.sidebar.radio(
 )
 
 # Utility functions
-def generate_csr(
-    common_name: str,
-    organization: str,
-    organizational_unit: Optional[str] = None,
-    locality: Optional[str] = None,
-    state: Optional[str] = None,
-    country: str = "US",
-    email: Optional[str] = None,
-    key_size: int = 2048
-) -> Tuple[str, str]:
-    """Generate a CSR and private key."""
-    # Create a key pair
-    key = crypto.PKey()
-    key.generate_key(crypto.TYPE_RSA, key_size)
-
-    # Create a CSR
-    req = crypto.X509Req()
-    subject = req.get_subject()
-
-    # Set subject fields
-    subject.CN = common_name
-    subject.O = organization
-    if organizational_unit:
-        subject.OU = organizational_unit
-    if locality:
-        subject.L = locality
-    if state:
-        subject.ST = state
-    subject.C = country
-    if email:
-        subject.emailAddress = email
-
-    # Sign the CSR with the private key
-    req.set_pubkey(key)
-    req.sign(key, 'sha256')
-
-    # Convert to PEM format
-    csr_pem = crypto.dump_certificate_request(crypto.FILETYPE_PEM, req).decode('utf-8')
-    key_pem = crypto.dump_privatekey(crypto.FILETYPE_PEM, key).decode('utf-8')
-
-    return csr_pem, key_pem
-
 def parse_csr(csr_pem: str) -> Dict[str, Any]:
     """Parse a CSR and extract its information."""
     try:
-        # Parse the CSR
-        csr = crypto.load_certificate_request(crypto.FILETYPE_PEM, csr_pem)
-
-        # Extract subject information
-        subject = csr.get_subject()
-        subject_dict = {}
-        for key, value in subject.get_components():
-            subject_dict[key.decode('utf-8')] = value.decode('utf-8')
-
-        # Get public key information
-        pubkey = csr.get_pubkey()
-        key_size = pubkey.bits()
-
-        # Get signature algorithm
-        try:
-            sig_algo = csr.get_signature_algorithm().decode('utf-8')
-        except AttributeError:
-            # Fallback for older versions of OpenSSL
-            sig_algo = "sha256WithRSAEncryption"
-
-        # Verify the signature
-        is_valid = csr.verify(pubkey)
-
-        return {
-            "subject": subject_dict,
-            "key_size": key_size,
-            "signature_algorithm": sig_algo,
-            "is_valid": is_valid
-        }
+        return csr_utils.parse_csr(csr_pem)
 
     except Exception as e:
-        st.error(f"Invalid CSR: {str(e)}")
+        st.error(str(e))
         return {}
 
 def suggest_domain_name(service: str, environment: str) -> str:
@@ -240,10 +175,16 @@ elif page == "Generator":
                 help="Contact email address (optional)"
             )
 
+            key_type = st.selectbox(
+                "Key Type",
+                csr_utils.KEY_TYPES,
+                help="RSA, elliptic curve (P-256/P-384/P-521) or Ed25519. EC and Ed25519 keys are much faster to generate."
+            )
+
             key_size = st.selectbox(
                 "Key Size",
                 [2048, 4096],
-                help="RSA key size in bits"
+                help="RSA key size in bits (ignored for EC and Ed25519 keys)"
             )
 
         submit_button = st.form_submit_button("Generate CSR")
@@ -259,7 +200,7 @@ elif page == "Generator":
         else:
             with st.spinner("Generating CSR..."):
                 try:
-                    csr_pem, key_pem = generate_csr(
+                    csr_pem, key_pem = csr_utils.generate_csr(
                         common_name=common_name,
                         organization=organization,
                         organizational_unit=organizational_unit,
@@ -267,7 +208,8 @@ elif page == "Generator":
                         state=state,
                         country=country,
                         email=email,
-                        key_size=key_size
+                        key_size=key_size,
+                        key_type=key_type
                     )
 
                     st.success("CSR generated successfully!")
@@ -336,6 +278,7 @@ elif page == "Validator":
                             st.write(f"- {key}: {value}")
 
                         # Key information
+                        st.write(f"**Key Type**: {csr_info['key_type']}" + (f" ({csr_info['curve']})" if csr_info['curve'] else ""))
                         st.write(f"**Key Size**: {csr_info['key_size']} bits")
                         st.write(f"**Signature Algorithm**: {csr_info['signature_algorithm']}")
 
@@ -343,7 +286,14 @@ elif page == "Validator":
                         st.subheader("Security Assessment")
 
                         # Check key size
-                        if csr_info["key_size"] < 2048:
+                        if csr_info["key_type"] == "EC":
+                            if csr_info["key_size"] < 256:
+                                st.error(f"Curve {csr_info['curve']} is smaller than P-256, which is not recommended for security reasons.")
+                            else:
+                                st.success(f"Curve {csr_info['curve']} meets security recommendations.")
+                        elif csr_info["key_type"] == "ED25519":
+                            st.success("Ed25519 key meets security recommendations.")
+                        elif csr_info["key_size"] < 2048:
                             st.error("Key size is less than 2048 bits, which is not recommended for security reasons.")
                         else:
                             st.success(f"Key size ({csr_info['key_size']} bits) meets security recommendations.")
@@ -351,7 +301,7 @@ elif page == "Validator":
                         # Check signature algorithm
                         if "sha1" in csr_info["signature_algorithm"].lower():
                             st.warning("SHA-1 signature algorithm is deprecated and not recommended for security reasons.")
-                        elif "sha256" in csr_info["signature_algorithm"].lower() or "sha384" in csr_info["signature_algorithm"].lower() or "sha512" in csr_info["signature_algorithm"].lower():
+                        elif "sha256" in csr_info["signature_algorithm"].lower() or "sha384" in csr_info["signature_algorithm"].lower() or "sha512" in csr_info["signature_algorithm"].lower() or csr_info["signature_algorithm"] == "ed25519":
                             st.success(f"Signature algorithm ({csr_info['signature_algorithm']}) meets security recommendations.")
 
                 except Exception as e:
@@ -389,6 +339,7 @@ elif page == "Extractor":
                             st.write(f"- {key}: {value}")
 
                         # Key information
+                        st.write(f"**Key Type**: {csr_info['key_type']}" + (f" ({csr_info['curve']})" if csr_info['curve'] else ""))
                         st.write(f"**Key Size**: {csr_info['key_size']} bits")
                         st.write(f"**Signature Algorithm**: {csr_info['signature_algorithm']}")
 
@@ -49,6 +49,23 @@ class TestStreamlitApp(unittest.TestCase):
         self.assertIn("BEGIN PRIVATE KEY", key_pem)
         self.assertIn("END PRIVATE KEY", key_pem)
 
+    def test_generate_csr_key_types(self):
+        """
+        Test the generate_csr function with elliptic-curve and Ed25519 keys
+        """
+        for key_type in ["EC-P256", "EC-P384", "EC-P521", "ED25519"]:
+            csr_pem, key_pem = generate_csr(
+                common_name="test.example.com",
+                organization="Test Organization",
+                country="US",
+                key_type=key_type
+            )
+            self.assertIn("BEGIN CERTIFICATE REQUEST", csr_pem)
+            self.assertIn("BEGIN PRIVATE KEY", key_pem)
+
+            csr_info = parse_csr(csr_pem)
+            self.assertEqual(csr_info["key_type"], "ED25519" if key_type == "ED25519" else "EC")
+
     def test_parse_csr(self):
         """
         Test the parse_csr function